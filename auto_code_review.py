@@ -2,11 +2,16 @@
 # If running inside Docker, use 'host.docker.internal' to reach Ollama and the API on the host.
 # If running inside the API container, use 'localhost' for both URLs.
 
+import argparse
 import os
 import glob
+import subprocess
 import requests
 import json
 
+from scripts.llm_cache import cached_completion
+from scripts.suggest_rules import parse_unified_diff
+
 # For Docker: use host.docker.internal; for direct API container, use localhost
 OLLAMA_URL = os.environ.get("OLLAMA_URL", "http://host.docker.internal:11434/api/generate")
 API_URL = os.environ.get("RULE_API_URL", "http://host.docker.internal:9103/propose-rule-change")
@@ -15,11 +20,31 @@ MODEL = "llama3"
 # ... rest of the script unchanged ...
 
 # 1. Scan codebase for repeated patterns (simple example: direct SQL queries)
-def scan_codebase_for_patterns():
+def scan_codebase_for_patterns(changed_lines=None, target="."):
+    """
+    Scan the .py files under target (a file or directory, default the cwd).
+    changed_lines ({path: line numbers}, e.g. from changed_lines_since) limits
+    the scan to those lines, so a diff review only reads the touched files.
+    """
     sql_patterns = []
-    for pyfile in glob.glob("**/*.py", recursive=True):
+    if changed_lines is None:
+        if os.path.isfile(target):
+            files = [target]
+        else:
+            files = glob.glob(os.path.join(target, "**/*.py"), recursive=True)
+    else:
+        root = os.path.abspath(target)
+        files = [
+            path for path in changed_lines
+            if path.endswith(".py") and os.path.exists(path)
+            and os.path.commonpath([root, os.path.abspath(path)]) == root
+        ]
+    for pyfile in files:
+        wanted = set(changed_lines[pyfile]) if changed_lines is not None else None
         with open(pyfile, "r", encoding="utf-8") as f:
             for i, line in enumerate(f, 1):
+                if wanted is not None and i not in wanted:
+                    continue
                 if "SELECT" in line or "INSERT" in line or "UPDATE" in line:
                     sql_patterns.append({
                         "file": pyfile,
@@ -52,11 +77,13 @@ Given these code patterns and the current rules, suggest new rules or improvemen
 
 # 4. Call Ollama LLM
 def call_ollama(prompt):
-    response = requests.post(OLLAMA_URL, json={"model": MODEL, "prompt": prompt})
-    response.raise_for_status()
-    # Ollama returns a streaming response; get the full text
-    result = response.json()["response"]
-    return result
+    def generate():
+        response = requests.post(OLLAMA_URL, json={"model": MODEL, "prompt": prompt})
+        response.raise_for_status()
+        # Ollama returns a streaming response; get the full text
+        return response.json()["response"]
+
+    return cached_completion(MODEL, prompt, generate)
 
 # 5. Parse LLM output (expecting JSON array)
 def parse_rule_proposals(llm_output):
@@ -79,9 +106,34 @@ def submit_proposals(proposals):
         else:
             print(f"Failed to submit: {proposal.get('rule_type')}", resp.text)
 
+def changed_lines_since(base):
+    """
+    {path: added line numbers} for the working tree against a git ref. git reports
+    paths relative to the repository root; they are returned relative to the cwd so
+    they match the scanned files when this runs from a subdirectory.
+    """
+    top = subprocess.run(
+        ["git", "rev-parse", "--show-toplevel"], capture_output=True, text=True, check=True
+    ).stdout.strip()
+    diff = subprocess.run(
+        ["git", "diff", "--unified=0", "--no-color", base], capture_output=True, text=True, check=True
+    ).stdout
+    return {
+        os.path.relpath(os.path.join(top, path)): set(lines)
+        for path, lines in parse_unified_diff(diff).items()
+    }
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Propose rules from code patterns via Ollama.")
+    parser.add_argument("target", nargs="?", default=".", help="File or directory to scan (default: current directory)")
+    parser.add_argument("--diff-base", help="Only scan lines changed since this git ref (pre-commit/CI)")
+    args = parser.parse_args()
+    if not os.path.exists(args.target):
+        parser.error(f"{args.target} does not exist")
     print("Scanning codebase for patterns...")
-    patterns = scan_codebase_for_patterns()
+    changed = changed_lines_since(args.diff_base) if args.diff_base else None
+    patterns = scan_codebase_for_patterns(changed, target=args.target)
     print(f"Found {len(patterns)} patterns.")
     rules = get_current_rules()
     prompt = build_prompt(patterns, rules)
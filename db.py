@@ -11,7 +11,8 @@ from sqlalchemy.orm import sessionmaker
 from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy import Float
 from sqlalchemy import text
-from sqlalchemy.types import UserDefinedType
+from sqlalchemy.types import TypeDecorator, UserDefinedType
+import numpy as np
 import sqlalchemy as sa
 
 # SQLite database URL
@@ -28,10 +29,62 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 # Add support for pgvector
+def parse_vector(value):
+    """Decode pgvector's text form '[0.1,0.2,...]' into a list of floats (NumPy fast path)."""
+    if value is None or not isinstance(value, str):
+        return value
+    body = value.strip().strip("[]")
+    if not body:
+        return []
+    # float64, not pgvector's float32, so tolist() returns the stored decimals unchanged
+    return np.array(body.split(","), dtype=np.float64).tolist()
+
+
 class Vector(UserDefinedType):
+    cache_ok = True
+
     def get_col_spec(self, **kw):
         return "vector(768)"  # Adjust dimension as needed
 
+    def result_processor(self, dialect, coltype):
+        return parse_vector
+
+# Multi-valued string column (categories/tags/applies_to).
+# Postgres stores a native VARCHAR[] (GIN-indexable); other dialects (e.g. the
+# SQLite test engine) fall back to the legacy comma-separated string.
+class StringList(TypeDecorator):
+    impl = String
+    cache_ok = True
+
+    class comparator_factory(TypeDecorator.Comparator):
+        def overlap(self, values):
+            """True if the column shares at least one item with `values` (&&)."""
+            return self.op("&&", return_type=sa.Boolean)(
+                sa.bindparam(None, list(values), type_=ARRAY(String))
+            )
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(ARRAY(String))
+        return dialect.type_descriptor(String())
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            value = []
+        elif isinstance(value, str):
+            value = [x.strip() for x in value.split(",") if x.strip()]
+        if dialect.name == "postgresql":
+            return list(value)
+        return ",".join(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return []
+        if isinstance(value, str):
+            return [x.strip() for x in value.split(",") if x.strip()]
+        return list(value)
+
+
 # MemoryDB connection (for vector store)
 MEMORYDB_URL = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/memorydb"
 memory_engine = create_engine(MEMORYDB_URL)
@@ -56,15 +109,72 @@ class Rule(Base):
     submitted_by = Column(String, index=True)
     added_by = Column(String, index=True, nullable=True)
     project = Column(String, index=True, nullable=True)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(DateTime, nullable=False, default=datetime.utcnow)  # keyset sort key for GET /rules
     version = Column(Integer, default=1)
-    categories = Column(String, default="")  # Comma-separated
-    tags = Column(String, default="")  # Comma-separated
+    categories = Column(StringList, default=list)
+    tags = Column(StringList, default=list)
     examples = Column(Text, nullable=True, default=None)
-    applies_to = Column(String, default="")  # Comma-separated list of targets
+    applies_to = Column(StringList, default=list)  # List of targets
     applies_to_rationale = Column(Text, nullable=True, default=None)
     user_story = Column(Text, nullable=True, default=None)
 
+    __table_args__ = (
+        sa.Index("ix_rules_timestamp_id", "timestamp", "id"),
+        sa.Index("ix_rules_categories_gin", "categories", postgresql_using="gin"),
+        sa.Index("ix_rules_tags_gin", "tags", postgresql_using="gin"),
+        sa.Index("ix_rules_applies_to_gin", "applies_to", postgresql_using="gin"),
+    )
+
+
+# Delta sync feed: the latest change per rule, each stamped with a global sequence number.
+# Maintained on Postgres by a trigger on rules, so every writer (API, scripts, merges) is captured;
+# deleted rules stay as tombstones.
+class RuleChange(Base):
+    __tablename__ = "rule_changes"
+    rule_id = Column(String, primary_key=True)
+    seq = Column(sa.BigInteger, nullable=False, unique=True, index=True)
+    deleted = Column(sa.Boolean, nullable=False, default=False)
+    changed_at = Column(DateTime, default=datetime.utcnow)
+
+
+# record_rule_change runs as a deferred constraint trigger, i.e. at commit time. Only then does
+# it take the rule_changes advisory lock and draw sequence numbers, so seq order matches commit
+# order (a client's watermark never skips a change that commits late) while the lock is held
+# just for the commit itself rather than for the whole writing transaction.
+RULE_CHANGES_TRIGGER_DDL = [
+    "CREATE SEQUENCE IF NOT EXISTS rule_change_seq",
+    """
+    CREATE OR REPLACE FUNCTION record_rule_change() RETURNS trigger AS $$
+    BEGIN
+        PERFORM pg_advisory_xact_lock(hashtext('rule_changes'));
+        IF TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND OLD.id <> NEW.id) THEN
+            INSERT INTO rule_changes (rule_id, seq, deleted, changed_at)
+            VALUES (OLD.id, nextval('rule_change_seq'), true, now() AT TIME ZONE 'utc')
+            ON CONFLICT (rule_id) DO UPDATE
+            SET seq = EXCLUDED.seq, deleted = true, changed_at = EXCLUDED.changed_at;
+        END IF;
+        IF TG_OP = 'DELETE' THEN
+            RETURN OLD;
+        END IF;
+        INSERT INTO rule_changes (rule_id, seq, deleted, changed_at)
+        VALUES (NEW.id, nextval('rule_change_seq'), false, now() AT TIME ZONE 'utc')
+        ON CONFLICT (rule_id) DO UPDATE
+        SET seq = EXCLUDED.seq, deleted = false, changed_at = EXCLUDED.changed_at;
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS rules_record_change ON rules",
+    """
+    CREATE CONSTRAINT TRIGGER rules_record_change AFTER INSERT OR UPDATE OR DELETE ON rules
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE FUNCTION record_rule_change()
+    """,
+]
+
+for _statement in RULE_CHANGES_TRIGGER_DDL:
+    sa.event.listen(Rule.__table__, "after_create", sa.DDL(_statement).execute_if(dialect="postgresql"))
+
 
 # Proposal model
 class Proposal(Base):
@@ -79,10 +189,10 @@ class Proposal(Base):
     project = Column(String, index=True, nullable=True)
     timestamp = Column(DateTime, default=datetime.utcnow)
     version = Column(Integer, default=1)
-    categories = Column(String, default="")  # Comma-separated
-    tags = Column(String, default="")  # Comma-separated
+    categories = Column(StringList, default=list)
+    tags = Column(StringList, default=list)
     examples = Column(Text, nullable=True, default=None)
-    applies_to = Column(String, default="")  # Comma-separated list of targets
+    applies_to = Column(StringList, default=list)  # List of targets
     applies_to_rationale = Column(Text, nullable=True, default=None)
     reason_for_change = Column(Text, nullable=True, default=None)
     references = Column(Text, nullable=True, default=None)
@@ -90,6 +200,11 @@ class Proposal(Base):
     # Fields below support the full rule proposal template
     user_story = Column(Text, nullable=True, default=None)
 
+    __table_args__ = (
+        sa.Index("ix_proposals_categories_gin", "categories", postgresql_using="gin"),
+        sa.Index("ix_proposals_tags_gin", "tags", postgresql_using="gin"),
+    )
+
 
 # Feedback model
 class Feedback(Base):
@@ -117,10 +232,10 @@ class RuleVersion(Base):
     added_by = Column(String, nullable=True)
     project = Column(String, nullable=True)
     timestamp = Column(DateTime)
-    categories = Column(String, default="")
-    tags = Column(String, default="")
+    categories = Column(StringList, default=list)
+    tags = Column(StringList, default=list)
     examples = Column(Text, nullable=True, default=None)
-    applies_to = Column(String, default="")  # Comma-separated list of targets
+    applies_to = Column(StringList, default=list)  # List of targets
     applies_to_rationale = Column(Text, nullable=True, default=None)
     user_story = Column(Text, nullable=True, default=None)
 
@@ -143,8 +258,8 @@ class Enhancement(Base):
     description = Column(Text)
     suggested_by = Column(String, nullable=True)
     page = Column(String, nullable=True)
-    tags = Column(String, default="")
-    categories = Column(String, default="")
+    tags = Column(StringList, default=list)
+    categories = Column(StringList, default=list)
     timestamp = Column(DateTime, default=datetime.utcnow)
     status = Column(String, default="open")
     proposal_id = Column(
@@ -152,35 +267,88 @@ class Enhancement(Base):
     )  # New: reference to original proposal
     project = Column(String, index=True, nullable=True)  # Project association
     examples = Column(Text, nullable=True, default=None)  # New field for examples
-    applies_to = Column(String, default="")  # Comma-separated list of targets
+    applies_to = Column(StringList, default=list)  # List of targets
     applies_to_rationale = Column(Text, nullable=True, default=None)
     user_story = Column(Text, nullable=True, default=None)
     diff = Column(Text, nullable=True, default=None)  # New: diff for enhancements
 
+    __table_args__ = (
+        sa.Index("ix_enhancements_categories_gin", "categories", postgresql_using="gin"),
+        sa.Index("ix_enhancements_tags_gin", "tags", postgresql_using="gin"),
+    )
+
 
 # --- New: API Error Log model ---
+# On Postgres the table is range-partitioned by month on timestamp (partitions are
+# created and dropped by the API's error-log maintenance), so timestamp is part of the key.
 class ApiErrorLog(Base):
     __tablename__ = "api_error_logs"
     id = Column(String, primary_key=True)  # error_id (UUID)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(DateTime, primary_key=True, default=datetime.utcnow, index=True)
     path = Column(String)
     method = Column(String)
     status_code = Column(Integer)
     message = Column(Text)
     stack_trace = Column(Text)
     user_id = Column(String, nullable=True)  # If available
+    __table_args__ = {"postgresql_partition_by": "RANGE (timestamp)"}
+
+
+# Catch-all partition so inserts never fail before the monthly partitions exist
+sa.event.listen(
+    ApiErrorLog.__table__,
+    "after_create",
+    sa.DDL("CREATE TABLE IF NOT EXISTS api_error_logs_default PARTITION OF api_error_logs DEFAULT").execute_if(
+        dialect="postgresql"
+    ),
+)
+
+
+# Hourly error counts per path/method/status/message fingerprint, kept far longer than raw logs
+class ApiErrorRollup(Base):
+    __tablename__ = "api_error_rollups"
+    bucket_start = Column(DateTime, primary_key=True, index=True)
+    path = Column(String, primary_key=True)
+    method = Column(String, primary_key=True)
+    status_code = Column(Integer, primary_key=True)
+    fingerprint = Column(String(16), primary_key=True)
+    sample_message = Column(Text)
+    count = Column(Integer, nullable=False, default=0)
+    last_seen = Column(DateTime)
+
+
+# --- Background job queue for long-running LLM calls ---
+class LlmJob(Base):
+    __tablename__ = "llm_jobs"
+    __table_args__ = (
+        # Workers claim the oldest queued job: WHERE status = 'queued' ORDER BY created_at
+        sa.Index("ix_llm_jobs_status_created_at", "status", "created_at"),
+    )
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    kind = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="queued")  # queued | running | succeeded | failed
+    payload = Column(Text, nullable=True)  # JSON
+    result = Column(Text, nullable=True)  # JSON
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    locked_by = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    # Renewed by the running worker; a job is stale only when this (or started_at) is old
+    heartbeat_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
 
 
 # --- New: API Access Token model ---
 class ApiAccessToken(Base):
     __tablename__ = "api_access_tokens"
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    token = Column(String, unique=True, index=True)
+    token = Column(String, unique=True, index=True)  # sha256 hex of the bearer token, never the token itself
     created_at = Column(DateTime, default=datetime.utcnow)
     created_by = Column(String, nullable=True)
     description = Column(String, nullable=True)
     active = Column(Integer, default=1)  # 1 = active, 0 = revoked
-    role = Column(String(32), default="admin", nullable=False)  # New: role-based access
+    role = Column(String(32), default="admin", server_default="admin", nullable=False)  # New: role-based access
 
 
 # Vector store model
@@ -195,6 +363,15 @@ class MemoryVector(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
+# Persistent embedding cache (memorydb), keyed by model name + sha256 of the input text
+class EmbeddingCache(Base):
+    __tablename__ = "embedding_cache"
+    model = Column(String, primary_key=True)
+    text_hash = Column(String(64), primary_key=True)
+    embedding = Column(Vector, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
 # Edge/relationship model for memory graph
 class MemoryEdge(Base):
     __tablename__ = "memory_edges"
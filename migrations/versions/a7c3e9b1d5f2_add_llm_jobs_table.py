@@ -0,0 +1,41 @@
+"""add llm_jobs table for the background LLM job queue
+
+Revision ID: a7c3e9b1d5f2
+Revises: f3b8a2d6c4e1
+Create Date: 2025-05-23 10:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c3e9b1d5f2'
+down_revision: Union[str, None] = 'f3b8a2d6c4e1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('llm_jobs',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=True),
+    sa.Column('result', sa.Text(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('locked_by', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # Claim query: WHERE status = 'queued' ORDER BY created_at FOR UPDATE SKIP LOCKED
+    op.create_index('ix_llm_jobs_status_created_at', 'llm_jobs', ['status', 'created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_llm_jobs_status_created_at', table_name='llm_jobs')
+    op.drop_table('llm_jobs')
@@ -0,0 +1,44 @@
+"""run the rule_changes trigger at commit time instead of on every row write
+
+The row trigger took pg_advisory_xact_lock(hashtext('rule_changes')) on the first rule
+write and held it until commit, so every transaction writing rules ran one at a time and
+a bulk approve/moderate blocked all other rule writers for its whole duration. As a
+deferred constraint trigger it only takes the lock (and draws sequence numbers) while the
+transaction commits, which still keeps seq order equal to commit order.
+
+Revision ID: b5d7f9a1c3e6
+Revises: f1a3c5e7b9d2
+Create Date: 2025-05-28 10:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5d7f9a1c3e6'
+down_revision: Union[str, None] = 'f1a3c5e7b9d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS rules_record_change ON rules")
+    op.execute(
+        """
+        CREATE CONSTRAINT TRIGGER rules_record_change AFTER INSERT OR UPDATE OR DELETE ON rules
+        DEFERRABLE INITIALLY DEFERRED
+        FOR EACH ROW EXECUTE FUNCTION record_rule_change()
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS rules_record_change ON rules")
+    op.execute(
+        """
+        CREATE TRIGGER rules_record_change AFTER INSERT OR UPDATE OR DELETE ON rules
+        FOR EACH ROW EXECUTE FUNCTION record_rule_change()
+        """
+    )
@@ -0,0 +1,30 @@
+"""make rules.timestamp NOT NULL
+
+GET /rules orders by and seeks past (timestamp, id). A NULL timestamp sorted last and
+made encode_rule_cursor fail, so a page ending on such a rule raised. Existing NULLs
+are backfilled with the migration time.
+
+Revision ID: c3e5a7b9d1f4
+Revises: b5d7f9a1c3e6
+Create Date: 2025-05-29 09:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e5a7b9d1f4'
+down_revision: Union[str, None] = 'b5d7f9a1c3e6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""UPDATE rules SET "timestamp" = now() AT TIME ZONE 'utc' WHERE "timestamp" IS NULL""")
+    op.alter_column('rules', 'timestamp', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade() -> None:
+    op.alter_column('rules', 'timestamp', existing_type=sa.DateTime(), nullable=True)
@@ -0,0 +1,33 @@
+"""store api access tokens as sha256 hashes
+
+Revision ID: c8d2f4a6b1e3
+Revises: a7c3e9b1d5f2
+Create Date: 2025-05-24 10:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8d2f4a6b1e3'
+down_revision: Union[str, None] = 'a7c3e9b1d5f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Hash existing plaintext tokens in place; the unique index on token keeps serving the lookup.
+    # Rows that already hold a hex sha256 are left alone so re-running is harmless.
+    op.execute(
+        """
+        UPDATE api_access_tokens
+        SET token = encode(sha256(convert_to(token, 'UTF8')), 'hex')
+        WHERE token IS NOT NULL AND token !~ '^[0-9a-f]{64}$'
+        """
+    )
+
+
+def downgrade() -> None:
+    # Hashes cannot be turned back into tokens; issue new tokens after downgrading.
+    pass
@@ -0,0 +1,102 @@
+"""partition api_error_logs by month and add api_error_rollups
+
+Revision ID: d9e3a5b7c2f4
+Revises: c8d2f4a6b1e3
+Create Date: 2025-05-25 10:00:00.000000
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9e3a5b7c2f4'
+down_revision: Union[str, None] = 'c8d2f4a6b1e3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = 'id, "timestamp", path, method, status_code, message, stack_trace, user_id'
+
+
+def _add_months(dt, n):
+    years, month = divmod(dt.month - 1 + n, 12)
+    return dt.replace(year=dt.year + years, month=month + 1)
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE api_error_logs RENAME TO api_error_logs_unpartitioned")
+    op.execute("ALTER TABLE api_error_logs_unpartitioned RENAME CONSTRAINT api_error_logs_pkey TO api_error_logs_unpartitioned_pkey")
+    op.execute(
+        """
+        CREATE TABLE api_error_logs (
+            id VARCHAR NOT NULL,
+            "timestamp" TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            path VARCHAR,
+            method VARCHAR,
+            status_code INTEGER,
+            message TEXT,
+            stack_trace TEXT,
+            user_id VARCHAR,
+            PRIMARY KEY (id, "timestamp")
+        ) PARTITION BY RANGE ("timestamp")
+        """
+    )
+    op.execute('CREATE INDEX ix_api_error_logs_timestamp ON api_error_logs ("timestamp")')
+    op.execute("CREATE TABLE api_error_logs_default PARTITION OF api_error_logs DEFAULT")
+
+    # Monthly partitions from the oldest existing row through two months ahead
+    now = datetime.utcnow()
+    oldest = op.get_bind().execute(sa.text('SELECT min("timestamp") FROM api_error_logs_unpartitioned')).scalar()
+    month = (oldest or now).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    last = _add_months(now.replace(day=1, hour=0, minute=0, second=0, microsecond=0), 2)
+    while month <= last:
+        end = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE api_error_logs_p{month:%Y%m} PARTITION OF api_error_logs "
+            f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+        )
+        month = end
+
+    op.execute(
+        f"INSERT INTO api_error_logs ({COLUMNS}) "
+        "SELECT id, COALESCE(\"timestamp\", now() AT TIME ZONE 'utc'), path, method, status_code, message, stack_trace, user_id "
+        "FROM api_error_logs_unpartitioned"
+    )
+    op.execute("DROP TABLE api_error_logs_unpartitioned")
+
+    op.create_table('api_error_rollups',
+    sa.Column('bucket_start', sa.DateTime(), nullable=False),
+    sa.Column('path', sa.String(), nullable=False),
+    sa.Column('method', sa.String(), nullable=False),
+    sa.Column('status_code', sa.Integer(), nullable=False),
+    sa.Column('fingerprint', sa.String(length=16), nullable=False),
+    sa.Column('sample_message', sa.Text(), nullable=True),
+    sa.Column('count', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('last_seen', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('bucket_start', 'path', 'method', 'status_code', 'fingerprint')
+    )
+    op.create_index('ix_api_error_rollups_bucket_start', 'api_error_rollups', ['bucket_start'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_api_error_rollups_bucket_start', table_name='api_error_rollups')
+    op.drop_table('api_error_rollups')
+    op.execute("ALTER TABLE api_error_logs RENAME TO api_error_logs_partitioned")
+    op.execute("ALTER TABLE api_error_logs_partitioned RENAME CONSTRAINT api_error_logs_pkey TO api_error_logs_partitioned_pkey")
+    op.execute("ALTER INDEX ix_api_error_logs_timestamp RENAME TO ix_api_error_logs_partitioned_timestamp")
+    op.create_table('api_error_logs',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('timestamp', sa.DateTime(), nullable=True),
+    sa.Column('path', sa.String(), nullable=True),
+    sa.Column('method', sa.String(), nullable=True),
+    sa.Column('status_code', sa.Integer(), nullable=True),
+    sa.Column('message', sa.Text(), nullable=True),
+    sa.Column('stack_trace', sa.Text(), nullable=True),
+    sa.Column('user_id', sa.String(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute(f"INSERT INTO api_error_logs ({COLUMNS}) SELECT {COLUMNS} FROM api_error_logs_partitioned ON CONFLICT (id) DO NOTHING")
+    # Dropping the parent drops every partition with it
+    op.execute("DROP TABLE api_error_logs_partitioned")
@@ -0,0 +1,76 @@
+"""add rule_changes table and trigger for the rules delta sync feed
+
+Revision ID: e4f6a8c0d2b5
+Revises: d9e3a5b7c2f4
+Create Date: 2025-05-26 10:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4f6a8c0d2b5'
+down_revision: Union[str, None] = 'd9e3a5b7c2f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('rule_changes',
+    sa.Column('rule_id', sa.String(), nullable=False),
+    sa.Column('seq', sa.BigInteger(), nullable=False),
+    sa.Column('deleted', sa.Boolean(), nullable=False, server_default=sa.false()),
+    sa.Column('changed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('rule_id')
+    )
+    op.create_index('ix_rule_changes_seq', 'rule_changes', ['seq'], unique=True)
+    op.execute("CREATE SEQUENCE IF NOT EXISTS rule_change_seq")
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION record_rule_change() RETURNS trigger AS $$
+        BEGIN
+            -- Serialize rule writers so sequence numbers become visible in commit order
+            -- and a client's watermark never skips a change that commits late.
+            PERFORM pg_advisory_xact_lock(hashtext('rule_changes'));
+            IF TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND OLD.id <> NEW.id) THEN
+                INSERT INTO rule_changes (rule_id, seq, deleted, changed_at)
+                VALUES (OLD.id, nextval('rule_change_seq'), true, now() AT TIME ZONE 'utc')
+                ON CONFLICT (rule_id) DO UPDATE
+                SET seq = EXCLUDED.seq, deleted = true, changed_at = EXCLUDED.changed_at;
+            END IF;
+            IF TG_OP = 'DELETE' THEN
+                RETURN OLD;
+            END IF;
+            INSERT INTO rule_changes (rule_id, seq, deleted, changed_at)
+            VALUES (NEW.id, nextval('rule_change_seq'), false, now() AT TIME ZONE 'utc')
+            ON CONFLICT (rule_id) DO UPDATE
+            SET seq = EXCLUDED.seq, deleted = false, changed_at = EXCLUDED.changed_at;
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER rules_record_change AFTER INSERT OR UPDATE OR DELETE ON rules
+        FOR EACH ROW EXECUTE FUNCTION record_rule_change()
+        """
+    )
+    # Existing rules become the first changes, oldest first
+    op.execute(
+        """
+        INSERT INTO rule_changes (rule_id, seq, deleted, changed_at)
+        SELECT id, nextval('rule_change_seq'), false, COALESCE("timestamp", now() AT TIME ZONE 'utc')
+        FROM (SELECT id, "timestamp" FROM rules ORDER BY "timestamp", id) AS ordered
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS rules_record_change ON rules")
+    op.execute("DROP FUNCTION IF EXISTS record_rule_change()")
+    op.execute("DROP SEQUENCE IF EXISTS rule_change_seq")
+    op.drop_index('ix_rule_changes_seq', table_name='rule_changes')
+    op.drop_table('rule_changes')
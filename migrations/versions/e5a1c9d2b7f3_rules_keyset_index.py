@@ -0,0 +1,26 @@
+"""add (timestamp, id) index on rules for keyset pagination
+
+Revision ID: e5a1c9d2b7f3
+Revises: d010368583a5
+Create Date: 2025-05-20 09:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a1c9d2b7f3'
+down_revision: Union[str, None] = 'd010368583a5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # GET /rules orders by (timestamp, id) and seeks past the cursor tuple
+    op.execute("CREATE INDEX IF NOT EXISTS ix_rules_timestamp_id ON rules (timestamp, id);")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_rules_timestamp_id;")
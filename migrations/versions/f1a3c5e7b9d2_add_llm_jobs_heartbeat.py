@@ -0,0 +1,25 @@
+"""add heartbeat_at to llm_jobs so running jobs can renew their lease
+
+Revision ID: f1a3c5e7b9d2
+Revises: e4f6a8c0d2b5
+Create Date: 2025-05-27 10:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1a3c5e7b9d2'
+down_revision: Union[str, None] = 'e4f6a8c0d2b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('llm_jobs', sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('llm_jobs', 'heartbeat_at')
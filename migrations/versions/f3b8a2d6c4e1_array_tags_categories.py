@@ -0,0 +1,68 @@
+"""store categories/tags/applies_to as varchar[] with GIN indexes
+
+Converts the comma-separated string columns on rules, proposals,
+rule_versions and enhancements into native Postgres arrays (backfilling
+existing rows in place) and adds GIN indexes for tag/category lookups.
+
+Revision ID: f3b8a2d6c4e1
+Revises: e5a1c9d2b7f3
+Create Date: 2025-05-20 10:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b8a2d6c4e1'
+down_revision: Union[str, None] = 'e5a1c9d2b7f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+LIST_COLUMNS = {
+    "rules": ["categories", "tags", "applies_to"],
+    "proposals": ["categories", "tags", "applies_to"],
+    "rule_versions": ["categories", "tags", "applies_to"],
+    "enhancements": ["categories", "tags", "applies_to"],
+}
+
+GIN_INDEXES = [
+    ("ix_rules_categories_gin", "rules", "categories"),
+    ("ix_rules_tags_gin", "rules", "tags"),
+    ("ix_rules_applies_to_gin", "rules", "applies_to"),
+    ("ix_proposals_categories_gin", "proposals", "categories"),
+    ("ix_proposals_tags_gin", "proposals", "tags"),
+    ("ix_enhancements_categories_gin", "enhancements", "categories"),
+    ("ix_enhancements_tags_gin", "enhancements", "tags"),
+]
+
+
+def upgrade() -> None:
+    for table, columns in LIST_COLUMNS.items():
+        for column in columns:
+            op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} DROP DEFAULT;")
+            # 'a, b,,c' -> {a,b,c}; NULL/empty -> {}
+            op.execute(f"""
+                ALTER TABLE {table} ALTER COLUMN {column} TYPE VARCHAR[]
+                USING COALESCE(
+                    array_remove(regexp_split_to_array(trim({column}), '\\s*,\\s*'), ''),
+                    '{{}}'::VARCHAR[]
+                );
+            """)
+            op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} SET DEFAULT '{{}}';")
+    for name, table, column in GIN_INDEXES:
+        op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ({column});")
+
+
+def downgrade() -> None:
+    for name, _table, _column in GIN_INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name};")
+    for table, columns in LIST_COLUMNS.items():
+        for column in columns:
+            op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} DROP DEFAULT;")
+            op.execute(f"""
+                ALTER TABLE {table} ALTER COLUMN {column} TYPE VARCHAR
+                USING array_to_string({column}, ',');
+            """)
+            op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} SET DEFAULT '';")
@@ -0,0 +1,36 @@
+"""add HNSW ANN index on memory_vectors.embedding
+
+Build parameters can be overridden at migration time via
+MEMORY_VECTOR_HNSW_M and MEMORY_VECTOR_HNSW_EF_CONSTRUCTION.
+Use scripts/memory_vector_index.py to rebuild with other settings or
+switch to IVFFlat.
+
+Revision ID: 20250521_memory_vectors_hnsw_index
+Revises: 20250518_create_memorydb_schema
+Create Date: 2025-05-21
+
+"""
+import os
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '20250521_memory_vectors_hnsw_index'
+down_revision = '20250518_create_memorydb_schema'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    m = int(os.environ.get("MEMORY_VECTOR_HNSW_M", "16"))
+    ef_construction = int(os.environ.get("MEMORY_VECTOR_HNSW_EF_CONSTRUCTION", "64"))
+    # Cosine ops to match the `<=>` operator used by /memory/nodes/search
+    op.execute(f"""
+        CREATE INDEX IF NOT EXISTS ix_memory_vectors_embedding_ann
+        ON memory_vectors USING hnsw (embedding vector_cosine_ops)
+        WITH (m = {m}, ef_construction = {ef_construction});
+    """)
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS ix_memory_vectors_embedding_ann;")
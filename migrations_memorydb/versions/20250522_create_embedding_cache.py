@@ -0,0 +1,30 @@
+"""create embedding_cache table
+
+Revision ID: 20250522_create_embedding_cache
+Revises: 20250521_memory_vectors_hnsw_index
+Create Date: 2025-05-22
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '20250522_create_embedding_cache'
+down_revision = '20250521_memory_vectors_hnsw_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS embedding_cache (
+            model VARCHAR NOT NULL,
+            text_hash VARCHAR(64) NOT NULL,
+            embedding vector(768) NOT NULL,
+            created_at TIMESTAMP,
+            PRIMARY KEY (model, text_hash)
+        );
+    """)
+
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS embedding_cache;")
@@ -1,7 +1,12 @@
 import requests
 import os
+import sys
 import json
 
+# Run as a file (python misc_scripts/<script>.py), so make the repo's scripts package importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from scripts.llm_cache import cached_completion
+
 # Determine API base URL based on environment
 
 def get_default_api_base():
@@ -42,27 +47,32 @@ Given the following rule proposal, suggest feedback (accept, reject, needs_chang
         + json.dumps(proposal, indent=2)
     )
     payload = json.dumps({"model": MODEL, "prompt": prompt})
-    resp = requests.post(
-        OLLAMA_URL,
-        data=payload,
-        headers={"Content-Type": "application/json"},
-        timeout=120,
-        stream=True,
-    )
-    resp.raise_for_status()
 
-    # Collect all 'response' fields from the stream
-    response_text = ""
-    for line in resp.iter_lines():
-        if not line:
-            continue
-        try:
-            data = json.loads(line.decode("utf-8"))
-            response_text += data.get("response", "")
-            if data.get("done", False):
-                break
-        except Exception as e:
-            continue
+    def generate():
+        resp = requests.post(
+            OLLAMA_URL,
+            data=payload,
+            headers={"Content-Type": "application/json"},
+            timeout=120,
+            stream=True,
+        )
+        resp.raise_for_status()
+
+        # Collect all 'response' fields from the stream
+        response_text = ""
+        for line in resp.iter_lines():
+            if not line:
+                continue
+            try:
+                data = json.loads(line.decode("utf-8"))
+                response_text += data.get("response", "")
+                if data.get("done", False):
+                    break
+            except Exception as e:
+                continue
+        return response_text
+
+    response_text = cached_completion(MODEL, prompt, generate)
 
     # Try to parse JSON from LLM output
     try:
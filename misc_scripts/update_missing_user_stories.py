@@ -1,7 +1,12 @@
 import os
+import sys
 import requests
 from tqdm import tqdm
 
+# Run as a file (python misc_scripts/<script>.py), so make the repo's scripts package importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from scripts.llm_cache import cached_completion
+
 RULE_API_URL = os.environ.get("RULE_API_URL", "http://api:8000/rules")
 ENHANCEMENT_API_URL = os.environ.get("ENHANCEMENT_API_URL", "http://api:8000/enhancements")
 OLLAMA_URL = os.environ.get("OLLAMA_URL", "http://host.docker.internal:11434/api/generate")
@@ -31,10 +36,14 @@ Diff: {item.get('diff', '')}
         "prompt": prompt,
         "stream": False
     }
-    resp = requests.post(OLLAMA_URL, json=data)
-    resp.raise_for_status()
-    result = resp.json()
-    return result.get("response", "").strip()
+
+    def generate():
+        resp = requests.post(OLLAMA_URL, json=data)
+        resp.raise_for_status()
+        result = resp.json()
+        return result.get("response", "").strip()
+
+    return cached_completion(OLLAMA_MODEL, prompt, generate)
 
 
 def update_user_story_rule(rule_id, user_story):
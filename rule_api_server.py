@@ -1,20 +1,29 @@
+import asyncio
+import base64
+import hashlib
 import json
 import logging
 import os
-import shutil
-import tempfile
+import queue
+import socket
+import time
 import uuid
-from datetime import datetime
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 import re
 
 from fastapi import (Body, Depends, FastAPI, File, Form, HTTPException, Path,
                      UploadFile, Request, Header)
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, Response
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel, Field
-from sqlalchemy.orm import Session
-import requests
+from sqlalchemy.orm import Session, defer
+import sqlalchemy as sa
+import httpx
 import secrets
 from fastapi.exceptions import RequestValidationError
 from fastapi.exception_handlers import RequestValidationError as FastAPIRequestValidationError
@@ -24,10 +33,13 @@ from db import BugReport as DBBugReport
 from db import Enhancement as DBEnhancement
 from db import Proposal as DBProposal
 from db import Rule as DBRule
+from db import RuleChange
 from db import SessionLocal, StatusEnum, init_db
+from db import engine as rules_engine
 from rule_proposal_feedback import FeedbackType, RuleProposalFeedback
-from db import MemorySessionLocal, MemoryVector, MemoryEdge, init_memorydb
-from db import ApiErrorLog, ApiAccessToken
+from db import MemorySessionLocal, MemoryVector, MemoryEdge, EmbeddingCache, init_memorydb
+from db import ApiErrorLog, ApiErrorRollup, ApiAccessToken
+from db import LlmJob as DBLlmJob
 from db import UseCase
 from db import ProjectOnboardingProgress
 import threading
@@ -200,21 +212,29 @@ def save_json(path, data):
 
 
 # Utility functions for categories/tags
+# Rules, proposals, rule versions and enhancements store these as Postgres arrays
+# (db.StringList); use cases still use comma-separated strings.
 # Hardened: If applies_to is a list of single characters spelling 'all', treat as ['all']
-def list_to_str(lst):
+def normalize_list(lst):
     if lst and isinstance(lst, list):
         # Fix: If applies_to is ['a','l','l'], treat as ['all']
         if len(lst) > 1 and all(isinstance(x, str) and len(x) == 1 for x in lst):
             joined = "".join(lst)
             if joined == "all":
-                return "all"
-        return ",".join(lst)
-    return ""
+                return ["all"]
+        return [x.strip() for x in lst if isinstance(x, str) and x.strip()]
+    return []
+
+
+def list_to_str(lst):
+    return ",".join(normalize_list(lst))
 
 
 def str_to_list(s):
     if not s:
         return []
+    if isinstance(s, (list, tuple)):
+        return [x.strip() for x in s if x and x.strip()]
     return [x.strip() for x in s.split(",") if x.strip()]
 
 
@@ -249,10 +269,10 @@ def propose_rule_change(proposal: RuleProposal, db: Session = Depends(get_db)):
         project=proposal.project,
         timestamp=ts,
         version=proposal.version,
-        categories=list_to_str(proposal.categories),
-        tags=list_to_str(proposal.tags),
+        categories=normalize_list(proposal.categories),
+        tags=normalize_list(proposal.tags),
         examples=proposal.examples,
-        applies_to=list_to_str(proposal.applies_to),
+        applies_to=normalize_list(proposal.applies_to),
         applies_to_rationale=proposal.applies_to_rationale,
         reason_for_change=proposal.reason_for_change,
         references=proposal.references,
@@ -308,80 +328,142 @@ def list_pending_proposals(db: Session = Depends(get_db)):
     return result
 
 
+def dialect_insert(db: Session):
+    """INSERT construct with ON CONFLICT support for the session's database."""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
+def rule_version_snapshot(rule) -> dict:
+    """Column values for the RuleVersion row that preserves `rule` before it is replaced."""
+    return {
+        "rule_id": rule.id,
+        "version": rule.version,
+        "rule_type": rule.rule_type,
+        "description": rule.description,
+        "diff": rule.diff,
+        "status": rule.status,
+        "submitted_by": rule.submitted_by,
+        "added_by": rule.added_by,
+        "project": rule.project,
+        "timestamp": rule.timestamp,
+        "categories": rule.categories,
+        "tags": rule.tags,
+        "examples": rule.examples,
+        "applies_to": rule.applies_to,
+        "applies_to_rationale": rule.applies_to_rationale,
+        "user_story": rule.user_story,
+    }
+
+
+def proposal_target_rule_id(proposal) -> str:
+    # Use rule_id for versioning if present
+    return proposal.rule_id if getattr(proposal, "rule_id", None) else proposal.id
+
+
+def rule_values_from_proposal(proposal, rule_id: str, version: int) -> dict:
+    """Column values for the Rule created when `proposal` is approved."""
+    ts = proposal.timestamp or datetime.utcnow()
+    if isinstance(ts, str):
+        ts = datetime.fromisoformat(ts)
+    return {
+        "id": rule_id,
+        "rule_type": proposal.rule_type,
+        "description": proposal.description,
+        "diff": proposal.diff,
+        "status": StatusEnum.approved,
+        "submitted_by": proposal.submitted_by,
+        "added_by": proposal.submitted_by,
+        "project": proposal.project,
+        "timestamp": ts,
+        "version": version,
+        "categories": normalize_list(proposal.categories),
+        "tags": normalize_list(proposal.tags),
+        "examples": proposal.examples,
+        "applies_to": normalize_list(proposal.applies_to),
+        "applies_to_rationale": proposal.applies_to_rationale,
+        "user_story": proposal.user_story,
+        # Optionally store reason_for_change, references, current_rule in Rule if desired
+    }
+
+
+APPROVE_MAX_ATTEMPTS = int(os.environ.get("APPROVE_MAX_ATTEMPTS", "5"))
+
+
+class RuleVersionConflict(Exception):
+    """A rule kept changing under concurrent approvals; the caller should retry."""
+
+
+def apply_proposal_to_rule(db: Session, proposal) -> int:
+    """
+    Write an approved proposal to its rule in place and return the new version.
+
+    An existing rule is updated with `version = version + 1`, guarded by the version
+    that was read (optimistic concurrency), and the replaced version is snapshotted
+    into RuleVersion in the same transaction. A new rule is inserted with ON CONFLICT
+    DO NOTHING. If a concurrent approval wins the race, the rule is re-read and the
+    write retried, so no update is lost and no row is deleted.
+    """
+    from db import RuleVersion
+
+    rule_id = proposal_target_rule_id(proposal)
+    rules = DBRule.__table__
+    for _ in range(APPROVE_MAX_ATTEMPTS):
+        # Core select: always the latest committed row, never a stale identity-map copy
+        current = db.execute(sa.select(rules).where(rules.c.id == rule_id)).first()
+        if current is None:
+            inserted = db.execute(
+                dialect_insert(db)(DBRule)
+                .values(**rule_values_from_proposal(proposal, rule_id, 1))
+                .on_conflict_do_nothing(index_elements=["id"])
+            )
+            if inserted.rowcount:
+                return 1
+            continue
+        values = rule_values_from_proposal(proposal, rule_id, current.version + 1)
+        del values["id"]
+        values["version"] = DBRule.version + 1
+        updated = db.execute(
+            sa.update(DBRule)
+            .where(DBRule.id == rule_id, DBRule.version == current.version)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        if updated.rowcount:
+            db.execute(sa.insert(RuleVersion).values(**rule_version_snapshot(current)))
+            return current.version + 1
+    raise RuleVersionConflict(rule_id)
+
+
 # Endpoint: Approve a proposal (with versioning)
 @app.post("/approve-rule-change/{proposal_id}")
 def approve_rule_change(
     proposal_id: str = Path(..., description="Proposal ID"),
     db: Session = Depends(get_db),
 ):
-    from db import RuleVersion
-
     proposal = db.query(DBProposal).filter(DBProposal.id == proposal_id).first()
-    logger.info(
-        f"APPROVE: proposal.id={proposal.id}, proposal.rule_id={getattr(proposal, 'rule_id', None)}, payload={proposal.__dict__}"
-    )
     if not proposal:
         raise HTTPException(status_code=404, detail="Proposal not found.")
-    if proposal.status != StatusEnum.pending:
-        raise HTTPException(status_code=400, detail="Proposal already processed.")
-    proposal.status = StatusEnum.approved
-    # Use rule_id for versioning if present
-    target_rule_id = (
-        proposal.rule_id if getattr(proposal, "rule_id", None) else proposal.id
-    )
-    existing_rule = db.query(DBRule).filter(DBRule.id == target_rule_id).first()
-    logger.info(
-        f"APPROVE: existing_rule for id={target_rule_id}: {existing_rule.__dict__ if existing_rule else None}"
-    )
-    new_version = 1
-    if existing_rule:
-        # Save previous version
-        db.add(
-            RuleVersion(
-                rule_id=existing_rule.id,
-                version=existing_rule.version,
-                rule_type=existing_rule.rule_type,
-                description=existing_rule.description,
-                diff=existing_rule.diff,
-                status=existing_rule.status,
-                submitted_by=existing_rule.submitted_by,
-                added_by=existing_rule.added_by,
-                project=existing_rule.project,
-                timestamp=existing_rule.timestamp,
-                categories=existing_rule.categories,
-                tags=existing_rule.tags,
-                examples=existing_rule.examples,
-            )
-        )
-        new_version = existing_rule.version + 1
-        db.delete(existing_rule)
-    # Add to rules
-    ts = proposal.timestamp
-    if isinstance(ts, str):
-        ts = datetime.fromisoformat(ts)
-    db_rule = DBRule(
-        id=target_rule_id,
-        rule_type=proposal.rule_type,
-        description=proposal.description,
-        diff=proposal.diff,
-        status=StatusEnum.approved,
-        submitted_by=proposal.submitted_by,
-        added_by=proposal.submitted_by,
-        project=proposal.project,
-        timestamp=ts,
-        version=new_version,
-        # Always store categories as comma-separated string, but return as list in API
-        categories=list_to_str(proposal.categories),
-        tags=list_to_str(proposal.tags),
-        examples=proposal.examples,
-        applies_to=list_to_str(proposal.applies_to),
-        applies_to_rationale=proposal.applies_to_rationale,
-        user_story=proposal.user_story,
-        # Optionally store reason_for_change, references, current_rule in Rule if desired
+    # Claim the proposal atomically so two concurrent approvals can't both apply it
+    claimed = db.execute(
+        sa.update(DBProposal)
+        .where(DBProposal.id == proposal_id, DBProposal.status == StatusEnum.pending)
+        .values(status=StatusEnum.approved)
+        .execution_options(synchronize_session=False)
     )
-    db.add(db_rule)
+    if not claimed.rowcount:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Proposal already processed.")
+    try:
+        new_version = apply_proposal_to_rule(db, proposal)
+    except RuleVersionConflict:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Rule is being changed concurrently; retry.")
     db.commit()
-    logger.info(f"APPROVE: new rule version for id={target_rule_id}: {new_version}")
+    logger.info(f"APPROVE: proposal {proposal_id} -> rule {proposal_target_rule_id(proposal)} v{new_version}")
     return {"message": "Proposal approved and rule added.", "version": new_version}
 
 
@@ -401,40 +483,273 @@ def reject_rule_change(
     return {"message": "Proposal rejected."}
 
 
+# Bulk moderation: one transaction, batched loads and inserts
+BULK_MODERATION_MAX = int(os.environ.get("BULK_MODERATION_MAX", "10000"))
+BULK_MODERATION_CHUNK = 1000  # ids per IN (...) / rows per executemany
+
+
+class BulkModerationFilter(BaseModel):
+    project: Optional[str] = None
+    rule_type: Optional[str] = None
+    submitted_by: Optional[str] = None
+    submitted_before: Optional[datetime] = None
+
+
+class BulkModerationRequest(BaseModel):
+    action: str = Field(..., description="approve or reject")
+    # Either explicit proposal ids, or a filter over pending proposals
+    proposal_ids: Optional[List[str]] = None
+    filter: Optional[BulkModerationFilter] = None
+    limit: Optional[int] = None
+
+
+def _chunks(items: list, size: int = BULK_MODERATION_CHUNK):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _sort_by_request_order(results: list, proposal_ids: List[str]):
+    order = {proposal_id: i for i, proposal_id in enumerate(proposal_ids)}
+    results.sort(key=lambda r: order[r["proposal_id"]])
+
+
+def load_bulk_moderation_targets(db: Session, request: BulkModerationRequest):
+    """Returns (proposals to moderate, per-item results for ids that can't be moderated)."""
+    limit = min(request.limit or BULK_MODERATION_MAX, BULK_MODERATION_MAX)
+    results = []
+    if request.proposal_ids is not None:
+        ids = list(dict.fromkeys(request.proposal_ids))
+        if len(ids) > limit:
+            raise HTTPException(status_code=400, detail=f"At most {limit} proposals per request.")
+        found = {}
+        for chunk in _chunks(ids):
+            for p in db.query(DBProposal).filter(DBProposal.id.in_(chunk)).with_for_update():
+                found[p.id] = p
+        proposals = []
+        for proposal_id in ids:
+            p = found.get(proposal_id)
+            if p is None:
+                results.append({"proposal_id": proposal_id, "status": "not_found"})
+            elif p.status != StatusEnum.pending:
+                results.append({"proposal_id": proposal_id, "status": "already_processed"})
+            else:
+                proposals.append(p)
+        return proposals, results
+    f = request.filter or BulkModerationFilter()
+    q = db.query(DBProposal).filter(DBProposal.status == StatusEnum.pending)
+    if f.project:
+        q = q.filter(DBProposal.project == f.project)
+    if f.rule_type:
+        q = q.filter(DBProposal.rule_type == f.rule_type)
+    if f.submitted_by:
+        q = q.filter(DBProposal.submitted_by == f.submitted_by)
+    if f.submitted_before:
+        q = q.filter(DBProposal.timestamp < f.submitted_before)
+    proposals = q.order_by(DBProposal.timestamp, DBProposal.id).limit(limit).with_for_update().all()
+    return proposals, results
+
+
+# Endpoint: Approve or reject many proposals in one transaction
+@app.post("/bulk-moderate-rule-changes")
+def bulk_moderate_rule_changes(request: BulkModerationRequest, db: Session = Depends(get_db)):
+    """
+    Approves or rejects the given proposals (or all pending proposals matching `filter`)
+    atomically. Target rules are loaded in batches, version snapshots and new rules are
+    bulk-inserted, and each proposal gets its own outcome in `results`. A proposal whose
+    new rule was created concurrently by another approval is reported as `conflict` and
+    left pending, while the rest of the batch is applied.
+    """
+    from db import RuleVersion
+
+    if request.action not in ("approve", "reject"):
+        raise HTTPException(status_code=400, detail="action must be 'approve' or 'reject'.")
+    proposals, results = load_bulk_moderation_targets(db, request)
+    if request.action == "reject":
+        for chunk in _chunks([p.id for p in proposals]):
+            db.execute(sa.update(DBProposal).where(DBProposal.id.in_(chunk)).values(status=StatusEnum.rejected))
+        db.commit()
+        results.extend({"proposal_id": p.id, "status": "rejected"} for p in proposals)
+        if request.proposal_ids is not None:
+            _sort_by_request_order(results, request.proposal_ids)
+        return {"action": "reject", "processed": len(proposals), "results": results}
+
+    # Several proposals may target the same rule; apply them oldest first
+    proposals.sort(key=lambda p: (p.timestamp or datetime.min, p.id))
+    target_ids = list(dict.fromkeys(proposal_target_rule_id(p) for p in proposals))
+    rules = DBRule.__table__
+    current = {}
+    for chunk in _chunks(target_ids):
+        # Row locks keep concurrent single approvals from interleaving with this batch
+        for rule in db.execute(sa.select(rules).where(rules.c.id.in_(chunk)).with_for_update()):
+            current[rule.id] = rule_version_snapshot(rule)
+    existing = set(current)
+    snapshots = []
+    for p in proposals:
+        rule_id = proposal_target_rule_id(p)
+        previous = current.get(rule_id)
+        version = 1
+        if previous is not None:
+            snapshots.append(previous)
+            version = previous["version"] + 1
+        values = rule_values_from_proposal(p, rule_id, version)
+        # The next proposal for this rule snapshots this one
+        current[rule_id] = {**{k: v for k, v in values.items() if k != "id"}, "rule_id": rule_id}
+        results.append({"proposal_id": p.id, "status": "approved", "rule_id": rule_id, "version": version})
+    final_rules = [
+        {**{k: v for k, v in current[rule_id].items() if k != "rule_id"}, "id": rule_id} for rule_id in target_ids
+    ]
+    updated_rules = [row for row in final_rules if row["id"] in existing]
+    new_rules = [row for row in final_rules if row["id"] not in existing]
+    created = set()
+    for chunk in _chunks(new_rules):
+        created.update(db.execute(
+            dialect_insert(db)(rules).values(chunk).on_conflict_do_nothing(index_elements=["id"]).returning(rules.c.id)
+        ).scalars())
+    # A concurrent approval created these rules first: their proposals stay pending
+    conflicts = {row["id"] for row in new_rules} - created
+    if conflicts:
+        snapshots = [s for s in snapshots if s["rule_id"] not in conflicts]
+        proposals = [p for p in proposals if proposal_target_rule_id(p) not in conflicts]
+        results = [
+            {"proposal_id": r["proposal_id"], "status": "conflict", "rule_id": r["rule_id"]}
+            if r.get("rule_id") in conflicts else r
+            for r in results
+        ]
+    for chunk in _chunks(snapshots):
+        db.execute(sa.insert(RuleVersion), chunk)
+    # Existing rules are updated in place (ORM bulk UPDATE by primary key)
+    for chunk in _chunks(updated_rules):
+        db.execute(sa.update(DBRule), chunk)
+    for chunk in _chunks([p.id for p in proposals]):
+        db.execute(sa.update(DBProposal).where(DBProposal.id.in_(chunk)).values(status=StatusEnum.approved))
+    db.commit()
+    logger.info(
+        f"BULK APPROVE: {len(proposals)} proposal(s), {len(updated_rules)} rule(s) updated, "
+        f"{len(created)} created, {len(snapshots)} snapshot(s), {len(conflicts)} conflict(s)"
+    )
+    if request.proposal_ids is not None:
+        _sort_by_request_order(results, request.proposal_ids)
+    return {"action": "approve", "processed": len(proposals), "results": results}
+
+
+# Keyset pagination helpers for /rules (cursor is "<timestamp>,<id>")
+RULES_PAGE_MAX_LIMIT = 1000
+
+
+def encode_rule_cursor(rule) -> str:
+    return f"{rule.timestamp.isoformat()},{rule.id}"
+
+
+def decode_rule_cursor(cursor: str):
+    try:
+        ts, rule_id = cursor.split(",", 1)
+        return datetime.fromisoformat(ts), rule_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid 'after' cursor.")
+
+
 # Endpoint: List all rules (for reference)
 @app.get("/rules", response_model=List[Rule])
 def list_rules(
+    response: Response,
     project: Optional[str] = None,
     category: Optional[str] = None,
     tag: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: Optional[int] = None,
     db: Session = Depends(get_db),
 ):
+    """
+    List rules, filtered in SQL by project, category (comma-separated, any match) and tag.
+    Supports keyset pagination: pass `limit` and the `X-Next-Cursor` header value of the
+    previous page as `after` (format: `<timestamp>,<id>`).
+    """
     query = db.query(DBRule)
     if project:
         query = query.filter(DBRule.project == project)
-    rules = query.all()
-    result = []
     # Support multi-category filtering
-    category_list = [c.strip() for c in category.split(",")] if category else []
-    for r in rules:
-        data = r.__dict__.copy()
-        if isinstance(data.get("timestamp"), datetime):
-            data["timestamp"] = data["timestamp"].isoformat()
-        # Always return categories as a list
-        data["categories"] = str_to_list(getattr(r, "categories", ""))
-        data["tags"] = str_to_list(getattr(r, "tags", ""))
-        data["applies_to"] = str_to_list(getattr(r, "applies_to", ""))
-        data["applies_to_rationale"] = data.get("applies_to_rationale", "")
-        # Filtering by category/tag
-        if category_list and not any(
-            cat in data["categories"] for cat in category_list
-        ):
-            continue
-        if tag and tag not in data["tags"]:
-            continue
-        data["user_story"] = r.user_story
-        result.append(Rule(**data))
-    return result
+    category_list = [c.strip() for c in category.split(",") if c.strip()] if category else []
+    if category_list:
+        query = query.filter(DBRule.categories.overlap(category_list))
+    if tag:
+        query = query.filter(DBRule.tags.overlap([tag]))
+    if after:
+        after_ts, after_id = decode_rule_cursor(after)
+        query = query.filter(sa.tuple_(DBRule.timestamp, DBRule.id) > (after_ts, after_id))
+    query = query.order_by(DBRule.timestamp, DBRule.id)
+    if limit is not None:
+        if limit < 1 or limit > RULES_PAGE_MAX_LIMIT:
+            raise HTTPException(
+                status_code=400,
+                detail=f"'limit' must be between 1 and {RULES_PAGE_MAX_LIMIT}.",
+            )
+        query = query.limit(limit)
+    rules = query.all()
+    if limit is not None and len(rules) == limit:
+        response.headers["X-Next-Cursor"] = encode_rule_cursor(rules[-1])
+    return [rule_model(r) for r in rules]
+
+
+def rule_model(r) -> Rule:
+    data = r.__dict__.copy()
+    if isinstance(data.get("timestamp"), datetime):
+        data["timestamp"] = data["timestamp"].isoformat()
+    # Always return categories as a list
+    data["categories"] = str_to_list(getattr(r, "categories", ""))
+    data["tags"] = str_to_list(getattr(r, "tags", ""))
+    data["applies_to"] = str_to_list(getattr(r, "applies_to", ""))
+    data["applies_to_rationale"] = data.get("applies_to_rationale", "")
+    data["user_story"] = r.user_story
+    return Rule(**data)
+
+
+RULE_CHANGES_MAX_LIMIT = 1000
+
+
+# Endpoint: Delta sync feed of rule changes since a watermark
+@app.get("/rules/changes")
+def list_rule_changes(
+    since: int = 0,
+    limit: int = 500,
+    project: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Rules created, updated or deleted after the `since` watermark, in change order.
+    Start with since=0 (full sync), then pass back `next_since`; repeat while `has_more`.
+    Deleted rules come back as tombstones (`"deleted": true`). With `project`, rules
+    outside the project are tombstones too, so a rule moved to another project leaves
+    the client's set.
+
+    Sequence numbers are drawn at commit time by a deferred trigger under a short
+    advisory lock, so they follow commit order; rule writers only queue behind
+    each other while committing.
+    """
+    if since < 0:
+        raise HTTPException(status_code=400, detail="'since' must be >= 0.")
+    if limit < 1 or limit > RULE_CHANGES_MAX_LIMIT:
+        raise HTTPException(status_code=400, detail=f"'limit' must be between 1 and {RULE_CHANGES_MAX_LIMIT}.")
+    rows = (
+        db.query(RuleChange, DBRule)
+        .outerjoin(DBRule, DBRule.id == RuleChange.rule_id)
+        .filter(RuleChange.seq > since)
+        .order_by(RuleChange.seq)
+        .limit(limit + 1)
+        .all()
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    changes = []
+    for change, rule in rows:
+        if rule is None or change.deleted or (project and rule.project != project):
+            changes.append({"seq": change.seq, "id": change.rule_id, "deleted": True})
+        else:
+            changes.append({"seq": change.seq, "id": rule.id, "deleted": False, "rule": rule_model(rule)})
+    return {
+        "changes": changes,
+        "next_since": rows[-1][0].seq if rows else since,
+        "has_more": has_more,
+    }
 
 
 # Endpoint: List all rules in MDC format (as a list of strings)
@@ -455,11 +770,8 @@ def review_code_files(files: list[UploadFile] = File(...)):
     """
     results = {}
     for upload in files:
-        with tempfile.NamedTemporaryFile(delete=False) as tmp:
-            shutil.copyfileobj(upload.file, tmp)
-            tmp_path = tmp.name
-        suggestions = suggest_rules.scan_file(tmp_path)
-        results[upload.filename] = suggestions
+        content = upload.file.read().decode("utf-8", errors="ignore")
+        results[upload.filename] = suggest_rules.scan_content(upload.filename, content)
     return JSONResponse(content=results)
 
 
@@ -469,14 +781,26 @@ def review_code_snippet(filename: str = Body(...), code: str = Body(...)):
     """
     Accepts a filename and code string, runs rule suggestion/linting, returns suggestions.
     """
-    import tempfile
-
-    suggestions = []
-    # Write code to a temp file and use scan_file
-    with tempfile.NamedTemporaryFile(suffix=".py", mode="w+", delete=False) as tmp:
-        tmp.write(code)
-        tmp.flush()
-        suggestions = suggest_rules.scan_file(tmp.name)
+    suggestions = suggest_rules.scan_content(filename, code)
+    return JSONResponse(content=suggestions)
+
+
+class DiffReviewRequest(BaseModel):
+    diff: str
+    # Post-change contents by path; when a file is missing only its added lines are checked
+    files: Optional[Dict[str, str]] = None
+    project: Optional[str] = None
+
+
+# Endpoint: Review only the lines changed by a unified diff (pre-commit / CI)
+@app.post("/review-code-diff")
+def review_code_diff(request: DiffReviewRequest):
+    """
+    Runs the rule checkers only over the changed regions of a unified diff and their enclosing scopes.
+    Returns a list of suggestions for touched lines.
+    """
+    files = request.files or {}
+    suggestions = suggest_rules.scan_diff(request.diff, read_file=files.get, project=request.project)
     return JSONResponse(content=suggestions)
 
 
@@ -562,8 +886,8 @@ def suggest_enhancement(enh: EnhancementModel, db: Session = Depends(get_db)):
         description=enh.description,
         suggested_by=enh.suggested_by,
         page=enh.page,
-        tags=",".join(enh.tags) if enh.tags else "",
-        categories=",".join(enh.categories) if enh.categories else "",
+        tags=normalize_list(enh.tags),
+        categories=normalize_list(enh.categories),
         timestamp=ts,
         project=enh.project,
         examples=enh.examples,  # New field
@@ -625,7 +949,7 @@ def enhancement_to_proposal(enhancement_id: str, db: Session = Depends(get_db)):
         version=1,
         categories=enh.categories,
         tags=enh.tags,
-        applies_to=list_to_str(enh.applies_to),
+        applies_to=normalize_list(enh.applies_to),
         applies_to_rationale=enh.applies_to_rationale,
     )
     db.add(proposal)
@@ -769,7 +1093,7 @@ def update_rule(rule_id: str, update: RuleUpdate, db: Session = Depends(get_db))
     data = update.dict(exclude_unset=True)
     for field, value in data.items():
         if field in ["categories", "tags", "applies_to"] and value is not None:
-            setattr(rule, field, list_to_str(value))
+            setattr(rule, field, normalize_list(value))
         elif value is not None:
             setattr(rule, field, value)
     db.commit()
@@ -839,45 +1163,152 @@ def list_rule_proposal_feedback(
     ]
 
 
+# --- Shared upstream HTTP clients ---
+class UpstreamClient:
+    """
+    Pooled HTTP client for one upstream service. Async handlers use `post`;
+    sync code running in worker threads uses `post_sync`. Both reuse keep-alive
+    connections, and `max_concurrency` caps in-flight requests per pool so a slow
+    upstream queues its own callers (up to the pool timeout) instead of
+    tying up the whole worker.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, timeout: float, connect_timeout: float = 10.0):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self._lock = threading.Lock()
+        self._sync_client = None
+        # One AsyncClient per event loop: pooled connections are bound to the loop that opened them
+        self._async_clients = weakref.WeakKeyDictionary()
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency)
+
+    def _async_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(limits=self._limits(), timeout=self.timeout)
+            self._async_clients[loop] = client
+        return client
+
+    def timeout_with_read(self, read: float) -> httpx.Timeout:
+        """The pool's timeout with only the read timeout replaced, for calls with their own budget."""
+        return httpx.Timeout(connect=self.timeout.connect, read=read, write=self.timeout.write, pool=self.timeout.pool)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self._async_client().post(url, **kwargs)
+
+    def post_sync(self, url: str, **kwargs) -> httpx.Response:
+        with self._lock:
+            if self._sync_client is None:
+                self._sync_client = httpx.Client(limits=self._limits(), timeout=self.timeout)
+        return self._sync_client.post(url, **kwargs)
+
+    async def aclose(self):
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+        with self._lock:
+            if self._sync_client is not None:
+                self._sync_client.close()
+                self._sync_client = None
+
+
 # Pass-through endpoint to Ollama LLM functions service
 OLLAMA_FUNCTIONS_URL = os.environ.get("OLLAMA_FUNCTIONS_URL", "http://ollama-functions:8000")
+OLLAMA_FUNCTIONS_MAX_CONCURRENCY = int(os.environ.get("OLLAMA_FUNCTIONS_MAX_CONCURRENCY", "4"))
+OLLAMA_FUNCTIONS_TIMEOUT = float(os.environ.get("OLLAMA_FUNCTIONS_TIMEOUT", "180"))
+
+ollama_functions_client = UpstreamClient(
+    "ollama-functions", OLLAMA_FUNCTIONS_MAX_CONCURRENCY, OLLAMA_FUNCTIONS_TIMEOUT
+)
+
+async def call_suggest_llm_rules(payload):
+    resp = await ollama_functions_client.post(f"{OLLAMA_FUNCTIONS_URL}/suggest-llm-rules", json=payload)
+    resp.raise_for_status()
+    return resp.json()
+
 
 @app.post("/suggest-llm-rules")
 async def passthrough_suggest_llm_rules(request: Request):
     """
     Pass-through endpoint to the Ollama LLM functions service.
+    For long runs, submit to POST /jobs/suggest-llm-rules instead.
     """
     try:
         payload = await request.json()
-        resp = requests.post(f"{OLLAMA_FUNCTIONS_URL}/suggest-llm-rules", json=payload, timeout=120)
+        return await call_suggest_llm_rules(payload)
+    except Exception as e:
+        return {"error": str(e)}
+
+
+# Per-request fan-out for /review-code-files-llm (the shared pool still caps the upstream overall)
+REVIEW_FILES_CONCURRENCY = int(os.environ.get("REVIEW_FILES_CONCURRENCY", "4"))
+REVIEW_FILE_TIMEOUT = float(os.environ.get("REVIEW_FILE_TIMEOUT", "120"))
+
+
+async def review_one_file(filename: str, content: bytes, content_type: str, semaphore: asyncio.Semaphore):
+    """Review a single file; failures and timeouts become error feedback for that file only."""
+    files_payload = {"file": (filename, content, content_type)}
+    try:
+        async with semaphore:
+            resp = await asyncio.wait_for(
+                ollama_functions_client.post(
+                    f"{OLLAMA_FUNCTIONS_URL}/review-code-file",
+                    files=files_payload,
+                    timeout=ollama_functions_client.timeout_with_read(REVIEW_FILE_TIMEOUT),
+                ),
+                REVIEW_FILE_TIMEOUT,
+            )
         resp.raise_for_status()
         return resp.json()
+    except asyncio.TimeoutError:
+        return [f"[ERROR] ollama-functions call timed out after {REVIEW_FILE_TIMEOUT:g}s"]
     except Exception as e:
-        return {"error": str(e)}
+        return [f"[ERROR] ollama-functions call failed: {e}"]
+
+
+def start_file_reviews(uploads):
+    """Schedule a review task per (filename, content, content_type); each resolves to (filename, feedback)."""
+    semaphore = asyncio.Semaphore(REVIEW_FILES_CONCURRENCY)
+
+    async def review(filename, content, content_type):
+        return filename, await review_one_file(filename, content, content_type, semaphore)
+
+    return [asyncio.ensure_future(review(*item)) for item in uploads]
+
+
+async def review_uploads(uploads) -> dict:
+    # Keep results in upload order
+    return dict(await asyncio.gather(*start_file_reviews(uploads)))
 
 
 @app.post("/review-code-files-llm")
-def review_code_files_llm(files: list[UploadFile] = File(...)):
+async def review_code_files_llm(files: list[UploadFile] = File(...), stream: bool = False):
     """
     Accepts multiple files, sends each file to the ollama-functions service for LLM review, and returns feedback per file.
+    Files are reviewed concurrently (REVIEW_FILES_CONCURRENCY at a time). With `stream=true` the response is
+    NDJSON, one {"filename", "feedback"} line per file in completion order.
     """
-    import requests
-    import os
-    import json
-
-    OLLAMA_FUNCTIONS_URL = os.environ.get("OLLAMA_FUNCTIONS_URL", "http://ollama-functions:8000")
-    results = {}
+    uploads = []
     for upload in files:
-        upload.file.seek(0)
-        files_payload = {"file": (upload.filename, upload.file.read(), upload.content_type or "text/plain")}
+        await upload.seek(0)
+        uploads.append((upload.filename, await upload.read(), upload.content_type or "text/plain"))
+    if not stream:
+        return JSONResponse(content=await review_uploads(uploads))
+    tasks = start_file_reviews(uploads)
+
+    async def ndjson():
         try:
-            resp = requests.post(f"{OLLAMA_FUNCTIONS_URL}/review-code-file", files=files_payload, timeout=120)
-            resp.raise_for_status()
-            feedback = resp.json()
-        except Exception as e:
-            feedback = [f"[ERROR] ollama-functions call failed: {e}"]
-        results[upload.filename] = feedback
-    return JSONResponse(content=results)
+            for next_done in asyncio.as_completed(tasks):
+                filename, feedback = await next_done
+                yield json.dumps({"filename": filename, "feedback": feedback}) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
 
 
 # Run with: uvicorn rule_api_server:app --reload
@@ -904,7 +1335,7 @@ def update_enhancement(enhancement_id: str, update: EnhancementUpdate, db: Sessi
     data = update.dict(exclude_unset=True)
     for field, value in data.items():
         if field in ["categories", "tags"] and value is not None:
-            setattr(enh, field, list_to_str(value))
+            setattr(enh, field, normalize_list(value))
         elif value is not None:
             setattr(enh, field, value)
     db.commit()
@@ -958,23 +1389,171 @@ class MemoryEdgeOut(BaseModel):
 # Helper to generate embedding using Ollama
 OLLAMA_EMBEDDING_URL = "http://host.docker.internal:11434/api/embeddings"
 OLLAMA_EMBEDDING_MODEL = "nomic-embed-text:latest"
+OLLAMA_EMBEDDING_MAX_CONCURRENCY = int(os.environ.get("OLLAMA_EMBEDDING_MAX_CONCURRENCY", "8"))
+OLLAMA_EMBEDDING_TIMEOUT = float(os.environ.get("OLLAMA_EMBEDDING_TIMEOUT", "300"))
+
+ollama_embedding_client = UpstreamClient("ollama", OLLAMA_EMBEDDING_MAX_CONCURRENCY, OLLAMA_EMBEDDING_TIMEOUT)
+
+
+@app.on_event("shutdown")
+async def close_upstream_clients():
+    await ollama_functions_client.aclose()
+    await ollama_embedding_client.aclose()
 
 def get_embedding_ollama(text: str) -> List[float]:
-    response = requests.post(
+    response = ollama_embedding_client.post_sync(
         OLLAMA_EMBEDDING_URL,
         json={"model": OLLAMA_EMBEDDING_MODEL, "prompt": text}
     )
     response.raise_for_status()
     return response.json()["embedding"]
 
+
+# --- Embedding cache: in-process LRU in front of a persistent memorydb table ---
+EMBEDDING_CACHE_SIZE = int(os.environ.get("EMBEDDING_CACHE_SIZE", "2048"))
+EMBEDDING_CACHE_PERSIST = os.environ.get("EMBEDDING_CACHE_PERSIST", "true").lower() == "true"
+
+
+class EmbeddingLRUCache:
+    """Thread-safe LRU of (model, text_hash) -> embedding with hit/miss counters."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "db_hits": 0, "misses": 0, "db_errors": 0}
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def count(self, stat: str):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            lookups = self.stats["memory_hits"] + self.stats["db_hits"] + self.stats["misses"]
+            hits = self.stats["memory_hits"] + self.stats["db_hits"]
+            return {
+                **self.stats,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hit_rate": round(hits / lookups, 4) if lookups else None,
+                "persistent": EMBEDDING_CACHE_PERSIST,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            for stat in self.stats:
+                self.stats[stat] = 0
+
+
+embedding_cache = EmbeddingLRUCache(EMBEDDING_CACHE_SIZE)
+
+
+def embedding_text_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def get_embedding_cached(content: str) -> List[float]:
+    """
+    Return the embedding for `content`, consulting the in-process LRU, then the
+    embedding_cache table, and only then Ollama. Cache errors never fail the request.
+    """
+    key = (OLLAMA_EMBEDDING_MODEL, embedding_text_hash(content))
+    embedding = embedding_cache.get(key)
+    if embedding is not None:
+        embedding_cache.count("memory_hits")
+        return embedding
+    if EMBEDDING_CACHE_PERSIST:
+        session = MemorySessionLocal()
+        try:
+            row = session.query(EmbeddingCache.embedding).filter(
+                EmbeddingCache.model == key[0], EmbeddingCache.text_hash == key[1]
+            ).first()
+            if row is not None:
+                embedding = row[0]
+        except Exception as exc:
+            session.rollback()
+            embedding_cache.count("db_errors")
+            logger.warning("Embedding cache lookup failed: %s", exc)
+        finally:
+            session.close()
+        if embedding is not None:
+            embedding_cache.count("db_hits")
+            embedding_cache.put(key, embedding)
+            return embedding
+    embedding_cache.count("misses")
+    embedding = get_embedding_ollama(content)
+    embedding_cache.put(key, embedding)
+    if EMBEDDING_CACHE_PERSIST:
+        session = MemorySessionLocal()
+        try:
+            session.execute(
+                sa.text(
+                    "INSERT INTO embedding_cache (model, text_hash, embedding, created_at) "
+                    "VALUES (:model, :text_hash, CAST(:embedding AS vector), :created_at) "
+                    "ON CONFLICT (model, text_hash) DO NOTHING"
+                ),
+                {
+                    "model": key[0],
+                    "text_hash": key[1],
+                    "embedding": str(embedding),
+                    "created_at": datetime.utcnow(),
+                },
+            )
+            session.commit()
+        except Exception as exc:
+            session.rollback()
+            embedding_cache.count("db_errors")
+            logger.warning("Embedding cache write failed: %s", exc)
+        finally:
+            session.close()
+    return embedding
+
+
+@app.get("/memory/embedding-cache/stats")
+def get_embedding_cache_stats():
+    """Hit/miss counters for the embedding cache (since process start)."""
+    return embedding_cache.snapshot()
+
+def memory_node_out(db_node, include_embedding: bool = False, embedding=None) -> dict:
+    """Serialize a MemoryVector; the embedding is only read when explicitly requested."""
+    if include_embedding and embedding is None:
+        embedding = db_node.embedding
+    return {
+        "id": db_node.id,
+        "namespace": db_node.namespace,
+        "content": db_node.content,
+        "embedding": embedding if include_embedding else None,
+        "meta": db_node.meta,
+        "created_at": db_node.created_at,
+    }
+
+
 @app.post("/memory/nodes", response_model=MemoryNodeOut)
-def create_memory_node(node: MemoryNodeCreate):
+def create_memory_node(node: MemoryNodeCreate, include_embedding: bool = False):
     """
     Create a new memory node. The 'embedding' is always generated server-side from the 'content' field. Do NOT provide 'embedding' in the request body.
+    The embedding is only returned when `include_embedding=true`.
     """
     try:
         # Generate embedding from content
-        embedding = get_embedding_ollama(node.content)
+        embedding = get_embedding_cached(node.content)
         session = MemorySessionLocal()
         db_node = MemoryVector(
             namespace=node.namespace,
@@ -984,20 +1563,8 @@ def create_memory_node(node: MemoryNodeCreate):
         )
         session.add(db_node)
         session.commit()
-        session.refresh(db_node)
-        # --- Patch: ensure embedding is a list ---
-        embedding = db_node.embedding
-        if isinstance(embedding, str):
-            import ast
-            embedding = ast.literal_eval(embedding)
-        result = {
-            "id": db_node.id,
-            "namespace": db_node.namespace,
-            "content": db_node.content,
-            "embedding": embedding,
-            "meta": db_node.meta,
-            "created_at": db_node.created_at,
-        }
+        session.refresh(db_node, attribute_names=["id", "namespace", "content", "meta", "created_at"])
+        result = memory_node_out(db_node, include_embedding, embedding=embedding)
         session.close()
         return result
     except Exception as exc:
@@ -1006,27 +1573,238 @@ def create_memory_node(node: MemoryNodeCreate):
         logger.error(traceback.format_exc())
         raise
 
+# --- Batch memory node ingestion ---
+OLLAMA_EMBED_BATCH_URL = os.environ.get(
+    "OLLAMA_EMBED_BATCH_URL", OLLAMA_EMBEDDING_URL.replace("/api/embeddings", "/api/embed")
+)
+MEMORY_BATCH_MAX_ITEMS = int(os.environ.get("MEMORY_BATCH_MAX_ITEMS", "10000"))
+MEMORY_EMBED_BATCH_SIZE = int(os.environ.get("MEMORY_EMBED_BATCH_SIZE", "64"))
+MEMORY_EMBED_CONCURRENCY = int(os.environ.get("MEMORY_EMBED_CONCURRENCY", "4"))
+MEMORY_INSERT_CHUNK_SIZE = 1000
+
+
+class MemoryNodeBatchResult(BaseModel):
+    index: int
+    status: str  # "created" or "error"
+    id: Optional[str] = None
+    error: Optional[str] = None
+
+
+class MemoryNodeBatchOut(BaseModel):
+    created: int
+    failed: int
+    results: List[MemoryNodeBatchResult]
+
+
+def get_embeddings_ollama_batch(contents: List[str]) -> List[List[float]]:
+    response = ollama_embedding_client.post_sync(
+        OLLAMA_EMBED_BATCH_URL,
+        json={"model": OLLAMA_EMBEDDING_MODEL, "input": contents},
+    )
+    response.raise_for_status()
+    embeddings = response.json()["embeddings"]
+    if len(embeddings) != len(contents):
+        raise ValueError(f"Expected {len(contents)} embeddings, got {len(embeddings)}")
+    return embeddings
+
+
+def _embed_batch_isolating(batch: List[str]) -> List[object]:
+    """Embed a batch; if it fails, retry item by item so one bad input only fails itself."""
+    try:
+        return get_embeddings_ollama_batch(batch)
+    except Exception as exc:
+        logger.warning("Embedding batch of %d failed: %s", len(batch), exc)
+        if len(batch) == 1:
+            return [exc]
+    results = []
+    for content in batch:
+        try:
+            results.append(get_embeddings_ollama_batch([content])[0])
+        except Exception as exc:
+            results.append(exc)
+    return results
+
+
+def embed_many(contents: List[str]) -> Dict[str, object]:
+    """
+    Embed distinct texts, returning content -> embedding (or the Exception that
+    prevented it). Uses the embedding cache first, then sends the misses to Ollama
+    in batches of MEMORY_EMBED_BATCH_SIZE with at most MEMORY_EMBED_CONCURRENCY
+    batches in flight, and persists the new embeddings in one insert.
+    """
+    results: Dict[str, object] = {}
+    keys = {c: (OLLAMA_EMBEDDING_MODEL, embedding_text_hash(c)) for c in dict.fromkeys(contents)}
+    for content, key in keys.items():
+        cached = embedding_cache.get(key)
+        if cached is not None:
+            embedding_cache.count("memory_hits")
+            results[content] = cached
+    remaining = [c for c in keys if c not in results]
+    if remaining and EMBEDDING_CACHE_PERSIST:
+        by_hash = {keys[c][1]: c for c in remaining}
+        session = MemorySessionLocal()
+        try:
+            rows = session.query(EmbeddingCache.text_hash, EmbeddingCache.embedding).filter(
+                EmbeddingCache.model == OLLAMA_EMBEDDING_MODEL,
+                EmbeddingCache.text_hash.in_(list(by_hash)),
+            ).all()
+            for text_hash, embedding in rows:
+                content = by_hash[text_hash]
+                results[content] = embedding
+                embedding_cache.count("db_hits")
+                embedding_cache.put(keys[content], embedding)
+        except Exception as exc:
+            session.rollback()
+            embedding_cache.count("db_errors")
+            logger.warning("Embedding cache batch lookup failed: %s", exc)
+        finally:
+            session.close()
+        remaining = [c for c in remaining if c not in results]
+
+    fresh = {}
+    if remaining:
+        batches = [
+            remaining[i:i + MEMORY_EMBED_BATCH_SIZE]
+            for i in range(0, len(remaining), MEMORY_EMBED_BATCH_SIZE)
+        ]
+        with ThreadPoolExecutor(max_workers=max(1, MEMORY_EMBED_CONCURRENCY)) as pool:
+            futures = {pool.submit(_embed_batch_isolating, batch): batch for batch in batches}
+            for future, batch in futures.items():
+                for content, embedding in zip(batch, future.result()):
+                    results[content] = embedding
+                    if isinstance(embedding, Exception):
+                        continue
+                    embedding_cache.count("misses")
+                    embedding_cache.put(keys[content], embedding)
+                    fresh[content] = embedding
+
+    if fresh and EMBEDDING_CACHE_PERSIST:
+        session = MemorySessionLocal()
+        try:
+            now = datetime.utcnow()
+            session.execute(
+                sa.text(
+                    "INSERT INTO embedding_cache (model, text_hash, embedding, created_at) "
+                    "VALUES (:model, :text_hash, CAST(:embedding AS vector), :created_at) "
+                    "ON CONFLICT (model, text_hash) DO NOTHING"
+                ),
+                [
+                    {"model": keys[c][0], "text_hash": keys[c][1], "embedding": str(e), "created_at": now}
+                    for c, e in fresh.items()
+                ],
+            )
+            session.commit()
+        except Exception as exc:
+            session.rollback()
+            embedding_cache.count("db_errors")
+            logger.warning("Embedding cache batch write failed: %s", exc)
+        finally:
+            session.close()
+    return results
+
+
+def parse_memory_node_batch(body: bytes, content_type: str) -> List[object]:
+    """Accept a JSON array, {"nodes": [...]} or NDJSON (one node object per line)."""
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        items = []
+        for line in body.decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError as exc:
+                items.append(exc)
+        return items
+    try:
+        data = json.loads(body or b"null")
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON body: {exc}")
+    if isinstance(data, dict):
+        data = data.get("nodes")
+    if not isinstance(data, list):
+        raise HTTPException(
+            status_code=400,
+            detail="Body must be a JSON array of nodes, {\"nodes\": [...]}, or NDJSON.",
+        )
+    return data
+
+
+def ingest_memory_nodes(items: List[object]) -> MemoryNodeBatchOut:
+    results = [None] * len(items)
+    valid = []  # (index, MemoryNodeCreate)
+    for i, item in enumerate(items):
+        try:
+            if isinstance(item, Exception):
+                raise item
+            valid.append((i, MemoryNodeCreate(**item)))
+        except Exception as exc:
+            results[i] = MemoryNodeBatchResult(index=i, status="error", error=f"Invalid node: {exc}")
+
+    embeddings = embed_many([node.content for _, node in valid])
+    rows = []
+    for i, node in valid:
+        embedding = embeddings.get(node.content)
+        if isinstance(embedding, Exception) or embedding is None:
+            results[i] = MemoryNodeBatchResult(index=i, status="error", error=f"Embedding failed: {embedding}")
+            continue
+        rows.append((i, {
+            "id": str(uuid.uuid4()),
+            "namespace": node.namespace,
+            "content": node.content,
+            "embedding": embedding,
+            "meta": node.meta,
+            "created_at": datetime.utcnow(),
+        }))
+
+    session = MemorySessionLocal()
+    try:
+        for start in range(0, len(rows), MEMORY_INSERT_CHUNK_SIZE):
+            chunk = rows[start:start + MEMORY_INSERT_CHUNK_SIZE]
+            try:
+                with session.begin_nested():
+                    session.execute(MemoryVector.__table__.insert(), [row for _, row in chunk])
+                for i, row in chunk:
+                    results[i] = MemoryNodeBatchResult(index=i, status="created", id=row["id"])
+            except Exception as exc:
+                logger.warning("Memory node insert chunk failed: %s", exc)
+                for i, _ in chunk:
+                    results[i] = MemoryNodeBatchResult(index=i, status="error", error=f"Insert failed: {exc}")
+        session.commit()
+    finally:
+        session.close()
+
+    created = sum(1 for r in results if r.status == "created")
+    return MemoryNodeBatchOut(created=created, failed=len(results) - created, results=results)
+
+
+@app.post("/memory/nodes/batch", response_model=MemoryNodeBatchOut)
+async def create_memory_nodes_batch(request: Request):
+    """
+    Bulk-create memory nodes. Body is a JSON array of MemoryNodeCreate objects (or
+    {"nodes": [...]}) or NDJSON with Content-Type application/x-ndjson.
+    Embeddings are generated server-side in batches; every item gets its own result,
+    so invalid items or failed embeddings do not abort the rest of the batch.
+    """
+    body = await request.body()
+    items = parse_memory_node_batch(body, request.headers.get("content-type", ""))
+    if len(items) > MEMORY_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(items)} items (max {MEMORY_BATCH_MAX_ITEMS}).",
+        )
+    return await run_in_threadpool(ingest_memory_nodes, items)
+
+
 @app.get("/memory/nodes", response_model=List[MemoryNodeOut])
-def list_memory_nodes(namespace: Optional[str] = None):
+def list_memory_nodes(namespace: Optional[str] = None, include_embedding: bool = False):
     session = MemorySessionLocal()
     q = session.query(MemoryVector)
+    if not include_embedding:
+        q = q.options(defer(MemoryVector.embedding))
     if namespace:
         q = q.filter(MemoryVector.namespace == namespace)
     nodes = q.all()
-    result = []
-    for db_node in nodes:
-        embedding = db_node.embedding
-        if isinstance(embedding, str):
-            import ast
-            embedding = ast.literal_eval(embedding)
-        result.append({
-            "id": db_node.id,
-            "namespace": db_node.namespace,
-            "content": db_node.content,
-            "embedding": embedding,
-            "meta": db_node.meta,
-            "created_at": db_node.created_at,
-        })
+    result = [memory_node_out(db_node, include_embedding) for db_node in nodes]
     session.close()
     return result
 
@@ -1059,6 +1837,119 @@ def list_memory_edges(from_id: Optional[str] = None, to_id: Optional[str] = None
     session.close()
     return edges
 
+# --- Multi-hop traversal ---
+MEMORY_TRAVERSE_MAX_DEPTH = int(os.environ.get("MEMORY_TRAVERSE_MAX_DEPTH", "10"))
+MEMORY_TRAVERSE_MAX_RESULTS = int(os.environ.get("MEMORY_TRAVERSE_MAX_RESULTS", "1000"))
+# Upper bound on rows the recursive walk may produce before we stop reading it
+MEMORY_TRAVERSE_ROW_CAP = int(os.environ.get("MEMORY_TRAVERSE_ROW_CAP", "20000"))
+
+TRAVERSE_DIRECTIONS = ("out", "in", "both")
+
+
+class MemoryTraverseRequest(BaseModel):
+    start_ids: List[str] = Field(..., min_length=1)
+    max_depth: int = Field(3, ge=1, le=MEMORY_TRAVERSE_MAX_DEPTH)
+    relation_types: Optional[List[str]] = None
+    direction: str = "out"
+    limit: int = Field(200, ge=1, le=MEMORY_TRAVERSE_MAX_RESULTS, description="Max nodes returned")
+    include_embedding: bool = False
+
+
+class MemoryTraverseNodeOut(MemoryNodeOut):
+    depth: int
+
+
+class MemoryTraverseOut(BaseModel):
+    nodes: List[MemoryTraverseNodeOut]
+    edges: List[MemoryEdgeOut]
+    truncated: bool
+
+
+def build_traverse_sql(direction: str, filter_relations: bool) -> str:
+    """
+    Recursive CTE walking memory_edges from the start ids. Each row carries the
+    path so far; a step is skipped when its target is already on the path, which
+    keeps cycles from recursing forever.
+    """
+    if direction not in TRAVERSE_DIRECTIONS:
+        raise ValueError(f"direction must be one of {TRAVERSE_DIRECTIONS}")
+    steps = []
+    if direction in ("out", "both"):
+        steps.append("SELECT id, from_id AS src, to_id AS dst, relation_type FROM memory_edges")
+    if direction in ("in", "both"):
+        steps.append("SELECT id, to_id AS src, from_id AS dst, relation_type FROM memory_edges")
+    relation_filter = " AND s.relation_type = ANY(CAST(:relation_types AS varchar[]))" if filter_relations else ""
+    return (
+        "WITH RECURSIVE steps AS (" + " UNION ALL ".join(steps) + "), "
+        "walk(node_id, edge_id, depth, path) AS ("
+        " SELECT st.id, CAST(NULL AS varchar), 0, ARRAY[st.id]"
+        " FROM unnest(CAST(:start_ids AS varchar[])) AS st(id)"
+        " UNION ALL"
+        " SELECT s.dst, s.id, w.depth + 1, w.path || s.dst"
+        " FROM walk w JOIN steps s ON s.src = w.node_id"
+        " WHERE w.depth < :max_depth AND NOT s.dst = ANY(w.path)" + relation_filter +
+        ") SELECT node_id, edge_id, depth FROM walk LIMIT :row_cap"
+    )
+
+
+def collect_traversal(rows, limit: int):
+    """Reduce walk rows to {node_id: min depth} (nearest first, capped) and the edge ids used."""
+    depths = {}
+    edge_ids = set()
+    for node_id, edge_id, depth in rows:
+        if node_id not in depths or depth < depths[node_id]:
+            depths[node_id] = depth
+        if edge_id is not None:
+            edge_ids.add(edge_id)
+    ordered = sorted(depths.items(), key=lambda item: item[1])
+    kept = dict(ordered[:limit])
+    truncated = len(ordered) > limit
+    return kept, edge_ids, truncated
+
+
+# Endpoint: walk the memory graph from one or more nodes in a single query
+@app.post("/memory/graph/traverse", response_model=MemoryTraverseOut)
+def traverse_memory_graph(request: MemoryTraverseRequest):
+    if request.direction not in TRAVERSE_DIRECTIONS:
+        raise HTTPException(status_code=400, detail=f"direction must be one of {', '.join(TRAVERSE_DIRECTIONS)}")
+    sql = build_traverse_sql(request.direction, bool(request.relation_types))
+    params = {
+        "start_ids": request.start_ids,
+        "max_depth": request.max_depth,
+        "row_cap": MEMORY_TRAVERSE_ROW_CAP,
+    }
+    if request.relation_types:
+        params["relation_types"] = request.relation_types
+    session = MemorySessionLocal()
+    try:
+        rows = session.execute(text(sql), params).fetchall()
+        depths, edge_ids, truncated = collect_traversal(rows, request.limit)
+        truncated = truncated or len(rows) >= MEMORY_TRAVERSE_ROW_CAP
+        q = session.query(MemoryVector).filter(MemoryVector.id.in_(list(depths)))
+        if not request.include_embedding:
+            q = q.options(defer(MemoryVector.embedding))
+        nodes = [
+            dict(memory_node_out(db_node, request.include_embedding), depth=depths[db_node.id])
+            for db_node in q.all()
+        ]
+        nodes.sort(key=lambda n: n["depth"])
+        edges = []
+        if edge_ids:
+            for db_edge in session.query(MemoryEdge).filter(MemoryEdge.id.in_(list(edge_ids))).all():
+                # Drop edges leading to nodes cut by the limit
+                if db_edge.from_id in depths and db_edge.to_id in depths:
+                    edges.append({
+                        "id": db_edge.id,
+                        "from_id": db_edge.from_id,
+                        "to_id": db_edge.to_id,
+                        "relation_type": db_edge.relation_type,
+                        "meta": db_edge.meta,
+                        "created_at": db_edge.created_at,
+                    })
+    finally:
+        session.close()
+    return {"nodes": nodes, "edges": edges, "truncated": truncated}
+
 from sqlalchemy import text
 
 class MemoryNodeSearchRequest(BaseModel):
@@ -1072,6 +1963,29 @@ class MemoryNodeSearchRequest(BaseModel):
     embedding: Optional[List[float]] = None
     namespace: Optional[str] = None
     limit: int = 5
+    # ANN search-time tunables (recall vs latency); see scripts/memory_vector_index.py report
+    include_embedding: bool = False
+    ef_search: Optional[int] = Field(None, ge=1, le=1000, description="hnsw.ef_search for this query")
+    probes: Optional[int] = Field(None, ge=1, le=10000, description="ivfflat.probes for this query")
+
+
+# Server-wide defaults for the ANN tunables (unset = pgvector defaults)
+MEMORY_SEARCH_EF_SEARCH = os.environ.get("MEMORY_SEARCH_EF_SEARCH")
+MEMORY_SEARCH_PROBES = os.environ.get("MEMORY_SEARCH_PROBES")
+
+
+def apply_vector_search_settings(session, ef_search: Optional[int] = None, probes: Optional[int] = None):
+    """Set pgvector search parameters for the current transaction only."""
+    settings = {
+        "hnsw.ef_search": ef_search or MEMORY_SEARCH_EF_SEARCH,
+        "ivfflat.probes": probes or MEMORY_SEARCH_PROBES,
+    }
+    for name, value in settings.items():
+        if value:
+            session.execute(
+                text("SELECT set_config(:name, :value, true)"),
+                {"name": name, "value": str(int(value))},
+            )
 
 @app.post("/memory/nodes/search", response_model=List[MemoryNodeOut])
 def search_memory_nodes(request: MemoryNodeSearchRequest):
@@ -1083,35 +1997,26 @@ def search_memory_nodes(request: MemoryNodeSearchRequest):
     if not request.text and not request.embedding:
         raise HTTPException(status_code=400, detail="Must provide either 'text' or 'embedding' for search.")
     if request.text:
-        embedding = get_embedding_ollama(request.text)
+        embedding = get_embedding_cached(request.text)
     else:
         embedding = request.embedding
     session = MemorySessionLocal()
-    sql = "SELECT * FROM memory_vectors"
+    apply_vector_search_settings(session, request.ef_search, request.probes)
+    sql = "SELECT id FROM memory_vectors"
     if request.namespace:
         sql += " WHERE namespace = :namespace"
     sql += " ORDER BY embedding <=> CAST(:query_vec AS vector) LIMIT :limit"
-    params = {"query_vec": embedding, "limit": request.limit}
+    params = {"query_vec": str(embedding), "limit": request.limit}
     if request.namespace:
         params["namespace"] = request.namespace
-    results = session.execute(text(sql), params)
-    ids = [row[0] for row in results]
-    nodes = session.query(MemoryVector).filter(MemoryVector.id.in_(ids)).all()
+    ids = [row[0] for row in session.execute(text(sql), params)]
+    q = session.query(MemoryVector).filter(MemoryVector.id.in_(ids))
+    if not request.include_embedding:
+        q = q.options(defer(MemoryVector.embedding))
+    by_id = {db_node.id: db_node for db_node in q.all()}
+    # Keep nearest-first order from the similarity query
+    result = [memory_node_out(by_id[i], request.include_embedding) for i in ids if i in by_id]
     session.close()
-    result = []
-    for db_node in nodes:
-        embedding = db_node.embedding
-        if isinstance(embedding, str):
-            import ast
-            embedding = ast.literal_eval(embedding)
-        result.append({
-            "id": db_node.id,
-            "namespace": db_node.namespace,
-            "content": db_node.content,
-            "embedding": embedding,
-            "meta": db_node.meta,
-            "created_at": db_node.created_at,
-        })
     return result
 
 @app.delete("/memory/nodes")
@@ -1125,6 +2030,398 @@ def delete_memory_nodes(namespace: Optional[str] = None):
     session.close()
     return {"deleted": count, "namespace": namespace}
 
+# --- Error log writer: bounded queue drained by a background thread in batches ---
+ERROR_LOG_QUEUE_SIZE = int(os.environ.get("ERROR_LOG_QUEUE_SIZE", "10000"))
+ERROR_LOG_BATCH_SIZE = int(os.environ.get("ERROR_LOG_BATCH_SIZE", "200"))
+ERROR_LOG_FLUSH_INTERVAL = float(os.environ.get("ERROR_LOG_FLUSH_INTERVAL", "1.0"))
+# Identical errors (same path, method, status and message fingerprint) within a window: the first
+# ERROR_LOG_SAMPLE_BURST are written, then one in ERROR_LOG_SAMPLE_RATE.
+ERROR_LOG_SAMPLE_WINDOW = float(os.environ.get("ERROR_LOG_SAMPLE_WINDOW", "60"))
+ERROR_LOG_SAMPLE_BURST = int(os.environ.get("ERROR_LOG_SAMPLE_BURST", "10"))
+ERROR_LOG_SAMPLE_RATE = int(os.environ.get("ERROR_LOG_SAMPLE_RATE", "100"))
+# Raw logs live in monthly partitions that are dropped after ERROR_LOG_RETENTION_DAYS;
+# hourly rollups (which count sampled-out errors too) are kept for ERROR_ROLLUP_RETENTION_DAYS.
+ERROR_LOG_RETENTION_DAYS = int(os.environ.get("ERROR_LOG_RETENTION_DAYS", "90"))  # 0 = keep forever
+ERROR_ROLLUP_RETENTION_DAYS = int(os.environ.get("ERROR_ROLLUP_RETENTION_DAYS", "400"))
+ERROR_LOG_PARTITIONS_AHEAD = int(os.environ.get("ERROR_LOG_PARTITIONS_AHEAD", "2"))
+ERROR_LOG_MAINTENANCE_INTERVAL = float(os.environ.get("ERROR_LOG_MAINTENANCE_INTERVAL", "3600"))
+# Catches rows outside every monthly partition (e.g. clock skew); created by the partitioning migration
+ERROR_LOG_DEFAULT_PARTITION = "api_error_logs_default"
+# Rows moved or deleted per statement when maintenance works through the default partition
+ERROR_LOG_MOVE_BATCH = int(os.environ.get("ERROR_LOG_MOVE_BATCH", "5000"))
+
+_FINGERPRINT_VOLATILE_RE = re.compile(
+    r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}|0x[0-9a-fA-F]+|\d+"
+)
+
+
+def error_fingerprint(message: Optional[str]) -> str:
+    """Stable id for an error message with ids, addresses and numbers masked out."""
+    normalized = _FINGERPRINT_VOLATILE_RE.sub("#", (message or "")[:2000])
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+def upsert_error_rollups(db: Session, rollups: Dict[tuple, list]):
+    """Add {(bucket_start, path, method, status_code, fingerprint): [count, message, last_seen]} to api_error_rollups."""
+    insert = dialect_insert(db)
+    rows = [
+        {"bucket_start": key[0], "path": key[1], "method": key[2], "status_code": key[3], "fingerprint": key[4],
+         "count": count, "sample_message": message, "last_seen": last_seen}
+        for key, (count, message, last_seen) in rollups.items()
+    ]
+    stmt = insert(ApiErrorRollup)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["bucket_start", "path", "method", "status_code", "fingerprint"],
+            set_={"count": ApiErrorRollup.count + stmt.excluded.count, "last_seen": stmt.excluded.last_seen},
+        ),
+        rows,
+    )
+
+
+class ErrorLogWriter:
+    """
+    Takes ApiErrorLog rows off the request path. submit() never blocks or touches the
+    database: records are sampled, queued (dropped and counted when the queue is full)
+    and bulk-inserted by a daemon thread.
+    """
+
+    def __init__(self, maxsize: int, batch_size: int, flush_interval: float):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        # signature -> [window_start, seen, suppressed since last write, id of the last queued row]
+        self._signatures: Dict[tuple, list] = {}
+        # Pending rollup increments, flushed with the next batch
+        self._rollups: Dict[tuple, list] = {}
+        self.stats = {"queued": 0, "written": 0, "dropped": 0, "sampled_out": 0, "write_errors": 0, "batches": 0,
+                      "rollups_dropped": 0}
+
+    def _count(self, stat: str, n: int = 1):
+        with self._lock:
+            self.stats[stat] += n
+
+    def _sample(self, record: dict, signature: tuple):
+        """
+        Returns (suppressed, last_id): how many identical errors were skipped before this
+        one (None to skip this one too) and the id of the last queued identical error.
+        """
+        now = time.monotonic()
+        with self._lock:
+            state = self._signatures.get(signature)
+            if state is None or now - state[0] > ERROR_LOG_SAMPLE_WINDOW:
+                if len(self._signatures) >= ERROR_LOG_QUEUE_SIZE:
+                    self._signatures.clear()
+                state = self._signatures[signature] = [now, 0, 0, state[3] if state else None]
+            state[1] += 1
+            seen = state[1]
+            if seen > ERROR_LOG_SAMPLE_BURST and (seen - ERROR_LOG_SAMPLE_BURST) % max(ERROR_LOG_SAMPLE_RATE, 1):
+                state[2] += 1
+                self.stats["sampled_out"] += 1
+                return None, state[3]
+            suppressed, state[2] = state[2], 0
+            return suppressed, state[3]
+
+    def _queued(self, signature: tuple, error_id: str):
+        with self._lock:
+            state = self._signatures.get(signature)
+            if state is not None:
+                state[3] = error_id
+
+    def _count_rollup(self, record: dict, fingerprint: str):
+        timestamp = record["timestamp"]
+        key = (timestamp.replace(minute=0, second=0, microsecond=0), record["path"] or "", record["method"] or "",
+               record["status_code"] or 0, fingerprint)
+        with self._lock:
+            entry = self._rollups.get(key)
+            if entry is None:
+                if len(self._rollups) >= self._queue.maxsize:
+                    self.stats["rollups_dropped"] += 1
+                    return
+                entry = self._rollups[key] = [0, (record["message"] or "")[:1000], timestamp]
+            entry[0] += 1
+            entry[2] = max(entry[2], timestamp)
+
+    def submit(self, **record) -> Optional[str]:
+        """
+        Queue one error record (it is always counted in the rollups) and return the id
+        to hand out as its reference: its own id when queued, otherwise the id of the
+        last queued identical error, or None if there is none.
+        """
+        fingerprint = error_fingerprint(record["message"])
+        self._count_rollup(record, fingerprint)
+        signature = (record["path"], record["method"], record["status_code"], fingerprint)
+        suppressed, last_id = self._sample(record, signature)
+        if suppressed is None:
+            return last_id
+        if suppressed:
+            record["message"] = f"{record['message']} [+{suppressed} identical errors not logged]"
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self._count("dropped")
+            return last_id
+        self._queued(signature, record["id"])
+        self._count("queued")
+        return record["id"]
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="error-log-writer", daemon=True)
+                self._thread.start()
+
+    def _take_batch(self, timeout: float) -> List[dict]:
+        try:
+            batch = [self._queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _restore_rollups(self, rollups: Dict[tuple, list]):
+        """Put rollup increments from a failed write back so the next flush retries them."""
+        with self._lock:
+            for key, (count, message, last_seen) in rollups.items():
+                entry = self._rollups.get(key)
+                if entry is None:
+                    if len(self._rollups) >= self._queue.maxsize:
+                        self.stats["rollups_dropped"] += 1
+                        continue
+                    self._rollups[key] = [count, message, last_seen]
+                else:
+                    entry[0] += count
+                    entry[2] = max(entry[2], last_seen)
+
+    def _write(self, batch: List[dict]):
+        with self._lock:
+            rollups, self._rollups = self._rollups, {}
+        if not batch and not rollups:
+            return
+        db = SessionLocal()
+        try:
+            # Rollups go in their own transaction so a bad log batch cannot take them down with it
+            if rollups:
+                try:
+                    upsert_error_rollups(db, rollups)
+                    db.commit()
+                except Exception as e:
+                    db.rollback()
+                    self._restore_rollups(rollups)
+                    logger.warning(f"[ERROR] Could not write {len(rollups)} error rollup(s), will retry: {e}")
+            if batch:
+                try:
+                    db.execute(sa.insert(ApiErrorLog), batch)
+                    db.commit()
+                    self._count("written", len(batch))
+                    self._count("batches")
+                except Exception as e:
+                    db.rollback()
+                    self._count("write_errors", len(batch))
+                    logger.warning(f"[ERROR] Could not write {len(batch)} error log(s): {e}")
+        finally:
+            db.close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._write(self._take_batch(self.flush_interval))
+        self.flush()
+
+    def flush(self):
+        """Write everything currently queued (used on shutdown and in tests)."""
+        while True:
+            batch = self._take_batch(0)
+            self._write(batch)
+            if not batch:
+                return
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {**self.stats, "pending": self._queue.qsize(), "capacity": self._queue.maxsize,
+                    "tracked_signatures": len(self._signatures)}
+
+
+error_log_writer = ErrorLogWriter(ERROR_LOG_QUEUE_SIZE, ERROR_LOG_BATCH_SIZE, ERROR_LOG_FLUSH_INTERVAL)
+
+
+@app.on_event("shutdown")
+def stop_error_log_writer():
+    error_log_writer.stop()
+
+
+def _add_months(dt: datetime, n: int) -> datetime:
+    years, month = divmod(dt.month - 1 + n, 12)
+    return dt.replace(year=dt.year + years, month=month + 1)
+
+
+def _batched_rowcount(db: Session, statement: str, params: dict) -> int:
+    """Run a statement limited by :batch until it touches fewer rows; returns the total."""
+    total = 0
+    while True:
+        count = db.execute(sa.text(statement), {**params, "batch": ERROR_LOG_MOVE_BATCH}).rowcount
+        total += count
+        if count < ERROR_LOG_MOVE_BATCH:
+            return total
+
+
+def _create_partition_from_default(db: Session, name: str, bounds: dict) -> int:
+    """
+    Create the monthly partition `name` when the default partition already holds rows for it
+    (CREATE ... PARTITION OF would fail). The month is built as a standalone table and the
+    rows are moved into it in batches while error writes continue; only the last step locks
+    the default partition against inserts, to move rows that arrived meanwhile and ATTACH.
+    Returns the number of rows moved.
+    """
+    default = ERROR_LOG_DEFAULT_PARTITION
+    in_range = '"timestamp" >= :start AND "timestamp" < :end'
+    db.execute(sa.text(f"CREATE TABLE {name} (LIKE api_error_logs INCLUDING DEFAULTS)"))
+    db.execute(sa.text(f'ALTER TABLE {name} ADD PRIMARY KEY (id, "timestamp")'))
+    db.execute(sa.text(f'CREATE INDEX ix_{name}_timestamp ON {name} ("timestamp")'))
+    # Lets ATTACH skip scanning the new table
+    db.execute(sa.text(
+        f"ALTER TABLE {name} ADD CONSTRAINT {name}_range "
+        f"CHECK (\"timestamp\" >= '{bounds['start']:%Y-%m-%d}' AND \"timestamp\" < '{bounds['end']:%Y-%m-%d}')"
+    ))
+    move = (
+        f"WITH moved AS (DELETE FROM {default} WHERE ctid IN "
+        f"(SELECT ctid FROM {default} WHERE {in_range} LIMIT :batch) RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    )
+    moved = _batched_rowcount(db, move, bounds)
+    db.execute(sa.text(f"LOCK TABLE {default} IN SHARE ROW EXCLUSIVE MODE"))
+    moved += _batched_rowcount(db, move, bounds)
+    db.execute(sa.text(
+        f"ALTER TABLE api_error_logs ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{bounds['start']:%Y-%m-%d}') TO ('{bounds['end']:%Y-%m-%d}')"
+    ))
+    db.execute(sa.text(f"ALTER TABLE {name} DROP CONSTRAINT {name}_range"))
+    return moved
+
+
+def maintain_error_logs(db: Session, now: Optional[datetime] = None) -> dict:
+    """
+    Create the monthly api_error_logs partitions ERROR_LOG_PARTITIONS_AHEAD months ahead
+    (moving any rows for that month out of the default partition in batches, see
+    _create_partition_from_default), drop partitions entirely
+    past ERROR_LOG_RETENTION_DAYS, delete expired rows from the default partition and
+    delete expired rollups.
+    Without partitioning (e.g. SQLite) expired rows are deleted instead.
+    """
+    now = now or datetime.utcnow()
+    result = {"created": [], "dropped": [], "moved": 0, "logs_deleted": 0, "rollups_deleted": 0}
+    cutoff = now - timedelta(days=ERROR_LOG_RETENTION_DAYS) if ERROR_LOG_RETENTION_DAYS > 0 else None
+    partitioned = False
+    if db.get_bind().dialect.name == "postgresql":
+        # Several API processes run this; only one at a time does the DDL
+        if not db.execute(sa.text("SELECT pg_try_advisory_xact_lock(hashtext('api_error_logs_maintenance'))")).scalar():
+            return result
+        partitioned = bool(db.execute(sa.text(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('api_error_logs')"
+        )).scalar())
+    if partitioned:
+        existing = set(db.execute(sa.text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass('api_error_logs')"
+        )).scalars())
+        has_default = ERROR_LOG_DEFAULT_PARTITION in existing
+        month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        for i in range(ERROR_LOG_PARTITIONS_AHEAD + 1):
+            start = _add_months(month, i)
+            name = f"api_error_logs_p{start:%Y%m}"
+            if name not in existing:
+                bounds = {"start": start, "end": _add_months(start, 1)}
+                stranded = has_default and db.execute(sa.text(
+                    f'SELECT 1 FROM {ERROR_LOG_DEFAULT_PARTITION} '
+                    f'WHERE "timestamp" >= :start AND "timestamp" < :end LIMIT 1'
+                ), bounds).scalar()
+                if stranded:
+                    result["moved"] += _create_partition_from_default(db, name, bounds)
+                else:
+                    db.execute(sa.text(
+                        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF api_error_logs "
+                        f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{bounds['end']:%Y-%m-%d}')"
+                    ))
+                result["created"].append(name)
+        if cutoff is not None and has_default:
+            result["logs_deleted"] = _batched_rowcount(db, (
+                f'DELETE FROM {ERROR_LOG_DEFAULT_PARTITION} WHERE ctid IN (SELECT ctid FROM {ERROR_LOG_DEFAULT_PARTITION} '
+                f'WHERE "timestamp" < :cutoff LIMIT :batch)'
+            ), {"cutoff": cutoff})
+        if cutoff is not None:
+            for name in sorted(existing):
+                m = re.fullmatch(r"api_error_logs_p(\d{6})", name)
+                if m and _add_months(datetime.strptime(m.group(1), "%Y%m"), 1) <= cutoff:
+                    db.execute(sa.text(f"DROP TABLE {name}"))
+                    result["dropped"].append(name)
+    elif cutoff is not None:
+        result["logs_deleted"] = (
+            db.query(ApiErrorLog).filter(ApiErrorLog.timestamp < cutoff).delete(synchronize_session=False)
+        )
+    if ERROR_ROLLUP_RETENTION_DAYS > 0:
+        result["rollups_deleted"] = (
+            db.query(ApiErrorRollup)
+            .filter(ApiErrorRollup.bucket_start < now - timedelta(days=ERROR_ROLLUP_RETENTION_DAYS))
+            .delete(synchronize_session=False)
+        )
+    db.commit()
+    return result
+
+
+def run_error_log_maintenance() -> dict:
+    db = SessionLocal()
+    try:
+        return maintain_error_logs(db)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+async def error_log_maintenance_loop():
+    while True:
+        try:
+            result = await run_in_threadpool(run_error_log_maintenance)
+            if result["created"] or result["dropped"]:
+                logger.info(f"Error log partitions created={result['created']} dropped={result['dropped']}")
+        except Exception as e:
+            logger.warning(f"[ERROR] Error log maintenance failed: {e}")
+        await asyncio.sleep(ERROR_LOG_MAINTENANCE_INTERVAL)
+
+
+error_log_maintenance_task = None
+
+
+@app.on_event("startup")
+async def start_error_log_maintenance():
+    global error_log_maintenance_task
+    if ERROR_LOG_MAINTENANCE_INTERVAL > 0:
+        error_log_maintenance_task = asyncio.create_task(error_log_maintenance_loop())
+
+
+@app.on_event("shutdown")
+async def stop_error_log_maintenance():
+    if error_log_maintenance_task is not None:
+        error_log_maintenance_task.cancel()
+
+
 # --- Error logging middleware ---
 @app.middleware("http")
 async def error_logging_middleware(request: Request, call_next):
@@ -1132,60 +2429,281 @@ async def error_logging_middleware(request: Request, call_next):
         return await call_next(request)
     except Exception as exc:
         import traceback
-        error_id = str(uuid.uuid4())
         stack = traceback.format_exc()
         logger.error(f"[ERROR] Middleware caught exception: {exc}\n{stack}")
-        # Log to DB
-        db = SessionLocal()
-        try:
-            log = ApiErrorLog(
-                id=error_id,
-                timestamp=datetime.utcnow(),
-                path=str(request.url.path),
-                method=request.method,
-                status_code=500,
-                message=str(exc),
-                stack_trace=stack,
-                user_id=None,  # Optionally extract from request if available
-            )
-            db.add(log)
-            db.commit()
-        except Exception as log_exc:
-            db.rollback()
-        finally:
-            db.close()
-        # Return error ID to client
-        return JSONResponse(
+        # May be an earlier identical error's id (sampled out) or None (nothing logged)
+        error_id = error_log_writer.submit(
+            id=str(uuid.uuid4()),
+            timestamp=datetime.utcnow(),
+            path=str(request.url.path),
+            method=request.method,
             status_code=500,
-            content={"detail": f"Internal server error. Reference ID: {error_id}"}
+            message=str(exc),
+            stack_trace=stack,
+            user_id=None,  # Optionally extract from request if available
         )
+        # Return error ID to client
+        detail = f"Internal server error. Reference ID: {error_id}" if error_id else "Internal server error."
+        return JSONResponse(status_code=500, content={"detail": detail})
 
 # --- API Token Auth Dependency ---
-def require_api_token(authorization: str = Header(...), db: Session = Depends(get_db)):
+# Tokens are stored as sha256 hashes. Validated tokens are cached in-process so auth
+# doesn't cost a DB round-trip per request; unknown tokens are cached briefly too.
+# Revocation NOTIFYs every API process, which drops the entry immediately; the TTL
+# bounds staleness if a notification is missed.
+API_TOKEN_CACHE_TTL = float(os.environ.get("API_TOKEN_CACHE_TTL", "60"))
+API_TOKEN_NEGATIVE_TTL = float(os.environ.get("API_TOKEN_NEGATIVE_TTL", "5"))
+API_TOKEN_CACHE_SIZE = int(os.environ.get("API_TOKEN_CACHE_SIZE", "10000"))
+API_TOKEN_REVOKED_CHANNEL = "api_token_revoked"
+
+
+def hash_api_token(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class CachedApiToken(BaseModel):
+    """Detached snapshot of an active ApiAccessToken row, safe to share across requests."""
+    id: str
+    role: str
+    created_by: Optional[str] = None
+    description: Optional[str] = None
+
+
+class ApiTokenCache:
+    """Thread-safe token_hash -> (expires_at, CachedApiToken or None) with positive and negative TTLs."""
+
+    def __init__(self, maxsize: int, ttl: float, negative_ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token_hash: str):
+        """Returns (hit, value); value is None for a cached rejection."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(token_hash)
+            if entry is None:
+                return False, None
+            if entry[0] <= now:
+                del self._data[token_hash]
+                return False, None
+            self._data.move_to_end(token_hash)
+            return True, entry[1]
+
+    def put(self, token_hash: str, value: Optional[CachedApiToken]):
+        ttl = self.ttl if value is not None else self.negative_ttl
+        if self.maxsize <= 0 or ttl <= 0:
+            return
+        with self._lock:
+            self._data[token_hash] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(token_hash)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, token_hash: Optional[str] = None):
+        with self._lock:
+            if token_hash is None:
+                self._data.clear()
+            else:
+                self._data.pop(token_hash, None)
+
+
+api_token_cache = ApiTokenCache(API_TOKEN_CACHE_SIZE, API_TOKEN_CACHE_TTL, API_TOKEN_NEGATIVE_TTL)
+
+
+def lookup_api_token(token: str) -> Optional[CachedApiToken]:
+    token_hash = hash_api_token(token)
+    hit, cached = api_token_cache.get(token_hash)
+    if hit:
+        return cached
+    db = SessionLocal()
+    try:
+        row = db.query(ApiAccessToken).filter_by(token=token_hash, active=1).first()
+        cached = (
+            CachedApiToken(id=row.id, role=row.role, created_by=row.created_by, description=row.description)
+            if row else None
+        )
+    finally:
+        db.close()
+    api_token_cache.put(token_hash, cached)
+    return cached
+
+
+def require_api_token(authorization: str = Header(...)):
     if not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Invalid auth header")
     token = authorization.split(" ", 1)[1]
-    db_token = db.query(ApiAccessToken).filter_by(token=token, active=1).first()
+    db_token = lookup_api_token(token)
     if not db_token:
         raise HTTPException(status_code=401, detail="Invalid or inactive token")
     return db_token
 
 def require_role(roles):
-    def dependency(authorization: str = Header(...), db: Session = Depends(get_db)):
-        token_obj = require_api_token(authorization, db)
+    def dependency(authorization: str = Header(...)):
+        token_obj = require_api_token(authorization)
         if token_obj.role not in roles:
             raise HTTPException(status_code=403, detail="Insufficient role")
         return token_obj
     return dependency
 
+
+def listen_for_token_revocations(stop: threading.Event):
+    """LISTEN for revoked token hashes and drop them from this process's cache."""
+    import select
+
+    import psycopg2
+
+    while not stop.is_set():
+        conn = None
+        try:
+            conn = psycopg2.connect(rules_engine.url.render_as_string(hide_password=False))
+            conn.autocommit = True
+            conn.cursor().execute(f"LISTEN {API_TOKEN_REVOKED_CHANNEL}")
+            # Anything revoked while we weren't listening may still be cached
+            api_token_cache.invalidate()
+            while not stop.is_set():
+                if select.select([conn], [], [], 1.0)[0]:
+                    conn.poll()
+                    while conn.notifies:
+                        api_token_cache.invalidate(conn.notifies.pop(0).payload or None)
+        except Exception as e:
+            logging.warning(f"Token revocation listener error, retrying: {e}")
+            stop.wait(5)
+        finally:
+            if conn is not None:
+                conn.close()
+
+
+token_listener_stop = threading.Event()
+
+
+@app.on_event("startup")
+def start_token_revocation_listener():
+    if rules_engine.dialect.name != "postgresql" or API_TOKEN_CACHE_TTL <= 0:
+        return
+    token_listener_stop.clear()
+    threading.Thread(
+        target=listen_for_token_revocations, args=(token_listener_stop,), name="token-revocations", daemon=True
+    ).start()
+
+
+@app.on_event("shutdown")
+def stop_token_revocation_listener():
+    token_listener_stop.set()
+
+
 # --- Endpoint: Generate API Token ---
 @app.post("/admin/generate-token")
 def generate_token(description: str = "", created_by: str = None, role: str = "admin", db: Session = Depends(get_db)):
     token = secrets.token_urlsafe(32)
-    db_token = ApiAccessToken(token=token, description=description, created_by=created_by, active=1, role=role)
+    token_hash = hash_api_token(token)
+    db_token = ApiAccessToken(token=token_hash, description=description, created_by=created_by, active=1, role=role)
     db.add(db_token)
     db.commit()
-    return {"token": token, "description": description, "role": role}
+    # The plaintext token is only ever returned here
+    api_token_cache.invalidate(token_hash)
+    return {"id": db_token.id, "token": token, "description": description, "role": role}
+
+# --- Endpoint: Revoke API Token ---
+@app.post("/admin/revoke-token")
+def revoke_token(
+    token_id: str = None,
+    token: str = None,
+    db: Session = Depends(get_db),
+    auth=Depends(require_role(["admin"])),
+):
+    """Deactivate a token by id or by value; every API process drops it from its auth cache at once."""
+    if not token_id and not token:
+        raise HTTPException(status_code=400, detail="token_id or token is required")
+    query = db.query(ApiAccessToken)
+    db_token = query.filter_by(id=token_id).first() if token_id else query.filter_by(token=hash_api_token(token)).first()
+    if not db_token:
+        raise HTTPException(status_code=404, detail="Token not found")
+    db_token.active = 0
+    if db.get_bind().dialect.name == "postgresql":
+        # Delivered to listeners on commit
+        db.execute(sa.text("SELECT pg_notify(:channel, :payload)"),
+                   {"channel": API_TOKEN_REVOKED_CHANNEL, "payload": db_token.token})
+    db.commit()
+    api_token_cache.invalidate(db_token.token)
+    return {"id": db_token.id, "active": False}
+
+# --- Endpoint: Error log writer counters (token protected) ---
+@app.get("/admin/error-log-writer/stats")
+def error_log_writer_stats(auth=Depends(require_api_token)):
+    return error_log_writer.snapshot()
+
+# --- Endpoint: Error counts from the hourly rollups (token protected) ---
+@app.get("/admin/errors/rollups")
+def get_error_rollups(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    bucket: str = "hour",
+    path: Optional[str] = None,
+    status_code: Optional[int] = None,
+    limit: int = 500,
+    db: Session = Depends(get_db),
+    auth=Depends(require_api_token),
+):
+    """
+    Error counts per path, method, status code and message fingerprint, grouped by
+    hour, day or over the whole range (bucket=total). Defaults to the last 24 hours.
+    Reads api_error_rollups only, never the raw logs.
+    """
+    if bucket not in ("hour", "day", "total"):
+        raise HTTPException(status_code=400, detail="bucket must be one of: hour, day, total")
+    since = since or datetime.utcnow() - timedelta(hours=24)
+    if bucket == "hour":
+        bucket_col = ApiErrorRollup.bucket_start
+    elif bucket == "day":
+        if db.get_bind().dialect.name == "postgresql":
+            bucket_col = sa.func.date_trunc(sa.literal_column("'day'"), ApiErrorRollup.bucket_start)
+        else:
+            bucket_col = sa.func.date(ApiErrorRollup.bucket_start)
+    else:
+        bucket_col = sa.literal(None)
+    bucket_col = bucket_col.label("bucket_start")
+    total = sa.func.sum(ApiErrorRollup.count).label("count")
+    q = db.query(
+        bucket_col,
+        ApiErrorRollup.path,
+        ApiErrorRollup.method,
+        ApiErrorRollup.status_code,
+        ApiErrorRollup.fingerprint,
+        total,
+        sa.func.max(ApiErrorRollup.sample_message).label("sample_message"),
+        sa.func.max(ApiErrorRollup.last_seen).label("last_seen"),
+    ).filter(ApiErrorRollup.bucket_start >= since)
+    if until:
+        q = q.filter(ApiErrorRollup.bucket_start < until)
+    if path:
+        q = q.filter(ApiErrorRollup.path == path)
+    if status_code is not None:
+        q = q.filter(ApiErrorRollup.status_code == status_code)
+    group_by = [ApiErrorRollup.path, ApiErrorRollup.method, ApiErrorRollup.status_code, ApiErrorRollup.fingerprint]
+    if bucket != "total":
+        group_by.insert(0, bucket_col)
+    rows = q.group_by(*group_by).order_by(total.desc()).limit(max(1, min(limit, 5000))).all()
+    return {
+        "bucket": bucket,
+        "since": since,
+        "until": until,
+        "rollups": [
+            {
+                "bucket_start": row.bucket_start,
+                "path": row.path,
+                "method": row.method,
+                "status_code": row.status_code,
+                "fingerprint": row.fingerprint,
+                "count": row.count,
+                "sample_message": row.sample_message,
+                "last_seen": row.last_seen,
+            }
+            for row in rows
+        ],
+    }
 
 # --- Endpoint: Lookup Error Log by ID (token protected) ---
 @app.get("/admin/errors/{error_id}")
@@ -1206,38 +2724,26 @@ def get_error_log(error_id: str, db: Session = Depends(get_db), auth=Depends(req
 
 @app.exception_handler(RequestValidationError)
 async def custom_validation_exception_handler(request: Request, exc: RequestValidationError):
-    import uuid
-    from db import SessionLocal, ApiErrorLog
     import traceback
-    error_id = str(uuid.uuid4())
-    db = SessionLocal()
-    try:
-        log = ApiErrorLog(
-            id=error_id,
-            timestamp=datetime.utcnow(),
-            path=str(request.url.path),
-            method=request.method,
-            status_code=422,
-            message=f"Validation error: {exc.errors()}",
-            stack_trace=traceback.format_exc(),
-            user_id=None,
-        )
-        db.add(log)
-        db.commit()
-    except Exception:
-        db.rollback()
-    finally:
-        db.close()
-    return JSONResponse(
+    error_id = error_log_writer.submit(
+        id=str(uuid.uuid4()),
+        timestamp=datetime.utcnow(),
+        path=str(request.url.path),
+        method=request.method,
         status_code=422,
-        content={
-            "detail": exc.errors(),
-            "body": exc.body,
-            "path": str(request.url.path),
-            "message": "Validation failed. Please check your input and try again.",
-            "error_id": error_id
-        },
+        message=f"Validation error: {exc.errors()}",
+        stack_trace=traceback.format_exc(),
+        user_id=None,
     )
+    content = {
+        "detail": exc.errors(),
+        "body": exc.body,
+        "path": str(request.url.path),
+        "message": "Validation failed. Please check your input and try again.",
+    }
+    if error_id:
+        content["error_id"] = error_id
+    return JSONResponse(status_code=422, content=content)
 
 class ExampleWorkflowItem(BaseModel):
     endpoint: str
@@ -1502,25 +3008,309 @@ def init_onboarding(
         user_story_link=user_story_link,
     ) for r in created]
 
+async def call_summarize_git_diff(diff: str, concise: bool = False):
+    resp = await ollama_functions_client.post(
+        f"{OLLAMA_FUNCTIONS_URL}/summarize-git-diff",
+        json={"diff": diff, "concise": concise},
+    )
+    resp.raise_for_status()
+    return resp.json()
+
+
 @app.post("/summarize-git-diff")
-def summarize_git_diff_passthrough(
+async def summarize_git_diff_passthrough(
     diff: str = Body(..., embed=True),
     concise: bool = Body(False, embed=True)
 ):
     """
     Passthrough endpoint to ollama-functions /summarize-git-diff
+    For large diffs, submit to POST /jobs/summarize-git-diff instead.
     """
     try:
-        resp = requests.post(
-            "http://ollama-functions:8000/summarize-git-diff",
-            json={"diff": diff, "concise": concise},
-            timeout=180
-        )
-        resp.raise_for_status()
-        return resp.json()
+        return await call_summarize_git_diff(diff, concise)
     except Exception as e:
         return {"error": str(e)}
 
+
+# --- Background LLM jobs ---
+# Submit returns a job id immediately; workers in each API process claim queued
+# jobs with FOR UPDATE SKIP LOCKED, so several processes can share the queue.
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))  # per process; 0 disables workers here
+JOB_POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", "1.0"))
+JOB_STALE_SECONDS = float(os.environ.get("JOB_STALE_SECONDS", "900"))
+# Running jobs renew their lease this often, so long jobs are never mistaken for dead ones
+JOB_HEARTBEAT_SECONDS = float(os.environ.get("JOB_HEARTBEAT_SECONDS", str(max(JOB_STALE_SECONDS / 3, 1))))
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "3"))
+JOB_TERMINAL_STATUSES = ("succeeded", "failed")
+
+
+async def _run_review_job(payload):
+    uploads = [
+        (f["filename"], base64.b64decode(f["content"]), f.get("content_type") or "text/plain")
+        for f in payload["files"]
+    ]
+    return await review_uploads(uploads)
+
+
+async def _run_summarize_job(payload):
+    return await call_summarize_git_diff(payload["diff"], payload.get("concise", False))
+
+
+JOB_HANDLERS = {
+    "suggest-llm-rules": call_suggest_llm_rules,
+    "summarize-git-diff": _run_summarize_job,
+    "review-code-files-llm": _run_review_job,
+}
+
+
+def job_out(job) -> dict:
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "result": json.loads(job.result) if job.result else None,
+        "error": job.error,
+        "attempts": job.attempts,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+def enqueue_job(db: Session, kind: str, payload) -> dict:
+    job = DBLlmJob(kind=kind, status="queued", payload=json.dumps(payload), attempts=0, created_at=datetime.utcnow())
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job_out(job)
+
+
+def claim_next_job(worker_id: str):
+    """Atomically take the oldest queued job; returns (id, kind, payload) or None."""
+    db = SessionLocal()
+    try:
+        job = (
+            db.query(DBLlmJob)
+            .filter(DBLlmJob.status == "queued")
+            .order_by(DBLlmJob.created_at)
+            .with_for_update(skip_locked=True)
+            .first()
+        )
+        if job is None:
+            db.rollback()
+            return None
+        job.status = "running"
+        job.started_at = job.heartbeat_at = datetime.utcnow()
+        job.attempts = (job.attempts or 0) + 1
+        job.locked_by = worker_id
+        db.commit()
+        return job.id, job.kind, job.payload
+    finally:
+        db.close()
+
+
+def _owned_running_job(job_id: str, worker_id: str):
+    return sa.update(DBLlmJob).where(
+        DBLlmJob.id == job_id, DBLlmJob.locked_by == worker_id, DBLlmJob.status == "running"
+    )
+
+
+def renew_job_lease(job_id: str, worker_id: str) -> bool:
+    """Refresh the heartbeat of a job this worker still owns; False if the lease was lost."""
+    db = SessionLocal()
+    try:
+        renewed = db.execute(_owned_running_job(job_id, worker_id).values(heartbeat_at=datetime.utcnow()))
+        db.commit()
+        return bool(renewed.rowcount)
+    finally:
+        db.close()
+
+
+def finish_job(job_id: str, worker_id: str, result=None, error: Optional[str] = None) -> bool:
+    """Record the outcome only if this worker still owns the running job; False if it was requeued meanwhile."""
+    db = SessionLocal()
+    try:
+        finished = db.execute(
+            _owned_running_job(job_id, worker_id).values(
+                status="failed" if error is not None else "succeeded",
+                result=json.dumps(result) if error is None else None,
+                error=error,
+                finished_at=datetime.utcnow(),
+            )
+        )
+        db.commit()
+        if not finished.rowcount:
+            logger.warning("[JOB] %s: worker %s lost the lease; result discarded", job_id, worker_id)
+        return bool(finished.rowcount)
+    finally:
+        db.close()
+
+
+def requeue_stale_jobs() -> int:
+    """Jobs left 'running' by a dead worker go back to the queue, or fail after JOB_MAX_ATTEMPTS."""
+    cutoff = datetime.utcnow() - timedelta(seconds=JOB_STALE_SECONDS)
+    db = SessionLocal()
+    try:
+        stale = (
+            db.query(DBLlmJob)
+            .filter(
+                DBLlmJob.status == "running",
+                sa.func.coalesce(DBLlmJob.heartbeat_at, DBLlmJob.started_at) < cutoff,
+            )
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        for job in stale:
+            if (job.attempts or 0) >= JOB_MAX_ATTEMPTS:
+                job.status = "failed"
+                job.error = f"Worker lost the job {job.attempts} times"
+                job.finished_at = datetime.utcnow()
+            else:
+                job.status = "queued"
+                job.locked_by = None
+        db.commit()
+        return len(stale)
+    finally:
+        db.close()
+
+
+async def process_next_job(worker_id: str) -> bool:
+    """Run one queued job if there is one; returns False when the queue is empty."""
+    claimed = await run_in_threadpool(claim_next_job, worker_id)
+    if claimed is None:
+        return False
+    job_id, kind, payload = claimed
+    heartbeat = asyncio.create_task(_heartbeat_job(job_id, worker_id))
+    try:
+        handler = JOB_HANDLERS.get(kind)
+        if handler is None:
+            raise ValueError(f"Unknown job kind: {kind}")
+        result = await handler(json.loads(payload or "null"))
+    except Exception as e:
+        logger.error("[JOB] %s (%s) failed: %s", job_id, kind, e)
+        outcome = (None, str(e))
+    else:
+        outcome = (result, None)
+    finally:
+        heartbeat.cancel()
+    await run_in_threadpool(finish_job, job_id, worker_id, *outcome)
+    return True
+
+
+async def _heartbeat_job(job_id: str, worker_id: str):
+    while True:
+        await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+        try:
+            if not await run_in_threadpool(renew_job_lease, job_id, worker_id):
+                return
+        except Exception as e:
+            logger.warning("[JOB] %s: lease renewal failed: %s", job_id, e)
+
+
+async def job_worker_loop(worker_id: str, sweep_stale: bool = False):
+    last_sweep = 0.0
+    while True:
+        try:
+            now = time.monotonic()
+            if sweep_stale and now - last_sweep > 60:
+                last_sweep = now
+                await run_in_threadpool(requeue_stale_jobs)
+            if not await process_next_job(worker_id):
+                await asyncio.sleep(JOB_POLL_INTERVAL)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("[JOB] worker %s error: %s", worker_id, e)
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+
+
+job_worker_tasks = []
+
+
+@app.on_event("startup")
+async def start_job_workers():
+    prefix = f"{socket.gethostname()}:{os.getpid()}"
+    for i in range(JOB_WORKERS):
+        job_worker_tasks.append(asyncio.create_task(job_worker_loop(f"{prefix}:{i}", sweep_stale=(i == 0))))
+
+
+@app.on_event("shutdown")
+async def stop_job_workers():
+    for task in job_worker_tasks:
+        task.cancel()
+    await asyncio.gather(*job_worker_tasks, return_exceptions=True)
+    job_worker_tasks.clear()
+
+
+# Endpoint: submit /suggest-llm-rules as a background job
+@app.post("/jobs/suggest-llm-rules", status_code=202)
+def submit_suggest_llm_rules_job(payload: dict = Body(...), db: Session = Depends(get_db)):
+    return enqueue_job(db, "suggest-llm-rules", payload)
+
+
+# Endpoint: submit /summarize-git-diff as a background job
+@app.post("/jobs/summarize-git-diff", status_code=202)
+def submit_summarize_git_diff_job(
+    diff: str = Body(..., embed=True),
+    concise: bool = Body(False, embed=True),
+    db: Session = Depends(get_db),
+):
+    return enqueue_job(db, "summarize-git-diff", {"diff": diff, "concise": concise})
+
+
+# Endpoint: submit /review-code-files-llm as a background job
+@app.post("/jobs/review-code-files-llm", status_code=202)
+def submit_review_code_files_job(files: list[UploadFile] = File(...), db: Session = Depends(get_db)):
+    payload = {"files": []}
+    for upload in files:
+        upload.file.seek(0)
+        payload["files"].append({
+            "filename": upload.filename,
+            "content": base64.b64encode(upload.file.read()).decode("ascii"),
+            "content_type": upload.content_type or "text/plain",
+        })
+    return enqueue_job(db, "review-code-files-llm", payload)
+
+
+# Endpoint: poll a job's status and result
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str, db: Session = Depends(get_db)):
+    job = db.query(DBLlmJob).filter(DBLlmJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_out(job)
+
+
+def _load_job(job_id: str):
+    db = SessionLocal()
+    try:
+        job = db.query(DBLlmJob).filter(DBLlmJob.id == job_id).first()
+        return job_out(job) if job else None
+    finally:
+        db.close()
+
+
+# Endpoint: stream job status changes as NDJSON until it finishes
+@app.get("/jobs/{job_id}/stream")
+async def stream_job(job_id: str):
+    first = await run_in_threadpool(_load_job, job_id)
+    if first is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def ndjson():
+        current = first
+        last_status = None
+        while True:
+            if current["status"] != last_status:
+                last_status = current["status"]
+                yield json.dumps(current) + "\n"
+            if current["status"] in JOB_TERMINAL_STATUSES:
+                return
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+            current = await run_in_threadpool(_load_job, job_id) or current
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
 @app.get("/onboarding/user_story/{path}")
 def get_user_story(path: str):
     file_map = {
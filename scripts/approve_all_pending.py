@@ -1,41 +1,35 @@
-import sqlite3
+import argparse
+import os
 
 import requests
 
-API_URL = "http://localhost:9103/approve-rule-change/{}"
-DB_PATH = "rules.db"
+API_URL = os.environ.get("BULK_MODERATION_URL", "http://localhost:9103/bulk-moderate-rule-changes")
 
 
-def get_pending_proposal_ids(db_path):
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute("SELECT id FROM proposals WHERE status = 'pending';")
-    ids = [row[0] for row in cursor.fetchall()]
-    conn.close()
-    return ids
+def moderate_pending(action="approve", project=None):
+    """Approve or reject every pending proposal (optionally for one project) in a single request."""
+    payload = {"action": action, "filter": {"project": project} if project else {}}
+    response = requests.post(API_URL, json=payload, timeout=600)
+    response.raise_for_status()
+    return response.json()
 
 
-def approve_proposal(proposal_id):
-    url = API_URL.format(proposal_id)
+def main():
+    parser = argparse.ArgumentParser(description="Approve (or reject) all pending rule proposals.")
+    parser.add_argument("--reject", action="store_true", help="Reject instead of approve")
+    parser.add_argument("--project", help="Only proposals for this project")
+    args = parser.parse_args()
     try:
-        response = requests.post(url)
-        if response.status_code == 200:
-            print(f"Approved: {proposal_id}")
-        else:
-            print(
-                f"Failed to approve {proposal_id}: {response.status_code} {response.text}"
-            )
+        body = moderate_pending("reject" if args.reject else "approve", args.project)
     except Exception as e:
-        print(f"Error approving {proposal_id}: {e}")
-
-
-def main():
-    ids = get_pending_proposal_ids(DB_PATH)
-    if not ids:
+        print(f"Error moderating pending proposals: {e}")
+        return
+    if not body["processed"]:
         print("No pending proposals found.")
         return
-    for proposal_id in ids:
-        approve_proposal(proposal_id)
+    for item in body["results"]:
+        print(f"{item['status'].capitalize()}: {item['proposal_id']}")
+    print(f"{body['processed']} proposal(s) {body['action']}d.")
 
 
 if __name__ == "__main__":
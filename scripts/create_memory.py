@@ -6,16 +6,56 @@ import json
 import ast
 
 API_URL = "http://localhost:9103/memory/nodes"
+BATCH_API_URL = f"{API_URL}/batch"
+
+
+def submit_batch(path, namespace=None):
+    """POST a JSON array or NDJSON file of nodes to the bulk ingestion endpoint."""
+    with open(path, "rb") as f:
+        body = f.read()
+    is_ndjson = path.endswith((".ndjson", ".jsonl"))
+    if namespace:
+        # Fill in a default namespace for nodes that don't set one
+        if is_ndjson:
+            nodes = [json.loads(line) for line in body.decode("utf-8").splitlines() if line.strip()]
+        else:
+            nodes = json.loads(body)
+        for node in nodes:
+            node.setdefault("namespace", namespace)
+        body = "\n".join(json.dumps(n) for n in nodes).encode("utf-8")
+        is_ndjson = True
+    headers = {"Content-Type": "application/x-ndjson" if is_ndjson else "application/json"}
+    try:
+        resp = requests.post(BATCH_API_URL, data=body, headers=headers)
+        resp.raise_for_status()
+    except Exception as e:
+        print(f"[ERROR] Batch ingestion failed: {e}\n{getattr(e, 'response', None) and e.response.text}", file=sys.stderr)
+        sys.exit(1)
+    result = resp.json()
+    print(f"[SUCCESS] Created {result['created']} memory nodes ({result['failed']} failed).")
+    for item in result["results"]:
+        if item["status"] != "created":
+            print(f"  item {item['index']}: {item['error']}", file=sys.stderr)
+    if result["failed"]:
+        sys.exit(2)
 
 def main():
     parser = argparse.ArgumentParser(description="Create a new memory node via the API.")
-    parser.add_argument('--name', required=True, help='Short identifier for the memory node')
-    parser.add_argument('--observation', required=True, help='Observation or best practice to store')
+    parser.add_argument('--name', help='Short identifier for the memory node')
+    parser.add_argument('--observation', help='Observation or best practice to store')
     parser.add_argument('--project', help='Project this memory is associated with (optional)')
-    parser.add_argument('--namespace', required=True, help='Namespace or logical grouping (required)')
+    parser.add_argument('--namespace', help='Namespace or logical grouping (required for single nodes)')
     parser.add_argument('--meta', help='Optional JSON string for meta field')
+    parser.add_argument('--batch-file', help='JSON array or NDJSON (.ndjson/.jsonl) file of nodes to create in one request')
     args = parser.parse_args()
 
+    if args.batch_file:
+        submit_batch(args.batch_file, namespace=args.namespace)
+        return
+    missing = [flag for flag, value in (("--name", args.name), ("--observation", args.observation), ("--namespace", args.namespace)) if not value]
+    if missing:
+        parser.error(f"the following arguments are required: {', '.join(missing)}")
+
     # Build meta field
     meta = {}
     if args.name:
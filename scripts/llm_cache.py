@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Persistent prompt -> response cache for Ollama generate calls.
+
+Entries are keyed by sha256 of (model, prompt, options) and stored in a local
+SQLite file (LLM_CACHE_PATH) or, when LLM_CACHE_DSN is set, in a Postgres table.
+Entries older than LLM_CACHE_TTL seconds are ignored and purged, and the store is
+trimmed to LLM_CACHE_MAX_ENTRIES, least recently used first. Set LLM_CACHE=off
+to bypass it.
+
+Usage:
+  python scripts/llm_cache.py stats
+  python scripts/llm_cache.py evict
+  python scripts/llm_cache.py clear
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_ENABLED = os.environ.get("LLM_CACHE", "on").lower() not in ("off", "0", "false")
+LLM_CACHE_PATH = os.environ.get("LLM_CACHE_PATH", os.path.expanduser("~/.cache/llm_prompt_cache.sqlite3"))
+LLM_CACHE_DSN = os.environ.get("LLM_CACHE_DSN")
+LLM_CACHE_TTL = int(os.environ.get("LLM_CACHE_TTL", str(30 * 24 * 3600)))  # 0 = never expire
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", "10000"))
+
+TABLE = "llm_prompt_cache"
+
+
+def cache_key(model, prompt, options=None):
+    blob = json.dumps({"model": model, "prompt": prompt, "options": options or {}}, sort_keys=True)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class SQLiteLLMCache:
+    """Local-disk backend; one connection shared across threads behind a lock."""
+
+    placeholder = "?"
+
+    def __init__(self, path, ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._execute(
+            f"CREATE TABLE IF NOT EXISTS {TABLE} ("
+            " key TEXT PRIMARY KEY, model TEXT, response TEXT NOT NULL,"
+            " created_at DOUBLE PRECISION NOT NULL, last_used DOUBLE PRECISION NOT NULL)"
+        )
+
+    def _execute(self, sql, params=()):
+        cur = self._conn.cursor()
+        cur.execute(sql.replace("%s", self.placeholder), params)
+        return cur
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._execute(f"SELECT response, created_at FROM {TABLE} WHERE key = %s", (key,)).fetchone()
+            if row is None:
+                return None
+            if self.ttl and row[1] < now - self.ttl:
+                self._execute(f"DELETE FROM {TABLE} WHERE key = %s", (key,))
+                return None
+            self._execute(f"UPDATE {TABLE} SET last_used = %s WHERE key = %s", (now, key))
+            return row[0]
+
+    def put(self, key, model, response):
+        now = time.time()
+        with self._lock:
+            self._execute(
+                f"INSERT INTO {TABLE} (key, model, response, created_at, last_used) VALUES (%s, %s, %s, %s, %s) "
+                "ON CONFLICT (key) DO UPDATE SET response = excluded.response, "
+                "created_at = excluded.created_at, last_used = excluded.last_used",
+                (key, model, response, now, now),
+            )
+            self._evict_locked(now)
+
+    def evict(self):
+        with self._lock:
+            return self._evict_locked(time.time())
+
+    def _evict_locked(self, now):
+        removed = 0
+        if self.ttl:
+            removed += self._execute(f"DELETE FROM {TABLE} WHERE created_at < %s", (now - self.ttl,)).rowcount
+        (count,) = self._execute(f"SELECT count(*) FROM {TABLE}").fetchone()
+        if self.max_entries and count > self.max_entries:
+            removed += self._execute(
+                f"DELETE FROM {TABLE} WHERE key IN (SELECT key FROM {TABLE} ORDER BY last_used LIMIT %s)",
+                (count - self.max_entries,),
+            ).rowcount
+        return removed
+
+    def stats(self):
+        with self._lock:
+            (count,) = self._execute(f"SELECT count(*) FROM {TABLE}").fetchone()
+        return {"entries": count, "ttl": self.ttl, "max_entries": self.max_entries}
+
+    def clear(self):
+        with self._lock:
+            self._execute(f"DELETE FROM {TABLE}")
+
+
+class PostgresLLMCache(SQLiteLLMCache):
+    """Shared backend for several hosts/containers; same SQL as SQLite with %s parameters."""
+
+    placeholder = "%s"
+
+    def __init__(self, dsn, ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._dsn = dsn
+        self._connect()
+        self._execute(
+            f"CREATE TABLE IF NOT EXISTS {TABLE} ("
+            " key TEXT PRIMARY KEY, model TEXT, response TEXT NOT NULL,"
+            " created_at DOUBLE PRECISION NOT NULL, last_used DOUBLE PRECISION NOT NULL)"
+        )
+
+    def _connect(self):
+        import psycopg2
+
+        self._conn = psycopg2.connect(self._dsn)
+        self._conn.autocommit = True
+
+    def _execute(self, sql, params=()):
+        import psycopg2
+
+        try:
+            return super()._execute(sql, params)
+        except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+            # Dropped connection (server restart, idle timeout): reconnect once and retry.
+            # If that fails too, the error reaches cached_completion, which calls the model.
+            logger.warning("LLM cache connection lost, reconnecting: %s", e)
+            self._conn.close()
+            self._connect()
+            return super()._execute(sql, params)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Process-wide cache from the environment, or None when disabled/unavailable."""
+    global _cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = PostgresLLMCache(LLM_CACHE_DSN) if LLM_CACHE_DSN else SQLiteLLMCache(LLM_CACHE_PATH)
+            except Exception as e:
+                logger.warning("LLM cache unavailable, calling the model directly: %s", e)
+                return None
+        return _cache
+
+
+def cached_completion(model, prompt, generate, options=None):
+    """
+    Return the cached response for (model, prompt, options), or call generate()
+    and store its result. Cache errors never fail the call; empty responses
+    are not stored.
+    """
+    cache = get_cache()
+    if cache is None:
+        return generate()
+    key = cache_key(model, prompt, options)
+    try:
+        hit = cache.get(key)
+    except Exception as e:
+        logger.warning("LLM cache read failed: %s", e)
+        hit = None
+    if hit is not None:
+        return hit
+    response = generate()
+    if response:
+        try:
+            cache.put(key, model, response)
+        except Exception as e:
+            logger.warning("LLM cache write failed: %s", e)
+    return response
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or trim the LLM prompt cache.")
+    parser.add_argument("command", choices=["stats", "evict", "clear"])
+    args = parser.parse_args()
+    cache = get_cache()
+    if cache is None:
+        print("[ERROR] LLM cache is disabled or unavailable", file=sys.stderr)
+        sys.exit(1)
+    if args.command == "stats":
+        result = cache.stats()
+    elif args.command == "evict":
+        result = {"removed": cache.evict()}
+    else:
+        cache.clear()
+        result = {"cleared": True}
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
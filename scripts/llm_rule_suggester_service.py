@@ -1,13 +1,16 @@
 from fastapi import FastAPI, Request, UploadFile, File, Body
 from pydantic import BaseModel
 import os
-import subprocess
 import json
 import requests
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional
 import re
 
+from scripts import suggest_rules
+from scripts.llm_cache import cached_completion
+
 app = FastAPI()
 
 # Helper for Docker/host detection
@@ -34,16 +37,11 @@ def healthz():
     return {"status": "ok"}
 
 def run_static_checker(target="."):
-    result = subprocess.run([
-        sys.executable, "scripts/suggest_rules.py", target
-    ], capture_output=True, text=True)
-    if result.returncode != 0:
-        raise RuntimeError(f"suggest_rules.py failed: {result.stderr}")
+    # In-process scan: no interpreter start-up or JSON round-trip per request
     try:
-        suggestions = json.loads(result.stdout)
+        return suggest_rules.suggest(target)
     except Exception as e:
-        raise RuntimeError(f"Failed to parse suggest_rules.py output as JSON: {e}")
-    return suggestions
+        raise RuntimeError(f"suggest_rules scan failed: {e}")
 
 def build_llm_prompt(suggestions):
     prompt = (
@@ -69,13 +67,17 @@ def call_ollama(chunk, prompt=None):
         "prompt": full_prompt,
         "stream": False
     }
-    print(f"[DEBUG] Sending to Ollama: {OLLAMA_URL} with payload: {json.dumps(payload)[:200]}...")
-    resp = requests.post(OLLAMA_URL, json=payload, timeout=120)
-    print(f"[DEBUG] Ollama response status: {resp.status_code}")
-    print(f"[DEBUG] Ollama response text: {resp.text[:500]}")
-    resp.raise_for_status()
-    data = resp.json()
-    return data.get("response", "")
+
+    def generate():
+        print(f"[DEBUG] Sending to Ollama: {OLLAMA_URL} with payload: {json.dumps(payload)[:200]}...")
+        resp = requests.post(OLLAMA_URL, json=payload, timeout=120)
+        print(f"[DEBUG] Ollama response status: {resp.status_code}")
+        print(f"[DEBUG] Ollama response text: {resp.text[:500]}")
+        resp.raise_for_status()
+        data = resp.json()
+        return data.get("response", "")
+
+    return cached_completion(MODEL, full_prompt, generate)
 
 def parse_llm_output(llm_output):
     # Try to parse as JSON first
@@ -143,22 +145,6 @@ async def review_code_file(file: UploadFile = File(...)):
         feedback = [f"[ERROR] LLM call failed: {e}"]
     return feedback 
 
-def chunk_text(text, max_tokens=2000):
-    lines = text.splitlines()
-    chunk = []
-    chunks = []
-    count = 0
-    for line in lines:
-        chunk.append(line)
-        count += 1
-        if count >= max_tokens:
-            chunks.append("\n".join(chunk))
-            chunk = []
-            count = 0
-    if chunk:
-        chunks.append("\n".join(chunk))
-    return chunks
-
 VERBOSE_PROMPT = (
     "Provide a detailed, technical summary of the following git diff. "
     "List all changed files, describe the nature of the changes, highlight any new features, "
@@ -169,20 +155,149 @@ CONCISE_PROMPT = (
     "Summarize the following git diff. List changed files and main changes."
 )
 
+REDUCE_PROMPT = (
+    "The following are summaries of consecutive parts of one git diff. "
+    "Merge them into a single summary of the whole diff: list all changed files once, "
+    "group related changes, and keep breaking changes and bug fixes explicit."
+)
+
+# Token budget per chunk sent to the model (prompt excluded) and parallel map calls
+DIFF_CHUNK_TOKENS = int(os.environ.get("DIFF_CHUNK_TOKENS", "3000"))
+DIFF_SUMMARY_CONCURRENCY = int(os.environ.get("DIFF_SUMMARY_CONCURRENCY", "4"))
+
+# Rough BPE-style count: identifiers/numbers and each punctuation mark are tokens
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text):
+    return len(_TOKEN_RE.findall(text))
+
+
+def split_diff_units(diff):
+    """
+    Split a unified diff into (file_header, body) units at file and hunk
+    boundaries. Each hunk becomes its own unit carrying its file's header, so
+    any chunk can be understood on its own.
+    """
+    units = []
+    header, hunk = [], []
+    in_hunks = False
+
+    def flush(end_of_file):
+        if hunk:
+            units.append(("\n".join(header), "\n".join(hunk)))
+        elif end_of_file and header and not in_hunks:
+            # Header-only file (rename, mode change, binary) or text without hunks
+            units.append(("\n".join(header), ""))
+
+    for line in diff.splitlines():
+        if line.startswith("diff --git "):
+            flush(end_of_file=True)
+            header, hunk, in_hunks = [line], [], False
+        elif line.startswith("@@"):
+            flush(end_of_file=False)
+            hunk, in_hunks = [line], True
+        elif in_hunks:
+            hunk.append(line)
+        else:
+            header.append(line)
+    flush(end_of_file=True)
+    return units
+
+
+def _split_lines_by_budget(text, budget):
+    pieces, piece, used = [], [], 0
+    for line in text.splitlines():
+        cost = estimate_tokens(line) + 1
+        if piece and used + cost > budget:
+            pieces.append("\n".join(piece))
+            piece, used = [], 0
+        piece.append(line)
+        used += cost
+    if piece:
+        pieces.append("\n".join(piece))
+    return pieces
+
+
+def chunk_diff(diff, max_tokens=None):
+    """
+    Pack diff hunks into chunks of at most ~max_tokens, never splitting a hunk
+    unless the hunk alone is over budget. A file header is repeated at the
+    start of every chunk that continues that file.
+    """
+    if max_tokens is None:
+        max_tokens = DIFF_CHUNK_TOKENS
+    chunks, current, used, current_header = [], [], 0, None
+    for header, body in split_diff_units(diff):
+        header_cost = estimate_tokens(header)
+        bodies = [body]
+        if not body and header_cost > max_tokens:
+            # Header-only unit over budget (a commit message preamble or plain non-diff
+            # text): split the text itself and send the pieces without a header
+            header, header_cost, body = "", 0, header
+        if estimate_tokens(body) + header_cost > max_tokens:
+            bodies = _split_lines_by_budget(body, max(max_tokens - header_cost, 1))
+        for part in bodies:
+            cost = estimate_tokens(part) + (header_cost if header != current_header else 0)
+            if current and used + cost > max_tokens:
+                chunks.append("\n".join(current))
+                current, used, current_header = [], 0, None
+                cost = estimate_tokens(part) + header_cost
+            if header != current_header:
+                if header:
+                    current.append(header)
+                current_header = header
+            if part:
+                current.append(part)
+            used += cost
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def _map_concurrently(func, items):
+    if len(items) <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=max(1, min(DIFF_SUMMARY_CONCURRENCY, len(items)))) as pool:
+        return list(pool.map(func, items))
+
+
+def reduce_summaries(summaries, max_tokens=None):
+    """Merge chunk summaries; if they don't fit one prompt, reduce groups in parallel and repeat."""
+    if max_tokens is None:
+        max_tokens = DIFF_CHUNK_TOKENS
+    while len(summaries) > 1:
+        groups, group, used = [], [], 0
+        for summary in summaries:
+            cost = estimate_tokens(summary)
+            if group and used + cost > max_tokens:
+                groups.append(group)
+                group, used = [], 0
+            group.append(summary)
+            used += cost
+        groups.append(group)
+        if len(groups) == len(summaries):
+            # Every summary is over budget on its own; merge them pairwise so this still terminates
+            groups = [summaries[i:i + 2] for i in range(0, len(summaries), 2)]
+        summaries = _map_concurrently(
+            lambda g: call_ollama("\n\n---\n\n".join(g), REDUCE_PROMPT), groups
+        )
+    return summaries[0] if summaries else ""
+
+
 @app.post("/summarize-git-diff")
 def summarize_git_diff(
     diff: str = Body(..., embed=True),
     concise: bool = Body(False, embed=True)
 ):
     prompt = CONCISE_PROMPT if concise else VERBOSE_PROMPT
-    chunks = chunk_text(diff, max_tokens=2000)
-    summaries = []
-    for i, chunk in enumerate(chunks):
-        summary = call_ollama(chunk, prompt)
-        summaries.append(summary)
+    chunks = chunk_diff(diff, max_tokens=DIFF_CHUNK_TOKENS)
+    # Map: summarize chunks in parallel; reduce: merge them into one summary
+    summaries = _map_concurrently(lambda chunk: call_ollama(chunk, prompt), chunks)
+    combined = reduce_summaries(summaries) if len(summaries) > 1 else "".join(summaries)
     return {
         "summaries": summaries,
-        "combined": "\n\n".join(summaries),
+        "combined": combined,
         "chunks": len(chunks),
         "prompt": prompt
-    } 
\ No newline at end of file
+    }
@@ -8,7 +8,9 @@ Provides functions to extract and infer edges (relationships) between memory nod
 - (Future) Custom user-defined rules
 """
 
-from typing import List, Dict, Any
+from array import array
+from collections import defaultdict, deque
+from typing import List, Dict, Any, Iterator, Optional, Set, Tuple
 import json
 
 
@@ -19,60 +21,285 @@ def extract_explicit_edges(nodes: List[Dict[str, Any]], edges: List[Dict[str, An
     return edges
 
 
-def extract_tag_based_edges(nodes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+# Tags shared by more nodes than this are skipped when generating pairs; a
+# bucket of k nodes yields k*(k-1) edges, so one hot tag would dominate.
+TAG_BUCKET_MAX = 500
+
+
+def _node_tags(node: Dict[str, Any]) -> Set[str]:
+    meta = node.get("meta", "{}")
+    try:
+        meta_dict = json.loads(meta)
+        return set(meta_dict.get("tags", []))
+    except Exception:
+        return set()
+
+
+def build_tag_index(nodes: List[Dict[str, Any]]) -> Tuple[Dict[str, Set[str]], Dict[str, List[str]]]:
     """
-    Infer edges between nodes that share tags or metadata.
-    Returns a list of inferred edge dicts: {from_id, to_id, relation_type, meta}
+    Parse node tags once and build the tag -> node id inverted index.
+    Returns (node_tags, tag_index); index buckets keep node order.
     """
-    inferred_edges = []
-    # Parse tags for each node
     node_tags = {}
+    tag_index = defaultdict(list)
     for node in nodes:
-        meta = node.get("meta", "{}")
-        try:
-            meta_dict = json.loads(meta)
-            tags = set(meta_dict.get("tags", []))
-        except Exception:
-            tags = set()
+        tags = _node_tags(node)
         node_tags[node["id"]] = tags
-    # For each pair of nodes, infer edge if they share at least one tag
-    node_ids = list(node_tags.keys())
-    for i, id1 in enumerate(node_ids):
-        for id2 in node_ids:
-            if id1 == id2:
+        for tag in tags:
+            tag_index[tag].append(node["id"])
+    return node_tags, dict(tag_index)
+
+
+def iter_tag_based_edges(
+    nodes: List[Dict[str, Any]], max_bucket_size: Optional[int] = TAG_BUCKET_MAX
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield shared_tag edges using the inverted index: only nodes that share a
+    bucket are compared, and each ordered pair is yielded once with all of its
+    shared tags. Buckets larger than max_bucket_size (None = no cap) do not
+    generate pairs on their own.
+    """
+    node_tags, tag_index = build_tag_index(nodes)
+    position = {node_id: i for i, node_id in enumerate(node_tags)}
+    for id1, tags1 in node_tags.items():
+        candidates = set()
+        for tag in tags1:
+            bucket = tag_index[tag]
+            if max_bucket_size is not None and len(bucket) > max_bucket_size:
                 continue
-            shared = node_tags[id1] & node_tags[id2]
-            if shared:
-                inferred_edges.append({
-                    "from_id": id1,
-                    "to_id": id2,
-                    "relation_type": "shared_tag",
-                    "meta": json.dumps({"shared_tags": list(shared)})
-                })
-    return inferred_edges
+            candidates.update(bucket)
+        candidates.discard(id1)
+        for id2 in sorted(candidates, key=position.__getitem__):
+            shared = tags1 & node_tags[id2]
+            yield {
+                "from_id": id1,
+                "to_id": id2,
+                "relation_type": "shared_tag",
+                "meta": json.dumps({"shared_tags": list(shared)})
+            }
 
 
-def extract_content_based_edges(nodes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def extract_tag_based_edges(
+    nodes: List[Dict[str, Any]], max_bucket_size: Optional[int] = TAG_BUCKET_MAX
+) -> List[Dict[str, Any]]:
     """
-    Infer edges between nodes based on content references (e.g., one node mentions another).
+    Infer edges between nodes that share tags or metadata.
     Returns a list of inferred edge dicts: {from_id, to_id, relation_type, meta}
+    Use iter_tag_based_edges to stream edges for large node sets.
+    """
+    return list(iter_tag_based_edges(nodes, max_bucket_size))
+
+
+# Names/aliases shorter than this are too noisy to match as substrings
+ALIAS_MIN_LENGTH = 3
+
+
+# Upper bound on the total length of the ids/aliases compiled into one automaton
+# (roughly 25 bytes per character while building, so ~125 MB). Larger pattern sets
+# are split into batches and every content is scanned once per batch.
+CONTENT_PATTERN_MAX_CHARS = 5_000_000
+
+
+class PatternAutomaton:
+    """
+    Aho-Corasick automaton over a set of string patterns. find_all(text) scans
+    the text once and returns every pattern that occurs in it as a substring,
+    so the cost is linear in len(text) plus the number of matches.
+
+    States live in flat int arrays instead of a dict per state. Patterns are
+    inserted one after another, so a newly created state's first child is
+    always the next state id: that edge is stored as its character in
+    _chain[state], and only branching edges go into one shared dict keyed by
+    (state << 21) | ord(ch).
     """
-    inferred_edges = []
-    node_ids = {node["id"] for node in nodes}
+
+    def __init__(self, patterns):
+        self._patterns: List[str] = []
+        self._chain = array("i", [-1])
+        self._branch: Dict[int, int] = {}
+        self._fail = array("i", [0])
+        self._out = array("i", [-1])
+        for pattern in dict.fromkeys(patterns):
+            self._add(pattern)
+        self._build_links()
+
+    def _add(self, pattern: str):
+        if not pattern:
+            return
+        chain, branch = self._chain, self._branch
+        state = 0
+        for i, ch in enumerate(pattern):
+            code = ord(ch)
+            if chain[state] == code:
+                state += 1
+                continue
+            nxt = branch.get((state << 21) | code, -1)
+            if nxt >= 0:
+                state = nxt
+                continue
+            # The rest of the pattern is new: append it as one chain of states
+            first = len(chain)
+            if chain[state] == -1 and first == state + 1:
+                chain[state] = code
+            else:
+                branch[(state << 21) | code] = first
+            rest = len(pattern) - i
+            chain.extend(array("i", [ord(c) for c in pattern[i + 1:]] + [-1]))
+            self._fail.extend(array("i", bytes(4 * rest)))
+            self._out.extend(array("i", [-1]) * rest)
+            state = first + rest - 1
+            break
+        self._out[state] = len(self._patterns)
+        self._patterns.append(pattern)
+
+    def _children(self):
+        children = defaultdict(list)
+        for key, child in self._branch.items():
+            children[key >> 21].append((key & 0x1FFFFF, child))
+        return children
+
+    def _build_links(self):
+        branch_children = self._children()
+        chain, branch, fail, out = self._chain, self._branch, self._fail, self._out
+        # Output link: nearest state on the fail chain that ends a pattern (0 = none)
+        self._out_link = out_link = array("i", bytes(4 * len(fail)))
+        # (state, parent, char code) in breadth-first order; depth-1 states keep fail = 0
+        queue = deque([(0, -1, -1)])
+        while queue:
+            state, parent, code = queue.popleft()
+            if parent > 0:
+                f = fail[parent]
+                while True:
+                    if chain[f] == code:
+                        target = f + 1
+                    else:
+                        target = branch.get((f << 21) | code, -1)
+                    if target >= 0 or not f:
+                        break
+                    f = fail[f]
+                fail[state] = target if target >= 0 and target != state else 0
+                out_link[state] = fail[state] if out[fail[state]] >= 0 else out_link[fail[state]]
+            if chain[state] != -1:
+                queue.append((state + 1, state, chain[state]))
+            kids = branch_children.get(state)
+            if kids:
+                queue.extend((child, state, c) for c, child in kids)
+
+    def find_all(self, text: str) -> Set[str]:
+        found = set()
+        chain, branch, fail, out, out_link = self._chain, self._branch, self._fail, self._out, self._out_link
+        patterns = self._patterns
+        state = 0
+        for ch in text:
+            code = ord(ch)
+            while True:
+                if chain[state] == code:
+                    state += 1
+                    break
+                nxt = branch.get((state << 21) | code, -1)
+                if nxt >= 0:
+                    state = nxt
+                    break
+                if not state:
+                    break
+                state = fail[state]
+            hit = state if out[state] >= 0 else out_link[state]
+            while hit:
+                found.add(patterns[out[hit]])
+                hit = out_link[hit]
+        return found
+
+
+def _pattern_batches(patterns, max_chars: int) -> List[List[str]]:
+    batches, batch, used = [], [], 0
+    for pattern in patterns:
+        if batch and used + len(pattern) > max_chars:
+            batches.append(batch)
+            batch, used = [], 0
+        batch.append(pattern)
+        used += len(pattern)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def _node_aliases(node: Dict[str, Any]) -> List[str]:
+    """Extra names a node can be referenced by: meta 'name' and 'aliases'."""
+    try:
+        meta_dict = json.loads(node.get("meta", "{}"))
+    except Exception:
+        return []
+    if not isinstance(meta_dict, dict):
+        return []
+    aliases = meta_dict.get("aliases") or []
+    if isinstance(aliases, str):
+        aliases = [aliases]
+    names = [meta_dict.get("name")] + list(aliases)
+    return [n for n in names if isinstance(n, str) and len(n) >= ALIAS_MIN_LENGTH]
+
+
+def _find_in_contents(nodes: List[Dict[str, Any]], batches: List[List[str]]) -> Iterator[Tuple[Dict[str, Any], Set[str]]]:
+    """Yield (node, patterns found in its content); streams when everything fits one automaton."""
+    if len(batches) <= 1:
+        automaton = PatternAutomaton(batches[0] if batches else [])
+        for node in nodes:
+            yield node, automaton.find_all(node.get("content", "") or "")
+        return
+    found: Dict[int, Set[str]] = defaultdict(set)
+    for batch in batches:
+        automaton = PatternAutomaton(batch)
+        for i, node in enumerate(nodes):
+            hits = automaton.find_all(node.get("content", "") or "")
+            if hits:
+                found[i].update(hits)
+        del automaton
+    for i, node in enumerate(nodes):
+        yield node, found.get(i, set())
+
+
+def iter_content_based_edges(nodes: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """
+    Yield content_ref edges. One PatternAutomaton is built over every node id
+    (plus meta names/aliases) and each node's content is scanned once. Pattern
+    sets over CONTENT_PATTERN_MAX_CHARS are split into several automatons, built
+    one at a time; edges are then yielded after the last batch.
+    """
+    # pattern -> [(to_id, is_id)]
+    targets = defaultdict(list)
     for node in nodes:
+        targets[node["id"]].append((node["id"], True))
+        for alias in _node_aliases(node):
+            targets[alias].append((node["id"], False))
+    for node, found in _find_in_contents(nodes, _pattern_batches(targets, CONTENT_PATTERN_MAX_CHARS)):
         from_id = node["id"]
-        content = node.get("content", "")
-        for to_id in node_ids:
-            if from_id == to_id:
-                continue
-            if to_id in content:
-                inferred_edges.append({
-                    "from_id": from_id,
-                    "to_id": to_id,
-                    "relation_type": "content_ref",
-                    "meta": f'{{"matched_id": "{to_id}"}}'
-                })
-    return inferred_edges
+        matches = {}
+        for pattern in found:
+            for to_id, is_id in targets[pattern]:
+                if to_id == from_id:
+                    continue
+                # Prefer reporting the id itself over an alias match
+                if is_id or to_id not in matches:
+                    matches[to_id] = None if is_id else pattern
+                elif matches[to_id] is not None:
+                    matches[to_id] = min(matches[to_id], pattern)
+        for to_id, alias in matches.items():
+            meta = {"matched_id": to_id}
+            if alias is not None:
+                meta["matched_text"] = alias
+            yield {
+                "from_id": from_id,
+                "to_id": to_id,
+                "relation_type": "content_ref",
+                "meta": json.dumps(meta)
+            }
+
+
+def extract_content_based_edges(nodes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Infer edges between nodes based on content references (e.g., one node mentions another).
+    Returns a list of inferred edge dicts: {from_id, to_id, relation_type, meta}
+    """
+    return list(iter_content_based_edges(nodes))
 
 
 def extract_custom_edges(nodes: List[Dict[str, Any]], config: Dict[str, Any] = None) -> List[Dict[str, Any]]:
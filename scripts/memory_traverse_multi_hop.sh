@@ -1,15 +1,12 @@
 #!/bin/bash
-# Usage: ./memory_traverse_multi_hop.sh <start_node_id>
+# Usage: ./memory_traverse_multi_hop.sh <start_node_id> [max_depth] [direction: out|in|both] [relation_type]
+# Runs server-side as one recursive query (POST /memory/graph/traverse).
 START_NODE="$1"
-declare -A visited
-traverse() {
-  local node_id="$1"
-  if [[ -n "${visited[$node_id]}" ]]; then return; fi
-  visited[$node_id]=1
-  echo "Node: $node_id"
-  curl -s http://localhost:9103/memory/nodes | jq --arg id "$node_id" '.[] | select(.id == $id)'
-  for to_id in $(curl -s "http://localhost:9103/memory/edges?from_id=$node_id" | jq -r '.[].to_id'); do
-    traverse "$to_id"
-  done
-}
-traverse "$START_NODE" 
\ No newline at end of file
+MAX_DEPTH="${2:-3}"
+DIRECTION="${3:-out}"
+REL_TYPE="$4"
+PAYLOAD=$(jq -n --arg id "$START_NODE" --argjson depth "$MAX_DEPTH" --arg dir "$DIRECTION" --arg rel "$REL_TYPE" \
+  '{start_ids: [$id], max_depth: $depth, direction: $dir} + (if $rel == "" then {} else {relation_types: [$rel]} end)')
+curl -s -X POST http://localhost:9103/memory/graph/traverse \
+  -H "Content-Type: application/json" \
+  -d "$PAYLOAD" | jq .
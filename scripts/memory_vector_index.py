@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Manage the approximate-nearest-neighbour (pgvector) index on memory_vectors.embedding
+and measure recall vs latency for search-time settings.
+
+Usage:
+  python scripts/memory_vector_index.py status
+  python scripts/memory_vector_index.py create --method hnsw --m 16 --ef-construction 64
+  python scripts/memory_vector_index.py create --method ivfflat --lists 1000
+  python scripts/memory_vector_index.py drop
+  python scripts/memory_vector_index.py report --samples 50 --k 10 --ef-search 20,40,80,160 --probes 1,10,50
+
+The index is always named ix_memory_vectors_embedding_ann and uses vector_cosine_ops,
+matching the `<=>` operator used by POST /memory/nodes/search.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import psycopg2
+
+DB_NAME = os.environ.get("MEMORYDB_NAME", "memorydb")
+DB_USER = os.environ.get("POSTGRES_USER", "postgres")
+DB_PASSWORD = os.environ.get("POSTGRES_PASSWORD", "postgres")
+DB_HOST = os.environ.get("POSTGRES_HOST", "db-test")
+DB_PORT = os.environ.get("POSTGRES_PORT", "5432")
+
+INDEX_NAME = "ix_memory_vectors_embedding_ann"
+
+
+def connect():
+    return psycopg2.connect(
+        dbname=DB_NAME, user=DB_USER, password=DB_PASSWORD, host=DB_HOST, port=DB_PORT
+    )
+
+
+def index_ddl(method: str, m: int = 16, ef_construction: int = 64, lists: int = 100) -> str:
+    if method == "hnsw":
+        params = f"m = {int(m)}, ef_construction = {int(ef_construction)}"
+    elif method == "ivfflat":
+        params = f"lists = {int(lists)}"
+    else:
+        raise ValueError(f"Unknown index method: {method}")
+    return (
+        f"CREATE INDEX {INDEX_NAME} ON memory_vectors "
+        f"USING {method} (embedding vector_cosine_ops) WITH ({params});"
+    )
+
+
+def index_status(cur) -> dict:
+    cur.execute("SELECT indexdef FROM pg_indexes WHERE indexname = %s;", (INDEX_NAME,))
+    row = cur.fetchone()
+    cur.execute("SELECT count(*) FROM memory_vectors;")
+    (rows,) = cur.fetchone()
+    return {"index": INDEX_NAME, "definition": row[0] if row else None, "rows": rows}
+
+
+def create_index(conn, method, m, ef_construction, lists):
+    # IVFFlat centroids are trained on existing rows; build it after bulk loads.
+    with conn.cursor() as cur:
+        cur.execute(f"DROP INDEX IF EXISTS {INDEX_NAME};")
+        cur.execute(index_ddl(method, m=m, ef_construction=ef_construction, lists=lists))
+    conn.commit()
+
+
+def drop_index(conn):
+    with conn.cursor() as cur:
+        cur.execute(f"DROP INDEX IF EXISTS {INDEX_NAME};")
+    conn.commit()
+
+
+def _top_k(cur, vec, k, namespace=None):
+    sql = "SELECT id FROM memory_vectors"
+    params = [vec]
+    if namespace:
+        sql += " WHERE namespace = %s"
+        params.insert(0, namespace)
+    sql += " ORDER BY embedding <=> %s::vector LIMIT %s"
+    params.append(k)
+    cur.execute(sql, params)
+    return [r[0] for r in cur.fetchall()]
+
+
+def recall_report(conn, samples=50, k=10, ef_search=(), probes=(), namespace=None) -> list:
+    """
+    Use `samples` random stored embeddings as queries. Ground truth comes from an exact
+    scan (index scans disabled); each setting is scored by recall@k and mean/p95 latency.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT embedding::text FROM memory_vectors WHERE embedding IS NOT NULL "
+            "ORDER BY random() LIMIT %s;",
+            (samples,),
+        )
+        queries = [r[0] for r in cur.fetchall()]
+    if not queries:
+        return []
+
+    def run(settings):
+        hits, latencies, truth_total = 0, [], 0
+        for vec in queries:
+            with conn.cursor() as cur:
+                cur.execute("SET LOCAL enable_indexscan = off;")
+                cur.execute("SET LOCAL enable_bitmapscan = off;")
+                truth = set(_top_k(cur, vec, k, namespace))
+            conn.rollback()
+            with conn.cursor() as cur:
+                for name, value in settings.items():
+                    cur.execute("SELECT set_config(%s, %s, true);", (name, str(value)))
+                start = time.perf_counter()
+                found = _top_k(cur, vec, k, namespace)
+                latencies.append((time.perf_counter() - start) * 1000)
+            conn.rollback()
+            hits += len(truth.intersection(found))
+            truth_total += len(truth)
+        latencies.sort()
+        return {
+            "settings": settings,
+            "recall_at_k": round(hits / truth_total, 4) if truth_total else None,
+            "mean_ms": round(sum(latencies) / len(latencies), 3),
+            "p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))], 3),
+        }
+
+    rows = [run({})]
+    rows += [run({"hnsw.ef_search": v}) for v in ef_search]
+    rows += [run({"ivfflat.probes": v}) for v in probes]
+    return rows
+
+
+def _int_list(value: str):
+    return [int(v) for v in value.split(",") if v.strip()] if value else []
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the memory_vectors ANN index.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="Show the current ANN index definition and row count")
+    create = sub.add_parser("create", help="(Re)build the ANN index")
+    create.add_argument("--method", choices=["hnsw", "ivfflat"], default="hnsw")
+    create.add_argument("--m", type=int, default=16, help="HNSW max connections per layer")
+    create.add_argument("--ef-construction", type=int, default=64, help="HNSW build candidate list size")
+    create.add_argument("--lists", type=int, default=100, help="IVFFlat lists (~rows/1000 up to 1M rows, sqrt(rows) above)")
+    sub.add_parser("drop", help="Drop the ANN index (searches fall back to exact scans)")
+    report = sub.add_parser("report", help="Recall-vs-latency report for search settings")
+    report.add_argument("--samples", type=int, default=50)
+    report.add_argument("--k", type=int, default=10)
+    report.add_argument("--namespace", default=None)
+    report.add_argument("--ef-search", default="20,40,80,160", help="Comma-separated hnsw.ef_search values")
+    report.add_argument("--probes", default="", help="Comma-separated ivfflat.probes values")
+    args = parser.parse_args()
+
+    try:
+        conn = connect()
+    except Exception as e:
+        print(f"[ERROR] Could not connect to {DB_NAME}: {e}", file=sys.stderr)
+        sys.exit(1)
+    try:
+        if args.command == "status":
+            with conn.cursor() as cur:
+                result = index_status(cur)
+        elif args.command == "create":
+            create_index(conn, args.method, args.m, args.ef_construction, args.lists)
+            with conn.cursor() as cur:
+                result = index_status(cur)
+        elif args.command == "drop":
+            drop_index(conn)
+            result = {"dropped": INDEX_NAME}
+        else:
+            result = recall_report(
+                conn,
+                samples=args.samples,
+                k=args.k,
+                ef_search=_int_list(args.ef_search),
+                probes=_int_list(args.probes),
+                namespace=args.namespace,
+            )
+        print(json.dumps(result, indent=2))
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
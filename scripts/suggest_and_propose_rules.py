@@ -1,9 +1,13 @@
 import os
-import subprocess
 import json
 import requests
 import sys
 
+try:
+    import scripts.suggest_rules as suggest_rules
+except ImportError:  # run directly as `python scripts/suggest_and_propose_rules.py`
+    import suggest_rules
+
 def get_default_url(port, path):
     if os.environ.get("RUNNING_IN_DOCKER") == "1":
         host = "host.docker.internal"
@@ -23,19 +27,12 @@ MODEL = os.environ.get("OLLAMA_MODEL", "llama3")
 
 
 def run_static_checker(target="."):
-    """Run scripts/suggest_rules.py and return its JSON output as a Python object."""
-    result = subprocess.run([
-        sys.executable, "scripts/suggest_rules.py", target
-    ], capture_output=True, text=True)
-    if result.returncode != 0:
-        print("[ERROR] suggest_rules.py failed:", result.stderr)
-        sys.exit(1)
+    """Run the suggest_rules checkers in-process and return the suggestions."""
     try:
-        suggestions = json.loads(result.stdout)
+        return suggest_rules.suggest(target)
     except Exception as e:
-        print("[ERROR] Failed to parse suggest_rules.py output as JSON:", e)
+        print("[ERROR] suggest_rules scan failed:", e)
         sys.exit(1)
-    return suggestions
 
 
 def build_llm_prompt(suggestions):
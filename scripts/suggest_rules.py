@@ -1,10 +1,15 @@
 import argparse
 import ast
+import hashlib
 import json
+import multiprocessing
 import os
 import re
+import subprocess
 import sys
-from typing import Dict, List
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
 
 # --- Pattern checkers ---
 
@@ -48,39 +53,168 @@ def check_direct_sql(file_path: str, content: str, project: str = None) -> List[
     return suggestions
 
 
-def check_print_statements(
-    file_path: str, content: str, project: str = None
-) -> List[Dict]:
+# --- Per-node / per-line suggestion builders (shared by the checkers and the engine) ---
+
+DEPRECATED_LIBS = ["imp", "optparse", "cgi", "cStringIO", "stringold", "md5", "sha"]
+_DEPRECATED_LIBS_ALT = "|".join(re.escape(lib) for lib in DEPRECATED_LIBS)
+_DEPRECATED_IMPORT_RE = re.compile(
+    rf"import (?P<imp>{_DEPRECATED_LIBS_ALT})(\s|$)|from (?P<frm>{_DEPRECATED_LIBS_ALT}) "
+)
+_HARDCODED_SECRET_RE = re.compile(
+    r"(password|secret|api[_-]?key|token)\s*=\s*['\"]", re.IGNORECASE
+)
+_TODO_FIXME_RE = re.compile(r"#\s*(TODO|FIXME)", re.IGNORECASE)
+_WILDCARD_IMPORT_RE = re.compile(r"from \\S+ import \\*")
+
+
+def _print_suggestion(file_path: str, node: ast.AST, **_) -> Optional[Dict]:
+    if getattr(node.func, "id", None) != "print":
+        return None
+    return {
+        "rule_type": "no_print",
+        "description": f"print() statement found in {file_path} at line {node.lineno}.",
+        "diff": "# Rule: no_print\n\n## Description\nAvoid print statements in production code.\n",
+        "submitted_by": "ai-rule-suggester",
+    }
+
+
+def _eval_suggestion(file_path: str, node: ast.AST, **_) -> Optional[Dict]:
+    if getattr(node.func, "id", None) != "eval":
+        return None
+    return {
+        "rule_type": "no_eval",
+        "description": f"eval() usage found in {file_path} at line {node.lineno}.",
+        "diff": "# Rule: no_eval\n\n## Description\nAvoid use of eval() due to security risks.\n",
+        "submitted_by": "ai-rule-suggester",
+    }
+
+
+def _bare_except_suggestion(file_path: str, node: ast.AST, **_) -> Optional[Dict]:
+    if node.type is not None:
+        return None
+    return {
+        "rule_type": "no_bare_except",
+        "description": f"Bare except found in {file_path} at line {node.lineno}.",
+        "diff": "# Rule: no_bare_except\n\n## Description\nDo not use bare except: always specify the exception type.\n",
+        "submitted_by": "ai-rule-suggester",
+    }
+
+
+def _long_function_suggestion(
+    file_path: str, node: ast.AST, max_lines: int = 50, **_
+) -> Optional[Dict]:
+    start = node.lineno
+    end = getattr(node, "end_lineno", None)
+    if end is None:
+        # Fallback: estimate end line
+        end = max(
+            [n.lineno for n in ast.walk(node) if hasattr(n, "lineno")],
+            default=start,
+        )
+    if end - start + 1 <= max_lines:
+        return None
+    return {
+        "rule_type": "long_function",
+        "description": f"Function '{node.name}' in {file_path} is too long ({end - start + 1} lines, limit {max_lines}).",
+        "diff": f"# Rule: long_function\n\n## Description\nFunctions should not exceed {max_lines} lines. Refactor into smaller functions.\n",
+        "submitted_by": "ai-rule-suggester",
+    }
+
+
+def _missing_docstring_suggestion(file_path: str, node: ast.AST, **_) -> Optional[Dict]:
+    if ast.get_docstring(node):
+        return None
+    return {
+        "rule_type": "missing_docstring",
+        "description": f"Missing docstring for {type(node).__name__} '{getattr(node, 'name', '?')}' in {file_path} at line {node.lineno}.",
+        "diff": "# Rule: missing_docstring\n\n## Description\nAll functions and classes should have docstrings.\n",
+        "submitted_by": "ai-rule-suggester",
+    }
+
+
+def _todo_fixme_suggestion(file_path: str, i: int, line: str) -> Optional[Dict]:
+    if not _TODO_FIXME_RE.search(line):
+        return None
+    return {
+        "rule_type": "todo_fixme_comment",
+        "description": f"{line.strip()} found in {file_path} at line {i}.",
+        "diff": "# Rule: todo_fixme_comment\n\n## Description\nTrack and resolve TODO/FIXME comments promptly.\n",
+        "submitted_by": "ai-rule-suggester",
+    }
+
+
+def _wildcard_import_suggestion(file_path: str, i: int, line: str) -> Optional[Dict]:
+    if not _WILDCARD_IMPORT_RE.match(line):
+        return None
+    return {
+        "rule_type": "no_wildcard_imports",
+        "description": f"Wildcard import found in {file_path} at line {i}.",
+        "diff": "# Rule: no_wildcard_imports\n\n## Description\nAvoid wildcard imports (from module import *).\n",
+        "submitted_by": "ai-rule-suggester",
+    }
+
+
+def _deprecated_library_suggestion(file_path: str, i: int, line: str) -> Optional[Dict]:
+    m = _DEPRECATED_IMPORT_RE.match(line)
+    if not m:
+        return None
+    lib = m.group("imp") or m.group("frm")
+    return {
+        "rule_type": "deprecated_library",
+        "description": f"Deprecated library '{lib}' used in {file_path} at line {i}.",
+        "diff": f"# Rule: deprecated_library\n\n## Description\nDo not use deprecated library '{lib}'. Use modern alternatives.\n",
+        "submitted_by": "ai-rule-suggester",
+    }
+
+
+def _walk_with(file_path: str, content: str, node_types, builder, **kwargs) -> List[Dict]:
     suggestions = []
     try:
         tree = ast.parse(content)
         for node in ast.walk(tree):
-            if isinstance(node, ast.Call) and getattr(node.func, "id", None) == "print":
-                suggestions.append(
-                    {
-                        "rule_type": "no_print",
-                        "description": f"print() statement found in {file_path} at line {node.lineno}.",
-                        "diff": "# Rule: no_print\n\n## Description\nAvoid print statements in production code.\n",
-                        "submitted_by": "ai-rule-suggester",
-                    }
-                )
+            if isinstance(node, node_types):
+                suggestion = builder(file_path, node, **kwargs)
+                if suggestion:
+                    suggestions.append(suggestion)
     except Exception:
         pass
     return suggestions
 
 
+def _lines_with(file_path: str, content: str, builder) -> List[Dict]:
+    suggestions = []
+    for i, line in enumerate(content.splitlines(), 1):
+        suggestion = builder(file_path, i, line)
+        if suggestion:
+            suggestions.append(suggestion)
+    return suggestions
+
+
+def check_print_statements(
+    file_path: str, content: str, project: str = None
+) -> List[Dict]:
+    return _walk_with(file_path, content, ast.Call, _print_suggestion)
+
+
 def check_unused_imports(
     file_path: str, content: str, project: str = None
 ) -> List[Dict]:
-    suggestions = []
     import_lines = [
         line for line in content.splitlines() if line.strip().startswith("import ")
     ]
+    return _unused_import_suggestions(file_path, content, import_lines)
+
+
+def _unused_import_suggestions(
+    file_path: str, content: str, import_lines: List[str]
+) -> List[Dict]:
+    suggestions = []
     for line in import_lines:
         # Very basic: flag as unused if the imported name doesn't appear elsewhere
         parts = line.replace("import", "").strip().split()
+        rest = content.replace(line, "")
         for name in parts:
-            if name and name not in content.replace(line, ""):
+            if name and name not in rest:
                 suggestions.append(
                     {
                         "rule_type": "unused_import",
@@ -97,9 +231,7 @@ def check_hardcoded_secrets(
 ) -> List[Dict]:
     suggestions = []
     # Simple regex for common secret patterns
-    if re.search(
-        r"(password|secret|api[_-]?key|token)\s*=\s*['\"]", content, re.IGNORECASE
-    ):
+    if _HARDCODED_SECRET_RE.search(content):
         suggestions.append(
             {
                 "rule_type": "no_hardcoded_secrets",
@@ -114,146 +246,46 @@ def check_hardcoded_secrets(
 def check_todo_fixme_comments(
     file_path: str, content: str, project: str = None
 ) -> List[Dict]:
-    suggestions = []
-    for i, line in enumerate(content.splitlines(), 1):
-        if re.search(r"#\s*(TODO|FIXME)", line, re.IGNORECASE):
-            suggestions.append(
-                {
-                    "rule_type": "todo_fixme_comment",
-                    "description": f"{line.strip()} found in {file_path} at line {i}.",
-                    "diff": "# Rule: todo_fixme_comment\n\n## Description\nTrack and resolve TODO/FIXME comments promptly.\n",
-                    "submitted_by": "ai-rule-suggester",
-                }
-            )
-    return suggestions
+    return _lines_with(file_path, content, _todo_fixme_suggestion)
 
 
 def check_eval_usage(file_path: str, content: str, project: str = None) -> List[Dict]:
-    suggestions = []
-    try:
-        tree = ast.parse(content)
-        for node in ast.walk(tree):
-            if isinstance(node, ast.Call) and getattr(node.func, "id", None) == "eval":
-                suggestions.append(
-                    {
-                        "rule_type": "no_eval",
-                        "description": f"eval() usage found in {file_path} at line {node.lineno}.",
-                        "diff": "# Rule: no_eval\n\n## Description\nAvoid use of eval() due to security risks.\n",
-                        "submitted_by": "ai-rule-suggester",
-                    }
-                )
-    except Exception:
-        pass
-    return suggestions
+    return _walk_with(file_path, content, ast.Call, _eval_suggestion)
 
 
 def check_bare_except(file_path: str, content: str, project: str = None) -> List[Dict]:
-    suggestions = []
-    try:
-        tree = ast.parse(content)
-        for node in ast.walk(tree):
-            if isinstance(node, ast.ExceptHandler) and node.type is None:
-                suggestions.append(
-                    {
-                        "rule_type": "no_bare_except",
-                        "description": f"Bare except found in {file_path} at line {node.lineno}.",
-                        "diff": "# Rule: no_bare_except\n\n## Description\nDo not use bare except: always specify the exception type.\n",
-                        "submitted_by": "ai-rule-suggester",
-                    }
-                )
-    except Exception:
-        pass
-    return suggestions
+    return _walk_with(file_path, content, ast.ExceptHandler, _bare_except_suggestion)
 
 
 def check_wildcard_imports(
     file_path: str, content: str, project: str = None
 ) -> List[Dict]:
-    suggestions = []
-    for i, line in enumerate(content.splitlines(), 1):
-        if re.match(r"from \\S+ import \\*", line):
-            suggestions.append(
-                {
-                    "rule_type": "no_wildcard_imports",
-                    "description": f"Wildcard import found in {file_path} at line {i}.",
-                    "diff": "# Rule: no_wildcard_imports\n\n## Description\nAvoid wildcard imports (from module import *).\n",
-                    "submitted_by": "ai-rule-suggester",
-                }
-            )
-    return suggestions
+    return _lines_with(file_path, content, _wildcard_import_suggestion)
 
 
 def check_long_functions(
     file_path: str, content: str, project: str = None, max_lines: int = 50
 ) -> List[Dict]:
-    suggestions = []
-    try:
-        tree = ast.parse(content)
-        for node in ast.walk(tree):
-            if isinstance(node, ast.FunctionDef):
-                start = node.lineno
-                end = getattr(node, "end_lineno", None)
-                if end is None:
-                    # Fallback: estimate end line
-                    end = max(
-                        [n.lineno for n in ast.walk(node) if hasattr(n, "lineno")],
-                        default=start,
-                    )
-                if end - start + 1 > max_lines:
-                    suggestions.append(
-                        {
-                            "rule_type": "long_function",
-                            "description": f"Function '{node.name}' in {file_path} is too long ({end - start + 1} lines, limit {max_lines}).",
-                            "diff": f"# Rule: long_function\n\n## Description\nFunctions should not exceed {max_lines} lines. Refactor into smaller functions.\n",
-                            "submitted_by": "ai-rule-suggester",
-                        }
-                    )
-    except Exception:
-        pass
-    return suggestions
+    return _walk_with(
+        file_path, content, ast.FunctionDef, _long_function_suggestion, max_lines=max_lines
+    )
 
 
 def check_missing_docstrings(
     file_path: str, content: str, project: str = None
 ) -> List[Dict]:
-    suggestions = []
-    try:
-        tree = ast.parse(content)
-        for node in ast.walk(tree):
-            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
-                if not ast.get_docstring(node):
-                    suggestions.append(
-                        {
-                            "rule_type": "missing_docstring",
-                            "description": f"Missing docstring for {type(node).__name__} '{getattr(node, 'name', '?')}' in {file_path} at line {node.lineno}.",
-                            "diff": "# Rule: missing_docstring\n\n## Description\nAll functions and classes should have docstrings.\n",
-                            "submitted_by": "ai-rule-suggester",
-                        }
-                    )
-    except Exception:
-        pass
-    return suggestions
+    return _walk_with(
+        file_path,
+        content,
+        (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef),
+        _missing_docstring_suggestion,
+    )
 
 
 def check_deprecated_libraries(
     file_path: str, content: str, project: str = None
 ) -> List[Dict]:
-    suggestions = []
-    deprecated_libs = ["imp", "optparse", "cgi", "cStringIO", "stringold", "md5", "sha"]
-    for i, line in enumerate(content.splitlines(), 1):
-        for lib in deprecated_libs:
-            if re.match(rf"import {lib}(\s|$)", line) or re.match(
-                rf"from {lib} ", line
-            ):
-                suggestions.append(
-                    {
-                        "rule_type": "deprecated_library",
-                        "description": f"Deprecated library '{lib}' used in {file_path} at line {i}.",
-                        "diff": f"# Rule: deprecated_library\n\n## Description\nDo not use deprecated library '{lib}'. Use modern alternatives.\n",
-                        "submitted_by": "ai-rule-suggester",
-                    }
-                )
-    return suggestions
+    return _lines_with(file_path, content, _deprecated_library_suggestion)
 
 
 def pattern_checkers_with_project(project=None):
@@ -273,6 +305,78 @@ def pattern_checkers_with_project(project=None):
     ]
 
 
+# --- Single-pass checker engine ---
+# Output order matches pattern_checkers_with_project(): suggestions are bucketed
+# per checker and concatenated in this order.
+CHECKER_ORDER = [
+    "pytest_usage",
+    "direct_sql",
+    "print",
+    "unused_imports",
+    "hardcoded_secrets",
+    "todo_fixme",
+    "eval",
+    "bare_except",
+    "wildcard_imports",
+    "long_functions",
+    "missing_docstrings",
+    "deprecated_libraries",
+]
+
+# AST node type -> [(bucket, builder)]; the tree is parsed and walked once.
+AST_DISPATCH = {
+    ast.Call: [("print", _print_suggestion), ("eval", _eval_suggestion)],
+    ast.ExceptHandler: [("bare_except", _bare_except_suggestion)],
+    ast.FunctionDef: [
+        ("long_functions", _long_function_suggestion),
+        ("missing_docstrings", _missing_docstring_suggestion),
+    ],
+    ast.AsyncFunctionDef: [("missing_docstrings", _missing_docstring_suggestion)],
+    ast.ClassDef: [("missing_docstrings", _missing_docstring_suggestion)],
+}
+
+# Per-line builders, all run in one pass over content.splitlines().
+LINE_CHECKS = [
+    ("todo_fixme", _todo_fixme_suggestion),
+    ("wildcard_imports", _wildcard_import_suggestion),
+    ("deprecated_libraries", _deprecated_library_suggestion),
+]
+
+
+def run_checkers(file_path: str, content: str, project: str = None) -> List[Dict]:
+    """
+    Run every pattern checker over `content` with one ast.parse, one AST walk and
+    one pass over the lines. Equivalent to running pattern_checkers_with_project().
+    """
+    buckets = {name: [] for name in CHECKER_ORDER}
+    buckets["pytest_usage"] = check_direct_pytest_usage(file_path, content, project=project)
+    buckets["direct_sql"] = check_direct_sql(file_path, content, project=project)
+    buckets["hardcoded_secrets"] = check_hardcoded_secrets(file_path, content, project=project)
+
+    try:
+        tree = ast.parse(content)
+    except Exception:
+        tree = None
+    if tree is not None:
+        for node in ast.walk(tree):
+            for bucket, builder in AST_DISPATCH.get(type(node), ()):
+                suggestion = builder(file_path, node)
+                if suggestion:
+                    buckets[bucket].append(suggestion)
+
+    import_lines = []
+    for i, line in enumerate(content.splitlines(), 1):
+        if line.strip().startswith("import "):
+            import_lines.append(line)
+        for bucket, builder in LINE_CHECKS:
+            suggestion = builder(file_path, i, line)
+            if suggestion:
+                buckets[bucket].append(suggestion)
+    buckets["unused_imports"] = _unused_import_suggestions(file_path, content, import_lines)
+
+    return [s for name in CHECKER_ORDER for s in buckets[name]]
+
+
 # --- Main suggestion engine ---
 def scan_file(file_path: str, project: str = None) -> List[Dict]:
     """
@@ -284,27 +388,361 @@ def scan_file(file_path: str, project: str = None) -> List[Dict]:
     except Exception as e:
         print(f"[WARN] Could not read {file_path}: {e}")
         return []
-    suggestions = []
-    for checker in pattern_checkers_with_project(project):
-        suggestions.extend(checker(file_path, content))
-    return suggestions
+    return run_checkers(file_path, content, project=project)
 
 
-def scan_directory(directory: str, project: str = None) -> List[Dict]:
+def scan_content(filename: str, text: str, project: str = None) -> List[Dict]:
     """
-    Recursively scan a directory for rule suggestions.
+    Scan source that is already in memory (an upload or editor buffer) as if it
+    were `filename`. Same suggestions as scan_file, with no filesystem access.
     """
-    suggestions = []
+    return run_checkers(filename, text, project=project)
+
+
+SCAN_EXTENSIONS = (".py", ".sh", "Makefile", ".yml", ".yaml", ".txt", ".md")
+
+# Bump whenever a checker's behaviour or output changes so cached results are invalidated.
+CHECKER_SET_VERSION = "1"
+
+
+def iter_scan_targets(directory: str):
+    """Yield every file under `directory` that the scanner should look at, in os.walk order."""
     for root, _, files in os.walk(directory):
         for fname in files:
-            if fname.endswith(
-                (".py", ".sh", "Makefile", ".yml", ".yaml", ".txt", ".md")
-            ):
-                fpath = os.path.join(root, fname)
-                suggestions.extend(scan_file(fpath, project=project))
+            if fname.endswith(SCAN_EXTENSIONS):
+                yield os.path.join(root, fname)
+
+
+def _read_text(file_path: str) -> Optional[str]:
+    try:
+        with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
+            return f.read()
+    except Exception as e:
+        print(f"[WARN] Could not read {file_path}: {e}", file=sys.stderr)
+        return None
+
+
+def _cache_key(file_path: str, content: str, project: str = None) -> str:
+    h = hashlib.sha256()
+    for part in (CHECKER_SET_VERSION, file_path, project or "", content):
+        h.update(part.encode("utf-8", errors="ignore"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def load_scan_cache(cache_path: str) -> Dict:
+    if not cache_path or not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path, "r") as f:
+            data = json.load(f)
+    except Exception:
+        return {}
+    if data.get("version") != CHECKER_SET_VERSION:
+        return {}
+    return data.get("files", {})
+
+
+def save_scan_cache(cache_path: str, entries: Dict) -> None:
+    """
+    Merge `entries` into the cache file and replace it atomically. Each call writes its own
+    temp file, so concurrent scans sharing a cache (e.g. of different directories) neither
+    clobber each other's temp file nor drop each other's entries.
+    """
+    merged = {**load_scan_cache(cache_path), **entries}
+    tmp = tempfile.NamedTemporaryFile(
+        "w", dir=os.path.dirname(os.path.abspath(cache_path)), prefix=".scan-cache-", suffix=".tmp", delete=False
+    )
+    try:
+        with tmp as f:
+            json.dump({"version": CHECKER_SET_VERSION, "files": merged}, f)
+        os.replace(tmp.name, cache_path)
+    except BaseException:
+        if os.path.exists(tmp.name):
+            os.unlink(tmp.name)
+        raise
+
+
+def _scan_job(job) -> List[Dict]:
+    file_path, content, project = job
+    return run_checkers(file_path, content, project=project)
+
+
+def iter_directory_results(
+    directory: str, project: str = None, workers: int = 1, cache_path: str = None
+) -> Iterator[Tuple[str, List[Dict]]]:
+    """
+    Yield (file path, suggestions) for every scanned file in os.walk order, as
+    soon as that file's result is available: cache hits straight away, pooled
+    results as the pool returns them in order. The cache is written once the
+    walk ends (or the caller stops early) with every file scanned so far.
+
+    The pool uses the spawn start method: forking a process that runs threads
+    (e.g. the LLM rule service) can copy held locks into the children.
+    """
+    cache = load_scan_cache(cache_path) if cache_path else {}
+    entries: Dict[str, Dict] = {}
+    order = []
+    pending = []
+    for fpath in iter_scan_targets(directory):
+        content = _read_text(fpath)
+        if content is None:
+            continue
+        key = _cache_key(fpath, content, project)
+        hit = cache.get(fpath)
+        if hit and hit.get("key") == key:
+            order.append((fpath, key, hit["suggestions"]))
+        else:
+            order.append((fpath, key, None))
+            pending.append((fpath, content, project))
+
+    pool = None
+    try:
+        if workers and workers > 1 and len(pending) > 1:
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            chunksize = max(1, len(pending) // (workers * 4))
+            fresh = pool.map(_scan_job, pending, chunksize=chunksize)
+        else:
+            fresh = map(_scan_job, pending)
+        for fpath, key, found in order:
+            if found is None:
+                found = next(fresh)
+            entries[fpath] = {"key": key, "suggestions": found}
+            yield fpath, found
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        if cache_path and entries:
+            save_scan_cache(cache_path, entries)
+
+
+def scan_directory(
+    directory: str, project: str = None, workers: int = 1, cache_path: str = None
+) -> List[Dict]:
+    """
+    Recursively scan a directory for rule suggestions.
+
+    workers > 1 fans files out over a process pool; results keep os.walk order.
+    cache_path enables an on-disk cache keyed by file path, content hash, project
+    and CHECKER_SET_VERSION, so unchanged files are not re-checked on later runs.
+    """
+    return [
+        s
+        for _, found in iter_directory_results(directory, project=project, workers=workers, cache_path=cache_path)
+        for s in found
+    ]
+
+
+# --- Diff-scoped review: only changed lines and the AST scopes around them ---
+
+_HUNK_RE = re.compile(r"^@@ -\d+(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+def parse_unified_diff(diff_text: str) -> Dict[str, Dict[int, str]]:
+    """
+    Map each file in a unified diff to {new line number: text} for its added
+    lines. Paths are the post-image paths with the b/ prefix removed; deleted
+    files are skipped.
+
+    Hunk bodies are consumed by the old/new line counts from their @@ header and
+    "---"/"+++" are only read as file headers outside a hunk, so an added line
+    that itself starts with "++ " is never mistaken for a header.
+    """
+    changed: Dict[str, Dict[int, str]] = {}
+    current = None
+    new_line = 0
+    old_left = new_left = 0
+    for line in diff_text.splitlines():
+        if old_left > 0 or new_left > 0:
+            if line.startswith("\\"):
+                continue  # "\ No newline at end of file"
+            tag = line[:1]
+            if tag == "+":
+                if current is not None:
+                    current[new_line] = line[1:]
+                new_line += 1
+                new_left -= 1
+            elif tag == "-":
+                old_left -= 1
+            else:
+                # Context line; some tools strip the leading space of blank ones
+                new_line += 1
+                old_left -= 1
+                new_left -= 1
+            continue
+        if line.startswith("+++ "):
+            path = line[4:].split("\t")[0].strip()
+            if path == "/dev/null":
+                current = None
+            else:
+                current = changed.setdefault(path[2:] if path.startswith("b/") else path, {})
+            continue
+        if line.startswith("diff --git "):
+            current = None
+            continue
+        m = _HUNK_RE.match(line)
+        if m:
+            old_left = int(m.group(1) or 1)
+            new_line = int(m.group(2))
+            new_left = int(m.group(3) or 1)
+    return {path: lines for path, lines in changed.items() if lines}
+
+
+def _span(node: ast.AST):
+    return node.lineno, getattr(node, "end_lineno", None) or node.lineno
+
+
+def _touches(node: ast.AST, changed) -> bool:
+    start, end = _span(node)
+    return any(start <= line <= end for line in changed)
+
+
+def run_checkers_on_changes(
+    file_path: str, content: str, changed_lines, project: str = None
+) -> List[Dict]:
+    """
+    Like run_checkers, but findings are limited to `changed_lines`: line checks
+    and content-wide regex checks only see changed lines, the AST walk only
+    enters top-level statements that overlap a change, and node findings are
+    kept when the node sits on a changed line (for functions/classes: when the
+    change falls inside the definition).
+    """
+    changed = set(changed_lines)
+    if not changed:
+        return []
+    lines = content.splitlines()
+    changed_text = "\n".join(lines[i - 1] for i in sorted(changed) if 0 < i <= len(lines))
+
+    buckets = {name: [] for name in CHECKER_ORDER}
+    buckets["pytest_usage"] = check_direct_pytest_usage(file_path, changed_text, project=project)
+    buckets["direct_sql"] = check_direct_sql(file_path, changed_text, project=project)
+    buckets["hardcoded_secrets"] = check_hardcoded_secrets(file_path, changed_text, project=project)
+
+    try:
+        tree = ast.parse(content)
+    except Exception:
+        tree = None
+    if tree is not None:
+        for top in tree.body:
+            if not _touches(top, changed):
+                continue
+            for node in ast.walk(top):
+                handlers = AST_DISPATCH.get(type(node), ())
+                if not handlers:
+                    continue
+                if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                    if not _touches(node, changed):
+                        continue
+                elif node.lineno not in changed:
+                    continue
+                for bucket, builder in handlers:
+                    suggestion = builder(file_path, node)
+                    if suggestion:
+                        buckets[bucket].append(suggestion)
+
+    import_lines = []
+    for i in sorted(changed):
+        if not 0 < i <= len(lines):
+            continue
+        line = lines[i - 1]
+        if line.strip().startswith("import "):
+            import_lines.append(line)
+        for bucket, builder in LINE_CHECKS:
+            suggestion = builder(file_path, i, line)
+            if suggestion:
+                buckets[bucket].append(suggestion)
+    buckets["unused_imports"] = _unused_import_suggestions(file_path, content, import_lines)
+
+    return [s for name in CHECKER_ORDER for s in buckets[name]]
+
+
+def _content_from_added_lines(added: Dict[int, str]) -> str:
+    """Best-effort post-image when the full file isn't available: added lines at their positions."""
+    out = [""] * max(added)
+    for i, text in added.items():
+        out[i - 1] = text
+    return "\n".join(out)
+
+
+def scan_diff(diff_text: str, read_file=None, project: str = None) -> List[Dict]:
+    """
+    Review only what a unified diff changes. `read_file(path)` returns the
+    post-image content of a changed file (or None); without it, or when it
+    returns None, only the added lines themselves are checked.
+    """
+    suggestions = []
+    for path, added in parse_unified_diff(diff_text).items():
+        if not path.endswith(SCAN_EXTENSIONS):
+            continue
+        content = read_file(path) if read_file else None
+        if content is None:
+            content = _content_from_added_lines(added)
+        suggestions.extend(run_checkers_on_changes(path, content, added.keys(), project=project))
     return suggestions
 
 
+def scan_git_changes(base: str, head: str = None, repo: str = ".", project: str = None) -> List[Dict]:
+    """
+    Diff-scoped review between git refs: `base..head`, or `base` against the
+    working tree when head is None (pre-commit / CI on a checkout).
+    """
+    cmd = ["git", "-C", repo, "diff", "--unified=0", "--no-color", "--no-ext-diff", base]
+    if head:
+        cmd.append(head)
+    diff_text = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+
+    def read_file(path):
+        if head:
+            result = subprocess.run(
+                ["git", "-C", repo, "show", f"{head}:{path}"], capture_output=True, text=True
+            )
+            return result.stdout if result.returncode == 0 else None
+        return _read_text(os.path.join(repo, path))
+
+    return scan_diff(diff_text, read_file=read_file, project=project)
+
+
+def _default_workers() -> int:
+    return int(os.environ.get("SUGGEST_RULES_WORKERS", "1"))
+
+
+def _default_cache_path() -> Optional[str]:
+    return os.environ.get("SUGGEST_RULES_CACHE")
+
+
+def iter_suggestions(
+    target: str = ".", project: str = None, workers: int = None, cache_path: str = None
+) -> Iterator[Dict]:
+    """
+    In-process entry point for services: yield suggestions for a file or
+    directory in the same order as the CLI output, file by file as each one's
+    result is ready.
+
+    Directory targets use the same process pool and result cache as the CLI
+    (see iter_directory_results). workers and cache_path default to
+    SUGGEST_RULES_WORKERS and SUGGEST_RULES_CACHE, read at call time.
+    No module state is shared between calls, so it is safe to use from
+    several threads at once.
+    """
+    if os.path.isfile(target):
+        yield from scan_file(target, project=project)
+        return
+    for _, found in iter_directory_results(
+        target,
+        project=project,
+        workers=_default_workers() if workers is None else workers,
+        cache_path=_default_cache_path() if cache_path is None else cache_path,
+    ):
+        yield from found
+
+
+def suggest(
+    target: str = ".", project: str = None, workers: int = None, cache_path: str = None
+) -> List[Dict]:
+    """Same output as `python scripts/suggest_rules.py <target>`, without the subprocess and JSON round-trip."""
+    return list(iter_suggestions(target, project=project, workers=workers, cache_path=cache_path))
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         description="Suggest rules based on code patterns."
@@ -318,9 +756,48 @@ if __name__ == "__main__":
         default=None,
         help="Project name or ID to include in suggestions",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=_default_workers(),
+        help="Number of worker processes for directory scans (env: SUGGEST_RULES_WORKERS)",
+    )
+    parser.add_argument(
+        "--cache-file",
+        type=str,
+        default=_default_cache_path(),
+        help="Path of the content-hash result cache; unchanged files are skipped (env: SUGGEST_RULES_CACHE)",
+    )
+    parser.add_argument(
+        "--diff",
+        type=str,
+        default=None,
+        help="Only review lines added by this unified diff file ('-' for stdin); files are read relative to target",
+    )
+    parser.add_argument(
+        "--git-base",
+        type=str,
+        default=None,
+        help="Only review lines changed since this git ref (against --git-head, or the working tree)",
+    )
+    parser.add_argument("--git-head", type=str, default=None, help="Head ref for --git-base")
     args = parser.parse_args()
-    if os.path.isfile(args.target):
+    if args.diff:
+        diff_text = sys.stdin.read() if args.diff == "-" else open(args.diff, encoding="utf-8").read()
+        all_suggestions = scan_diff(
+            diff_text,
+            read_file=lambda path: _read_text(os.path.join(args.target, path)) if os.path.exists(os.path.join(args.target, path)) else None,
+            project=args.project,
+        )
+    elif args.git_base:
+        all_suggestions = scan_git_changes(args.git_base, args.git_head, repo=args.target, project=args.project)
+    elif os.path.isfile(args.target):
         all_suggestions = scan_file(args.target, project=args.project)
     else:
-        all_suggestions = scan_directory(args.target, project=args.project)
+        all_suggestions = scan_directory(
+            args.target,
+            project=args.project,
+            workers=args.workers,
+            cache_path=args.cache_file,
+        )
     print(json.dumps(all_suggestions, indent=2))
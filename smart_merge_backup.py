@@ -32,9 +32,8 @@ ON CONFLICT (id) DO UPDATE SET
     'api_error_logs': (
         ['id', 'timestamp', 'path', 'method', 'status_code', 'message', 'stack_trace', 'user_id'],
         '''INSERT INTO api_error_logs (id, "timestamp", path, method, status_code, message, stack_trace, user_id)
-SELECT id, "timestamp", path, method, status_code, message, stack_trace, user_id FROM temp_schema.api_error_logs
-ON CONFLICT (id) DO UPDATE SET
-  "timestamp" = EXCLUDED."timestamp",
+SELECT id, COALESCE("timestamp", now() AT TIME ZONE 'utc'), path, method, status_code, message, stack_trace, user_id FROM temp_schema.api_error_logs
+ON CONFLICT (id, "timestamp") DO UPDATE SET
   path = EXCLUDED.path,
   method = EXCLUDED.method,
   status_code = EXCLUDED.status_code,
@@ -58,10 +57,14 @@ ON CONFLICT (id) DO UPDATE SET
   name = EXCLUDED.name,
   description = EXCLUDED.description,
   created_at = EXCLUDED.created_at;'''),
+    # Backups taken before tokens were hashed (migration c8d2f4a6b1e3) hold plaintext tokens:
+    # hash anything that isn't already a hex sha256, like the migration does
     'api_access_tokens': (
         ['id', 'token', 'created_at', 'created_by', 'description', 'active'],
         '''INSERT INTO api_access_tokens (id, token, created_at, created_by, description, active)
-SELECT id, token, created_at, created_by, description, active FROM temp_schema.api_access_tokens
+SELECT id,
+  CASE WHEN token ~ '^[0-9a-f]{64}$' THEN token ELSE encode(sha256(convert_to(token, 'UTF8')), 'hex') END,
+  created_at, created_by, description, active FROM temp_schema.api_access_tokens
 ON CONFLICT (id) DO UPDATE SET
   token = EXCLUDED.token,
   created_at = EXCLUDED.created_at,
@@ -71,7 +74,7 @@ ON CONFLICT (id) DO UPDATE SET
     'rules': (
         ['id', 'rule_type', 'description', 'diff', 'status', 'submitted_by', 'added_by', 'project', 'timestamp', 'version', 'categories', 'tags', 'examples', 'applies_to', 'applies_to_rationale', 'user_story'],
         '''INSERT INTO rules (id, rule_type, description, diff, status, submitted_by, added_by, project, "timestamp", version, categories, tags, examples, applies_to, applies_to_rationale, user_story)
-SELECT id, rule_type, description, diff, status, submitted_by, added_by, project, "timestamp", version, categories, tags, examples, applies_to, applies_to_rationale, user_story FROM temp_schema.rules
+SELECT id, rule_type, description, diff, status, submitted_by, added_by, project, COALESCE("timestamp", now() AT TIME ZONE 'utc'), version, categories, tags, examples, applies_to, applies_to_rationale, user_story FROM temp_schema.rules
 ON CONFLICT (id) DO UPDATE SET
   rule_type = EXCLUDED.rule_type,
   description = EXCLUDED.description,
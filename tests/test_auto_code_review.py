@@ -43,4 +43,26 @@ def test_invalid_input_file(mock_run, tmp_path, monkeypatch):
     with pytest.raises(SystemExit):
         auto_code_review.main()
 
-# TODO: Add tests for review logic, error handling, and logging 
\ No newline at end of file
+# TODO: Add tests for review logic, error handling, and logging 
+
+def test_changed_lines_since_resolves_paths_from_a_subdirectory(tmp_path, monkeypatch):
+    import subprocess
+
+    def git(*args):
+        subprocess.run(["git", *args], cwd=tmp_path, check=True, capture_output=True)
+
+    (tmp_path / "pkg").mkdir()
+    module = tmp_path / "pkg" / "db_utils.py"
+    module.write_text("x = 1\n")
+    git("init", "-q")
+    git("-c", "user.email=t@example.com", "-c", "user.name=t", "add", ".")
+    git("-c", "user.email=t@example.com", "-c", "user.name=t", "commit", "-qm", "init")
+    module.write_text("x = 1\nrows = db.execute('SELECT * FROM rules')\n")
+
+    monkeypatch.chdir(tmp_path / "pkg")
+    changed = auto_code_review.changed_lines_since("HEAD")
+    assert changed == {"db_utils.py": {2}}
+    patterns = auto_code_review.scan_codebase_for_patterns(changed)
+    assert [(p["file"], p["line"]) for p in patterns] == [("db_utils.py", 2)]
+    assert auto_code_review.scan_codebase_for_patterns(changed, target="elsewhere") == []
+    assert len(auto_code_review.scan_codebase_for_patterns(target="db_utils.py")) == 1
@@ -4,7 +4,7 @@ import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
-from db import Base, Rule
+from db import Base, Rule, parse_vector
 
 
 @pytest.fixture
@@ -33,3 +33,11 @@ def test_rule_model_creation(in_memory_db):
     result = in_memory_db.query(Rule).filter_by(rule_type="test_type").first()
     assert result is not None
     assert result.description == "A test rule"
+
+
+def test_parse_vector_decodes_pgvector_text():
+    assert parse_vector("[0.5,-1,2e-3]") == [0.5, -1.0, 0.002]
+    assert parse_vector("[]") == []
+    assert parse_vector(" [1, 2.5] ") == [1.0, 2.5]
+    assert parse_vector(None) is None
+    assert parse_vector([1.0, 2.0]) == [1.0, 2.0]
@@ -169,6 +169,18 @@ def test_review_code_snippet_endpoint():
     assert isinstance(data, list)
 
 
+def test_review_code_diff_endpoint():
+    code = "import os\n\ndef bar():\n    return eval('99')\n"
+    payload = {
+        "diff": "+++ b/example.py\n@@ -4 +4 @@\n+    return eval('99')\n",
+        "files": {"example.py": code},
+    }
+    response = client.post("/review-code-diff", json=payload)
+    assert response.status_code == 200
+    data = response.json()
+    assert [s["rule_type"] for s in data] == ["no_eval", "missing_docstring"]
+
+
 def test_rule_versioning_and_history():
     # Propose and approve a new rule
     payload = {
@@ -411,6 +423,40 @@ def test_rules_multi_category_filter():
     assert "other" not in rule_types
 
 
+def test_rules_tag_filter_and_keyset_pagination():
+    for i in range(5):
+        rule = {
+            "rule_type": f"paging_{i}",
+            "description": f"Paging rule {i}",
+            "diff": "# Rule: Paging",
+            "submitted_by": "tester",
+            "categories": ["paging"],
+            "tags": ["even" if i % 2 == 0 else "odd"],
+        }
+        proposal_id = client.post("/propose-rule-change", json=rule).json()["id"]
+        assert client.post(f"/approve-rule-change/{proposal_id}").status_code == 200
+    # Tag filter matches whole items only
+    odd = client.get("/rules?tag=odd").json()
+    assert {r["rule_type"] for r in odd} == {"paging_1", "paging_3"}
+    assert client.get("/rules?tag=od").json() == []
+    # Page through with limit=2 and the returned cursor
+    seen = []
+    after = None
+    while True:
+        params = {"category": "paging", "limit": 2}
+        if after:
+            params["after"] = after
+        resp = client.get("/rules", params=params)
+        assert resp.status_code == 200
+        seen.extend(r["id"] for r in resp.json())
+        after = resp.headers.get("X-Next-Cursor")
+        if not after:
+            break
+    assert len(seen) == 5
+    assert len(set(seen)) == 5
+    assert client.get("/rules?after=not-a-cursor").status_code == 400
+
+
 def test_memory_graph_node_crud():
     # Create a memory node (embedding is now generated server-side)
     node_payload = {
@@ -418,7 +464,7 @@ def test_memory_graph_node_crud():
         "content": "Test memory node",
         "meta": "{\"tags\":[\"test\"]}"
     }
-    node_resp = client.post("/memory/nodes", json=node_payload)
+    node_resp = client.post("/memory/nodes", params={"include_embedding": "true"}, json=node_payload)
     assert node_resp.status_code == 200
     node = node_resp.json()
     assert node["namespace"] == "testns"
@@ -426,11 +472,14 @@ def test_memory_graph_node_crud():
     assert isinstance(node["embedding"], list)
     assert node["meta"] == node_payload["meta"]
 
-    # List memory nodes
+    # List memory nodes: embeddings are omitted unless requested
     list_resp = client.get("/memory/nodes")
     assert list_resp.status_code == 200
     nodes = list_resp.json()
-    assert any(n["id"] == node["id"] for n in nodes)
+    listed = next(n for n in nodes if n["id"] == node["id"])
+    assert listed["embedding"] is None
+    full = client.get("/memory/nodes", params={"namespace": "testns", "include_embedding": "true"}).json()
+    assert len(next(n for n in full if n["id"] == node["id"])["embedding"]) == len(node["embedding"])
 
 
 def test_memory_graph_edge_crud_and_traversal():
@@ -479,6 +528,24 @@ def test_memory_graph_edge_crud_and_traversal():
     to_ids = [e["to_id"] for e in from_edges]
     assert node2["id"] in to_ids
 
+    # Multi-hop traversal in one request, with a cycle back to node1
+    node3 = client.post("/memory/nodes", json={"namespace": "testns", "content": "Node 3", "meta": "{}"}).json()
+    client.post("/memory/edges", json={"from_id": node2["id"], "to_id": node3["id"], "relation_type": "test_link"})
+    client.post("/memory/edges", json={"from_id": node3["id"], "to_id": node1["id"], "relation_type": "test_link"})
+    walk = client.post("/memory/graph/traverse", json={
+        "start_ids": [node1["id"]], "max_depth": 5, "relation_types": ["test_link"],
+    })
+    assert walk.status_code == 200
+    depths = {n["id"]: n["depth"] for n in walk.json()["nodes"]}
+    assert depths[node1["id"]] == 0
+    assert depths[node2["id"]] == 1
+    assert depths[node3["id"]] == 2
+    back = client.post("/memory/graph/traverse", json={
+        "start_ids": [node2["id"]], "max_depth": 1, "direction": "in", "relation_types": ["test_link"],
+    }).json()
+    assert node1["id"] in {n["id"] for n in back["nodes"]}
+    assert client.post("/memory/graph/traverse", json={"start_ids": [node1["id"]], "direction": "up"}).status_code == 400
+
 
 def test_memory_graph_vector_search():
     # Use a unique namespace for this test run
@@ -491,7 +558,7 @@ def test_memory_graph_vector_search():
     before_nodes = client.get("/memory/nodes").json()
     print(f"Nodes in '{ns}' BEFORE:", [n['id'] for n in before_nodes if n['namespace'] == ns])
     # Create a node (embedding is now generated server-side)
-    node = client.post("/memory/nodes", json={
+    node = client.post("/memory/nodes", params={"include_embedding": "true"}, json={
         "namespace": ns,
         "content": "Searchable node",
         "meta": "{}"
@@ -519,6 +586,36 @@ def test_memory_graph_vector_search():
     assert any(n["id"] == node["id"] for n in results_emb)
 
 
+def test_memory_graph_batch_ingest():
+    ns = f"batchns-{uuid.uuid4()}"
+    payload = [
+        {"namespace": ns, "content": "Batch node 1", "meta": "{}"},
+        {"namespace": ns, "content": "Batch node 2"},
+        {"content": "missing namespace"},
+    ]
+    resp = client.post("/memory/nodes/batch", json=payload)
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["created"] == 2
+    assert data["failed"] == 1
+    assert [r["status"] for r in data["results"]] == ["created", "created", "error"]
+    ndjson = "\n".join(json.dumps({"namespace": ns, "content": f"NDJSON node {i}"}) for i in range(3))
+    resp = client.post(
+        "/memory/nodes/batch", content=ndjson, headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert resp.status_code == 200
+    assert resp.json()["created"] == 3
+    nodes = client.get(f"/memory/nodes?namespace={ns}").json()
+    assert len(nodes) == 5
+
+
+def test_memory_graph_vector_search_tunables_validated():
+    resp = client.post("/memory/nodes/search", json={"embedding": [0.1] * 768, "ef_search": 0})
+    assert resp.status_code == 422
+    resp = client.post("/memory/nodes/search", json={"embedding": [0.1] * 768, "probes": -1})
+    assert resp.status_code == 422
+
+
 def test_rule_proposal_categories_field():
     # Submit a proposal with categories
     payload = {
@@ -561,3 +658,249 @@ def test_rule_proposal_categories_field():
     rule = found[0]
     assert rule["categories"] == payload["categories"], f"Expected categories {payload['categories']}, got {rule['categories']}"
     assert isinstance(rule["categories"], list)
+
+
+def test_llm_job_submit_process_and_poll(monkeypatch):
+    import asyncio
+
+    import rule_api_server
+
+    async def fake_review(filename, content, content_type, semaphore):
+        return [f"reviewed {filename} ({len(content)} bytes)"]
+
+    monkeypatch.setattr(rule_api_server, "review_one_file", fake_review)
+    resp = client.post(
+        "/jobs/review-code-files-llm",
+        files=[("files", ("a.py", b"x = 1\n", "text/plain")), ("files", ("b.py", b"y = 2\n", "text/plain"))],
+    )
+    assert resp.status_code == 202
+    job = resp.json()
+    assert job["status"] == "queued"
+    assert client.get(f"/jobs/{job['id']}").json()["status"] == "queued"
+
+    # Drain the queue the way a worker would
+    while asyncio.run(rule_api_server.process_next_job("test-worker")):
+        pass
+    done = client.get(f"/jobs/{job['id']}").json()
+    assert done["status"] == "succeeded"
+    assert done["result"] == {"a.py": ["reviewed a.py (6 bytes)"], "b.py": ["reviewed b.py (6 bytes)"]}
+
+    lines = [json.loads(line) for line in client.get(f"/jobs/{job['id']}/stream").text.splitlines()]
+    assert lines[-1]["status"] == "succeeded"
+    assert client.get("/jobs/does-not-exist").status_code == 404
+
+
+def _wait_for(condition, timeout=5.0):
+    import time
+
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+def test_token_revocation_notify_reaches_other_processes():
+    import threading
+
+    import sqlalchemy as sa
+
+    import rule_api_server
+    from db import SessionLocal
+
+    token = client.post("/admin/generate-token", params={"role": "admin"}).json()["token"]
+    token_hash = rule_api_server.hash_api_token(token)
+    cache = rule_api_server.api_token_cache
+    cache.put("listener-ready", rule_api_server.CachedApiToken(id="sentinel", role="admin"))
+    stop = threading.Event()
+    listener = threading.Thread(target=rule_api_server.listen_for_token_revocations, args=(stop,), daemon=True)
+    listener.start()
+    try:
+        # The listener clears the cache once it is subscribed
+        assert _wait_for(lambda: not cache.get("listener-ready")[0])
+        assert rule_api_server.lookup_api_token(token) is not None
+        assert cache.get(token_hash)[0]
+        # Revoke from "another process": only the NOTIFY can reach this cache
+        db = SessionLocal()
+        db.execute(sa.text("UPDATE api_access_tokens SET active = 0 WHERE token = :t"), {"t": token_hash})
+        db.execute(sa.text("SELECT pg_notify(:c, :t)"), {"c": rule_api_server.API_TOKEN_REVOKED_CHANNEL, "t": token_hash})
+        db.commit()
+        db.close()
+        assert _wait_for(lambda: not cache.get(token_hash)[0])
+        assert rule_api_server.lookup_api_token(token) is None
+    finally:
+        stop.set()
+        listener.join(5)
+        cache.invalidate()
+
+
+def test_llm_job_claims_skip_rows_locked_by_other_workers():
+    from concurrent.futures import ThreadPoolExecutor
+
+    import rule_api_server
+    from db import LlmJob, SessionLocal
+
+    db = SessionLocal()
+    jobs = [rule_api_server.enqueue_job(db, "summarize-git-diff", {"diff": f"d{i}"})["id"] for i in range(4)]
+    db.close()
+    # Another worker is mid-claim on the oldest job: its row lock makes us skip, not wait
+    holder = SessionLocal()
+    locked = holder.query(LlmJob).filter(LlmJob.id == jobs[0]).with_for_update().one()
+    try:
+        assert rule_api_server.claim_next_job("w-skip")[0] == jobs[1]
+    finally:
+        holder.rollback()
+        holder.close()
+    assert locked.id == jobs[0]
+    # Concurrent workers never claim the same job
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        claimed = list(pool.map(lambda i: rule_api_server.claim_next_job(f"w{i}"), range(4)))
+    ids = [c[0] for c in claimed if c]
+    assert sorted(ids) == sorted([jobs[0], jobs[2], jobs[3]])
+    assert claimed.count(None) == 1
+
+
+def test_error_log_maintenance_moves_stranded_rows_into_new_partition(monkeypatch):
+    from datetime import datetime
+
+    import sqlalchemy as sa
+
+    import rule_api_server
+    from db import ApiErrorLog, SessionLocal
+
+    monkeypatch.setattr(rule_api_server, "ERROR_LOG_PARTITIONS_AHEAD", 1)
+    monkeypatch.setattr(rule_api_server, "ERROR_LOG_RETENTION_DAYS", 90)
+    monkeypatch.setattr(rule_api_server, "ERROR_LOG_MOVE_BATCH", 2)
+    now = datetime(2030, 6, 15)
+    db = SessionLocal()
+    # Only the default partition exists yet: these rows for June and July are stranded there
+    for i, ts in enumerate([datetime(2030, 6, d) for d in (1, 2, 3, 20, 30)] + [datetime(2030, 7, 4), datetime(2030, 1, 1)]):
+        db.add(ApiErrorLog(id=f"e{i}", timestamp=ts, path="/x", method="GET", status_code=500, message="boom"))
+    db.commit()
+
+    result = rule_api_server.maintain_error_logs(db, now=now)
+    assert result["created"] == ["api_error_logs_p203006", "api_error_logs_p203007"]
+    assert result["moved"] == 6
+    # Expired January row deleted from the default partition
+    assert result["logs_deleted"] == 1
+    count = lambda table: db.execute(sa.text(f"SELECT count(*) FROM {table}")).scalar()
+    assert count("api_error_logs_p203006") == 5
+    assert count("api_error_logs_p203007") == 1
+    assert count("api_error_logs_default") == 0
+    assert db.query(ApiErrorLog).count() == 6
+    # New rows are routed to the attached partitions
+    db.add(ApiErrorLog(id="later", timestamp=datetime(2030, 6, 16), path="/x", method="GET", status_code=500, message="x"))
+    db.commit()
+    assert count("api_error_logs_p203006") == 6
+
+    result = rule_api_server.maintain_error_logs(db, now=datetime(2030, 10, 15))
+    assert "api_error_logs_p203006" in result["dropped"] and result["moved"] == 0
+    db.close()
+
+
+def test_bulk_approve_reports_rules_created_by_concurrent_approval(monkeypatch):
+    import rule_api_server
+    from db import Rule as DBRule
+    from db import SessionLocal
+
+    ids = []
+    for name in ("race", "calm"):
+        resp = client.post("/propose-rule-change", json={
+            "rule_type": "style", "description": f"{name} rule", "diff": "d", "submitted_by": "bot",
+        })
+        ids.append(resp.json()["id"])
+    values_from_proposal = rule_api_server.rule_values_from_proposal
+
+    def racing_values(proposal, rule_id, version):
+        values = values_from_proposal(proposal, rule_id, version)
+        if proposal.id == ids[0]:
+            # A concurrent approval commits the rule after the batch locked its targets
+            other = SessionLocal()
+            other.add(DBRule(**{**values, "description": "theirs"}))
+            other.commit()
+            other.close()
+        return values
+
+    monkeypatch.setattr(rule_api_server, "rule_values_from_proposal", racing_values)
+    resp = client.post("/bulk-moderate-rule-changes", json={"action": "approve", "proposal_ids": ids})
+    assert resp.status_code == 200
+    assert [r["status"] for r in resp.json()["results"]] == ["conflict", "approved"]
+    pending = [p["id"] for p in client.get("/pending-rule-changes").json()]
+    assert ids[0] in pending and ids[1] not in pending
+    rules = {r["id"]: r["description"] for r in client.get("/rules").json()}
+    assert rules[ids[0]] == "theirs" and rules[ids[1]] == "calm rule"
+
+
+def test_approval_retries_a_version_bump_committed_concurrently(monkeypatch):
+    import sqlalchemy as sa
+
+    import rule_api_server
+    from db import SessionLocal
+
+    def propose(description):
+        return client.post("/propose-rule-change", json={
+            "rule_type": "style", "rule_id": "r-occ", "description": description, "diff": "d", "submitted_by": "bot",
+        }).json()["id"]
+
+    assert client.post(f"/approve-rule-change/{propose('first')}").json()["version"] == 1
+    mine = propose("mine")
+    values_from_proposal = rule_api_server.rule_values_from_proposal
+    raced = []
+
+    def racing_values(proposal, rule_id, version):
+        if not raced:
+            # Another approval commits between our read and our guarded UPDATE
+            raced.append(version)
+            other = SessionLocal()
+            other.execute(sa.text("UPDATE rules SET version = version + 1, description = 'theirs' WHERE id = 'r-occ'"))
+            other.commit()
+            other.close()
+        return values_from_proposal(proposal, rule_id, version)
+
+    monkeypatch.setattr(rule_api_server, "rule_values_from_proposal", racing_values)
+    assert client.post(f"/approve-rule-change/{mine}").json()["version"] == 3
+    assert raced == [2]
+    rule = next(r for r in client.get("/rules").json() if r["id"] == "r-occ")
+    assert (rule["version"], rule["description"]) == (3, "mine")
+    history = client.get("/rules/r-occ/history").json()
+    assert [(v["version"], v["description"]) for v in history] == [(2, "theirs"), (1, "first")]
+
+
+def test_rule_changes_feed_follows_commit_order():
+    from datetime import datetime
+
+    import sqlalchemy as sa
+
+    from db import Rule as DBRule
+    from db import SessionLocal
+
+    def rule(rule_id):
+        return DBRule(id=rule_id, rule_type="style", description=rule_id, diff="d", submitted_by="bot",
+                      project="feed", version=1, timestamp=datetime(2025, 1, 1), categories=[], tags=[])
+
+    since = client.get("/rules/changes").json()["next_since"]
+    first, second = SessionLocal(), SessionLocal()
+    first.add(rule("feed-a"))
+    first.flush()
+    second.add(rule("feed-b"))
+    second.commit()
+    # feed-a is not committed yet, so it must not be visible or hold back a lower seq
+    changes = client.get("/rules/changes", params={"since": since}).json()["changes"]
+    assert [c["id"] for c in changes] == ["feed-b"]
+    first.commit()
+    changes = client.get("/rules/changes", params={"since": since}).json()["changes"]
+    assert [c["id"] for c in changes] == ["feed-b", "feed-a"]
+    assert changes[0]["seq"] < changes[1]["seq"]
+
+    second.execute(sa.text("UPDATE rules SET description = 'b2' WHERE id = 'feed-b'"))
+    second.commit()
+    first.execute(sa.text("DELETE FROM rules WHERE id = 'feed-a'"))
+    first.commit()
+    first.close()
+    second.close()
+    feed = client.get("/rules/changes", params={"since": since, "project": "feed"}).json()
+    # One entry per rule, at the seq of its latest change
+    assert [(c["id"], c["deleted"]) for c in feed["changes"]] == [("feed-b", False), ("feed-a", True)]
+    assert feed["changes"][0]["rule"]["description"] == "b2"
+    assert feed["next_since"] == feed["changes"][-1]["seq"] > changes[1]["seq"]
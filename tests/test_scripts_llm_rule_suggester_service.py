@@ -43,4 +43,101 @@ def test_invalid_input_file(mock_run, tmp_path, monkeypatch):
     with pytest.raises(SystemExit):
         suggester.main()
 
-# TODO: Add tests for suggestion logic, error handling, and logging 
\ No newline at end of file
+# TODO: Add tests for suggestion logic, error handling, and logging 
+
+SAMPLE_DIFF = "\n".join([
+    "diff --git a/a.py b/a.py",
+    "--- a/a.py",
+    "+++ b/a.py",
+    "@@ -1,2 +1,2 @@",
+    "-x = 1",
+    "+x = 2",
+    "@@ -10,2 +10,2 @@",
+    "-y = 1",
+    "+y = 2",
+    "diff --git a/b.py b/b.py",
+    "--- a/b.py",
+    "+++ b/b.py",
+    "@@ -1 +1 @@",
+    "-z = 1",
+    "+z = 2",
+])
+
+
+def test_chunk_diff_respects_hunk_boundaries_and_budget():
+    units = suggester.split_diff_units(SAMPLE_DIFF)
+    assert len(units) == 3
+    assert all(header.startswith("diff --git") for header, _ in units)
+    # Everything fits in one chunk with a generous budget
+    assert suggester.chunk_diff(SAMPLE_DIFF, max_tokens=1000) == [SAMPLE_DIFF]
+    # A tight budget splits between hunks and repeats the file header
+    chunks = suggester.chunk_diff(SAMPLE_DIFF, max_tokens=60)
+    assert len(chunks) == 3
+    for chunk in chunks:
+        assert chunk.startswith("diff --git")
+        assert chunk.splitlines()[3].startswith("@@")
+    body_lines = [l for c in chunks for l in c.splitlines() if l[:1] in "+-" and l[:3] not in ("---", "+++")]
+    assert body_lines == ["-x = 1", "+x = 2", "-y = 1", "+y = 2", "-z = 1", "+z = 2"]
+
+
+def test_split_diff_units_keeps_header_only_files():
+    diff = "\n".join([
+        "diff --git a/img.png b/img.png",
+        "Binary files a/img.png and b/img.png differ",
+        "diff --git a/old.py b/new.py",
+        "similarity index 100%",
+        "rename from old.py",
+        "rename to new.py",
+        "diff --git a/c.py b/c.py",
+        "--- a/c.py",
+        "+++ b/c.py",
+        "@@ -1 +1 @@",
+        "-c = 1",
+        "+c = 2",
+    ])
+    units = suggester.split_diff_units(diff)
+    assert [header.splitlines()[0] for header, _ in units] == [
+        "diff --git a/img.png b/img.png",
+        "diff --git a/old.py b/new.py",
+        "diff --git a/c.py b/c.py",
+    ]
+    assert [body for _, body in units[:2]] == ["", ""]
+    assert "rename to new.py" in "\n".join(suggester.chunk_diff(diff, max_tokens=1000))
+
+
+def test_chunk_diff_splits_oversized_preamble_and_plain_text():
+    preamble = "\n".join(f"commit message line {i}" for i in range(1500))
+    chunks = suggester.chunk_diff(preamble + "\n" + SAMPLE_DIFF, max_tokens=60)
+    joined = "\n".join(chunks)
+    assert "commit message line 0" in joined and "commit message line 1499" in joined
+    assert "+z = 2" in joined
+    assert all(suggester.estimate_tokens(chunk) <= 60 for chunk in chunks)
+
+    text = "\n".join(f"plain text line {i}" for i in range(2000))
+    chunks = suggester.chunk_diff(text, max_tokens=60)
+    assert len(chunks) > 1
+    assert "\n".join(chunks) == text
+
+
+def test_summarize_git_diff_maps_then_reduces(monkeypatch):
+    calls = []
+
+    def fake_call(chunk, prompt=None):
+        calls.append(prompt)
+        return "merged" if prompt == suggester.REDUCE_PROMPT else f"summary of {chunk.splitlines()[0]}"
+
+    monkeypatch.setattr(suggester, "call_ollama", fake_call)
+    monkeypatch.setattr(suggester, "DIFF_CHUNK_TOKENS", 60)
+    result = suggester.summarize_git_diff(diff=SAMPLE_DIFF, concise=True)
+    assert result["chunks"] == len(result["summaries"]) > 1
+    assert result["combined"] == "merged"
+    assert calls.count(suggester.REDUCE_PROMPT) == 1
+
+
+def test_reduce_summaries_reads_budget_at_call_time(monkeypatch):
+    calls = []
+    monkeypatch.setattr(suggester, "call_ollama", lambda text, prompt=None: calls.append(text) or "merged")
+    monkeypatch.setattr(suggester, "DIFF_CHUNK_TOKENS", 5)
+    # Three 4-token summaries don't fit a 5-token budget together: two reduce rounds
+    assert suggester.reduce_summaries(["a b c d", "e f g h", "i j k l"]) == "merged"
+    assert len(calls) > 1
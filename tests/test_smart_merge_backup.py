@@ -48,4 +48,29 @@ def test_invalid_backup_file(mock_connect, mock_run, tmp_path, monkeypatch):
     with pytest.raises(SystemExit):
         smart_merge_backup.main()
 
-# TODO: Add tests for upsert logic, FDW setup, error handling, and logging 
\ No newline at end of file
+# TODO: Add tests for upsert logic, FDW setup, error handling, and logging 
+
+def test_token_upsert_hashes_plaintext_tokens_from_old_backups():
+    import hashlib
+
+    import sqlalchemy as sa
+
+    from db import SessionLocal
+
+    hashed = hashlib.sha256(b"already-hashed").hexdigest()
+    db = SessionLocal()
+    try:
+        db.execute(sa.text("CREATE SCHEMA IF NOT EXISTS temp_schema"))
+        db.execute(sa.text("CREATE TABLE temp_schema.api_access_tokens (LIKE public.api_access_tokens)"))
+        db.execute(sa.text(
+            "INSERT INTO temp_schema.api_access_tokens (id, token, active, role) "
+            "VALUES ('old', 'plain-token', 1, 'admin'), ('new', :h, 1, 'admin')"
+        ), {"h": hashed})
+        db.execute(sa.text(smart_merge_backup.TABLES['api_access_tokens'][1]))
+        tokens = dict(db.execute(sa.text("SELECT id, token FROM api_access_tokens")).all())
+        assert tokens == {"old": hashlib.sha256(b"plain-token").hexdigest(), "new": hashed}
+    finally:
+        db.rollback()
+        db.execute(sa.text("DROP SCHEMA IF EXISTS temp_schema CASCADE"))
+        db.commit()
+        db.close()
@@ -0,0 +1,42 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import rule_api_server
+from db import Base
+
+
+@pytest.fixture
+def sqlite_db(monkeypatch):
+    """
+    In-memory SQLite stand-in for the rules database, for logic that doesn't depend on
+    Postgres. Call it with the models whose tables are needed (none = all tables); it
+    points rule_api_server.SessionLocal and get_db at the new database and returns the
+    sessionmaker. One connection is shared across sessions and threads.
+    Postgres-only behaviour (triggers, partitions, row locks, LISTEN/NOTIFY) is tested
+    against the shared database in tests/test_rule_api_server.py.
+    """
+    engines = []
+
+    def make(*models):
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(engine, tables=[m.__table__ for m in models] or None)
+        Session = sessionmaker(bind=engine)
+
+        def override():
+            db = Session()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        monkeypatch.setattr(rule_api_server, "SessionLocal", Session)
+        rule_api_server.app.dependency_overrides[rule_api_server.get_db] = override
+        engines.append(engine)
+        return Session
+
+    yield make
+    rule_api_server.app.dependency_overrides.pop(rule_api_server.get_db, None)
+    for engine in engines:
+        engine.dispose()
@@ -0,0 +1,70 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import rule_api_server
+from db import ApiAccessToken
+
+
+@pytest.fixture
+def token_db(sqlite_db):
+    Session = sqlite_db(ApiAccessToken)
+    rule_api_server.api_token_cache.invalidate()
+    yield Session
+    rule_api_server.api_token_cache.invalidate()
+
+
+def _count_token_queries(monkeypatch):
+    calls = []
+    real = rule_api_server.SessionLocal
+
+    def counting():
+        calls.append(1)
+        return real()
+
+    monkeypatch.setattr(rule_api_server, "SessionLocal", counting)
+    return calls
+
+
+def test_tokens_are_stored_hashed_and_cached(token_db, monkeypatch):
+    client = TestClient(rule_api_server.app)
+    issued = client.post("/admin/generate-token", params={"role": "admin"}).json()
+    db = token_db()
+    stored = db.query(ApiAccessToken).one()
+    db.close()
+    assert stored.token == rule_api_server.hash_api_token(issued["token"]) != issued["token"]
+
+    calls = _count_token_queries(monkeypatch)
+    for _ in range(3):
+        assert rule_api_server.lookup_api_token(issued["token"]).role == "admin"
+    assert len(calls) == 1
+    # Unknown tokens are negatively cached as well
+    assert rule_api_server.lookup_api_token("nope") is None
+    assert rule_api_server.lookup_api_token("nope") is None
+    assert len(calls) == 2
+
+
+def test_revoke_invalidates_cached_token(token_db):
+    client = TestClient(rule_api_server.app)
+    admin = client.post("/admin/generate-token", params={"role": "admin"}).json()
+    victim = client.post("/admin/generate-token", params={"role": "moderator"}).json()
+    headers = {"Authorization": f"Bearer {admin['token']}"}
+    assert rule_api_server.lookup_api_token(victim["token"]) is not None
+
+    resp = client.post("/admin/revoke-token", params={"token": victim["token"]}, headers=headers)
+    assert resp.json() == {"id": victim["id"], "active": False}
+    assert rule_api_server.lookup_api_token(victim["token"]) is None
+    denied = client.post("/admin/revoke-token", params={"token_id": admin["id"]},
+                         headers={"Authorization": f"Bearer {victim['token']}"})
+    assert denied.status_code == 401
+
+
+def test_cache_entries_expire():
+    cache = rule_api_server.ApiTokenCache(maxsize=2, ttl=60, negative_ttl=0)
+    token = rule_api_server.CachedApiToken(id="1", role="admin")
+    cache.put("a", token)
+    cache.put("b", None)  # negative caching disabled
+    assert cache.get("a") == (True, token)
+    assert cache.get("b") == (False, None)
+    cache.put("c", token)
+    cache.put("d", token)
+    assert cache.get("a") == (False, None)
@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta
+
+import pytest
+import sqlalchemy as sa
+from fastapi.testclient import TestClient
+
+import rule_api_server
+from db import Proposal, Rule, RuleVersion, StatusEnum
+
+
+@pytest.fixture
+def moderation_db(sqlite_db):
+    return sqlite_db(Proposal, Rule, RuleVersion)
+
+
+def _proposal(pid, minutes, rule_id=None, project="p1", status=StatusEnum.pending):
+    return Proposal(id=pid, rule_id=rule_id, rule_type="style", description=f"desc {pid}", diff="d",
+                    status=status, submitted_by="bot", project=project,
+                    timestamp=datetime(2025, 1, 1) + timedelta(minutes=minutes), categories=["c"], tags=[])
+
+
+def test_bulk_approve_versions_rules_in_one_request(moderation_db):
+    db = moderation_db()
+    db.add(Rule(id="r1", rule_type="style", description="v1", diff="d", submitted_by="bot", version=1,
+                timestamp=datetime(2024, 1, 1), categories=[], tags=[]))
+    db.add_all([
+        _proposal("a", 2, rule_id="r1"),
+        _proposal("b", 1, rule_id="r1"),
+        _proposal("c", 3),
+        _proposal("done", 0, status=StatusEnum.approved),
+    ])
+    db.commit()
+    db.close()
+
+    resp = TestClient(rule_api_server.app).post(
+        "/bulk-moderate-rule-changes", json={"action": "approve", "proposal_ids": ["a", "missing", "b", "c", "done"]}
+    )
+    body = resp.json()
+    assert body["processed"] == 3
+    assert body["results"] == [
+        {"proposal_id": "a", "status": "approved", "rule_id": "r1", "version": 3},
+        {"proposal_id": "missing", "status": "not_found"},
+        {"proposal_id": "b", "status": "approved", "rule_id": "r1", "version": 2},
+        {"proposal_id": "c", "status": "approved", "rule_id": "c", "version": 1},
+        {"proposal_id": "done", "status": "already_processed"},
+    ]
+    db = moderation_db()
+    rule = db.get(Rule, "r1")
+    assert (rule.version, rule.description) == (3, "desc a")
+    history = [(v.version, v.description) for v in db.query(RuleVersion).order_by(RuleVersion.version)]
+    assert history == [(1, "v1"), (2, "desc b")]
+    assert db.get(Rule, "c").categories == ["c"]
+    assert {p.status for p in db.query(Proposal)} == {StatusEnum.approved}
+    db.close()
+
+
+def test_bulk_reject_by_filter(moderation_db):
+    db = moderation_db()
+    db.add_all([_proposal("x", 1), _proposal("y", 2, project="p2"), _proposal("z", 3)])
+    db.commit()
+    db.close()
+    client = TestClient(rule_api_server.app)
+    assert client.post("/bulk-moderate-rule-changes", json={"action": "delete"}).status_code == 400
+
+    resp = client.post("/bulk-moderate-rule-changes",
+                       json={"action": "reject", "filter": {"project": "p1"}, "limit": 1})
+    assert resp.json() == {"action": "reject", "processed": 1, "results": [{"proposal_id": "x", "status": "rejected"}]}
+    db = moderation_db()
+    assert {p.id: p.status for p in db.query(Proposal)} == {
+        "x": StatusEnum.rejected, "y": StatusEnum.pending, "z": StatusEnum.pending
+    }
+    db.close()
+
+
+def test_bulk_approve_reports_rules_created_concurrently(moderation_db, monkeypatch):
+    db = moderation_db()
+    db.add_all([_proposal("new", 1), _proposal("new2", 2, rule_id="new"), _proposal("other", 3)])
+    db.commit()
+    db.close()
+    values_from_proposal = rule_api_server.rule_values_from_proposal
+
+    def racing_values(proposal, rule_id, version):
+        values = values_from_proposal(proposal, rule_id, version)
+        if proposal.id == "new":
+            # Another approval creates the rule after this batch loaded its targets
+            sa.orm.object_session(proposal).execute(sa.insert(Rule).values(**{**values, "description": "theirs"}))
+        return values
+
+    monkeypatch.setattr(rule_api_server, "rule_values_from_proposal", racing_values)
+    resp = TestClient(rule_api_server.app).post(
+        "/bulk-moderate-rule-changes", json={"action": "approve", "proposal_ids": ["new", "new2", "other"]}
+    )
+    assert resp.status_code == 200
+    assert resp.json()["processed"] == 1
+    assert resp.json()["results"] == [
+        {"proposal_id": "new", "status": "conflict", "rule_id": "new"},
+        {"proposal_id": "new2", "status": "conflict", "rule_id": "new"},
+        {"proposal_id": "other", "status": "approved", "rule_id": "other", "version": 1},
+    ]
+    db = moderation_db()
+    assert db.get(Rule, "new").description == "theirs"
+    assert db.query(RuleVersion).count() == 0
+    assert {p.id: p.status for p in db.query(Proposal)} == {
+        "new": StatusEnum.pending, "new2": StatusEnum.pending, "other": StatusEnum.approved
+    }
+    db.close()
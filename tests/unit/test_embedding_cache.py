@@ -0,0 +1,35 @@
+import rule_api_server
+from rule_api_server import EmbeddingLRUCache
+
+
+def test_lru_evicts_least_recently_used():
+    cache = EmbeddingLRUCache(maxsize=2)
+    cache.put("a", [1.0])
+    cache.put("b", [2.0])
+    assert cache.get("a") == [1.0]  # "a" becomes most recent
+    cache.put("c", [3.0])
+    assert cache.get("b") is None
+    assert cache.get("a") == [1.0]
+    assert cache.get("c") == [3.0]
+
+
+def test_get_embedding_cached_skips_model_on_repeat(monkeypatch):
+    calls = []
+
+    def fake_embedding(content):
+        calls.append(content)
+        return [float(len(content))] * 3
+
+    monkeypatch.setattr(rule_api_server, "get_embedding_ollama", fake_embedding)
+    monkeypatch.setattr(rule_api_server, "EMBEDDING_CACHE_PERSIST", False)
+    monkeypatch.setattr(rule_api_server, "embedding_cache", EmbeddingLRUCache(maxsize=8))
+
+    first = rule_api_server.get_embedding_cached("hello")
+    second = rule_api_server.get_embedding_cached("hello")
+    rule_api_server.get_embedding_cached("other")
+    assert first == second == [5.0, 5.0, 5.0]
+    assert calls == ["hello", "other"]
+    stats = rule_api_server.embedding_cache.snapshot()
+    assert stats["memory_hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["hit_rate"] == round(1 / 3, 4)
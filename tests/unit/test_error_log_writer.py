@@ -0,0 +1,133 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+import rule_api_server
+from db import ApiAccessToken, ApiErrorLog, ApiErrorRollup
+
+
+@pytest.fixture
+def log_db(sqlite_db):
+    return sqlite_db(ApiErrorLog, ApiErrorRollup, ApiAccessToken)
+
+
+def _record(i, message="boom", timestamp=None):
+    return dict(id=f"e{i}", timestamp=timestamp or datetime.utcnow(), path="/x", method="POST", status_code=422,
+                message=message, stack_trace="", user_id=None)
+
+
+def test_writer_batches_samples_and_counts_overflow(log_db, monkeypatch):
+    monkeypatch.setattr(rule_api_server, "ERROR_LOG_SAMPLE_BURST", 3)
+    monkeypatch.setattr(rule_api_server, "ERROR_LOG_SAMPLE_RATE", 5)
+    writer = rule_api_server.ErrorLogWriter(maxsize=100, batch_size=4, flush_interval=0.05)
+    monkeypatch.setattr(writer, "_ensure_started", lambda: None)
+
+    references = [writer.submit(**_record(i)) for i in range(13)]
+    # 3 burst records, then every 5th identical one; skipped errors point at the last written one
+    assert references == ["e0", "e1", "e2", "e2", "e2", "e2", "e2", "e7", "e7", "e7", "e7", "e7", "e12"]
+    assert writer.submit(**_record(99, message="other")) == "e99"
+    writer.flush()
+
+    db = log_db()
+    rows = {row.id: row.message for row in db.query(ApiErrorLog)}
+    db.close()
+    assert len(rows) == 6
+    assert rows["e7"] == "boom [+4 identical errors not logged]"
+    stats = writer.snapshot()
+    assert stats["written"] == 6 and stats["batches"] == 2
+    assert stats["sampled_out"] == 8
+
+    small = rule_api_server.ErrorLogWriter(maxsize=1, batch_size=4, flush_interval=0.05)
+    monkeypatch.setattr(small, "_ensure_started", lambda: None)
+    assert small.submit(**_record(1, "a")) == "e1"
+    # Queue full and no earlier identical error: nothing to reference
+    assert small.submit(**_record(2, "b")) is None
+    assert small.submit(**_record(3, "a")) == "e1"
+    assert small.snapshot()["dropped"] == 2
+
+
+def test_failed_writes_keep_pending_rollups(log_db, monkeypatch):
+    writer = rule_api_server.ErrorLogWriter(maxsize=100, batch_size=10, flush_interval=0.05)
+    monkeypatch.setattr(writer, "_ensure_started", lambda: None)
+    real_upsert = rule_api_server.upsert_error_rollups
+    failures = iter([True])
+
+    def flaky_upsert(db, rollups):
+        if next(failures, False):
+            raise RuntimeError("db down")
+        real_upsert(db, rollups)
+
+    monkeypatch.setattr(rule_api_server, "upsert_error_rollups", flaky_upsert)
+    writer.submit(**_record(1))
+    writer.flush()
+    writer.submit(**_record(2))
+    writer.submit(**_record(3, message="boom again"))
+    # A row the database rejects fails the log batch; the rollups still land
+    writer._queue.put_nowait({**_record(4), "timestamp": "not a date"})
+    writer.flush()
+
+    db = log_db()
+    rollups = sorted((r.sample_message, r.count) for r in db.query(ApiErrorRollup))
+    logged = [row.id for row in db.query(ApiErrorLog)]
+    db.close()
+    assert rollups == [("boom", 2), ("boom again", 1)]
+    assert logged == ["e1"]
+    assert writer.snapshot()["write_errors"] == 3
+
+
+def test_validation_errors_are_logged_off_the_request_path(log_db):
+    client = TestClient(rule_api_server.app)
+    resp = client.post("/review-code-snippet", json={"filename": "x.py"})
+    assert resp.status_code == 422
+    rule_api_server.error_log_writer.stop()
+    db = log_db()
+    row = db.query(ApiErrorLog).filter_by(id=resp.json()["error_id"]).one()
+    db.close()
+    assert row.status_code == 422 and row.path == "/review-code-snippet"
+
+
+def test_rollups_count_every_error_and_are_served_by_fingerprint(log_db, monkeypatch):
+    monkeypatch.setattr(rule_api_server, "ERROR_LOG_SAMPLE_BURST", 1)
+    monkeypatch.setattr(rule_api_server, "ERROR_LOG_SAMPLE_RATE", 1000)
+    writer = rule_api_server.ErrorLogWriter(maxsize=100, batch_size=50, flush_interval=0.05)
+    monkeypatch.setattr(writer, "_ensure_started", lambda: None)
+    now = datetime.utcnow()
+    for i in range(5):
+        # Numbers are masked, so these share one fingerprint
+        writer.submit(**_record(i, message=f"row {i} not found", timestamp=now))
+    writer.flush()
+    writer.submit(**_record(10, message="row 77 not found", timestamp=now))
+    writer.submit(**_record(11, message="timeout", timestamp=now - timedelta(hours=1)))
+    writer.flush()
+
+    db = log_db()
+    assert db.query(ApiErrorLog).count() == 2
+    db.close()
+    monkeypatch.setattr(rule_api_server, "lookup_api_token", lambda token: rule_api_server.CachedApiToken(id="t", role="admin"))
+    client = TestClient(rule_api_server.app)
+    headers = {"Authorization": "Bearer t"}
+    total = client.get("/admin/errors/rollups", params={"bucket": "total"}, headers=headers).json()
+    hourly = client.get("/admin/errors/rollups", headers=headers).json()
+    assert client.get("/admin/errors/rollups", params={"bucket": "week"}, headers=headers).status_code == 400
+    counts = [(r["count"], r["sample_message"]) for r in total["rollups"]]
+    assert counts == [(6, "row 0 not found"), (1, "timeout")]
+    assert len(hourly["rollups"]) == 2
+
+
+def test_maintenance_deletes_expired_rows_without_partitions(log_db, monkeypatch):
+    monkeypatch.setattr(rule_api_server, "ERROR_LOG_RETENTION_DAYS", 30)
+    monkeypatch.setattr(rule_api_server, "ERROR_ROLLUP_RETENTION_DAYS", 60)
+    now = datetime.utcnow()
+    db = log_db()
+    db.add_all([
+        ApiErrorLog(id="old", timestamp=now - timedelta(days=31), path="/x"),
+        ApiErrorLog(id="new", timestamp=now, path="/x"),
+        ApiErrorRollup(bucket_start=now - timedelta(days=61), path="/x", method="GET", status_code=500,
+                       fingerprint="f", count=1),
+    ])
+    db.commit()
+    result = rule_api_server.maintain_error_logs(db, now=now)
+    assert result == {"created": [], "dropped": [], "moved": 0, "logs_deleted": 1, "rollups_deleted": 1}
+    assert [row.id for row in db.query(ApiErrorLog)] == ["new"]
+    db.close()
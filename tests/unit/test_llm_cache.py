@@ -0,0 +1,105 @@
+import sqlite3
+
+import psycopg2
+import pytest
+
+import scripts.llm_cache as llm_cache
+from scripts.llm_cache import PostgresLLMCache, SQLiteLLMCache, cache_key, cached_completion
+
+
+def test_cache_key_depends_on_model_prompt_and_options():
+    base = cache_key("llama3", "hi")
+    assert base == cache_key("llama3", "hi", {})
+    assert base != cache_key("llama3", "hi!")
+    assert base != cache_key("mistral", "hi")
+    assert base != cache_key("llama3", "hi", {"temperature": 0})
+
+
+def test_sqlite_cache_ttl_and_lru_eviction(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(llm_cache.time, "time", lambda: now[0])
+    cache = SQLiteLLMCache(str(tmp_path / "cache.sqlite3"), ttl=100, max_entries=2)
+    cache.put("a", "m", "A")
+    now[0] += 1
+    cache.put("b", "m", "B")
+    now[0] += 1
+    assert cache.get("a") == "A"  # "a" is now more recently used than "b"
+    now[0] += 1
+    cache.put("c", "m", "C")
+    assert cache.get("b") is None
+    assert cache.stats()["entries"] == 2
+    now[0] += 200
+    assert cache.get("a") is None
+    assert cache.evict() == 1
+
+
+def test_cached_completion_skips_model_on_hit_and_ignores_failures(tmp_path, monkeypatch):
+    cache = SQLiteLLMCache(str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(llm_cache, "get_cache", lambda: cache)
+    calls = []
+
+    def generate():
+        calls.append(1)
+        return "answer"
+
+    assert cached_completion("m", "prompt", generate) == "answer"
+    assert cached_completion("m", "prompt", generate) == "answer"
+    assert len(calls) == 1
+
+    def failing():
+        raise RuntimeError("model down")
+
+    with pytest.raises(RuntimeError):
+        cached_completion("m", "other", failing)
+    assert cache.get(cache_key("m", "other")) is None
+    # Empty responses are not cached
+    assert cached_completion("m", "empty", lambda: "") == ""
+    assert cache.get(cache_key("m", "empty")) is None
+
+
+class _FakePgConnection:
+    """psycopg2-like connection over SQLite; `down` makes every statement fail like a dropped link."""
+
+    def __init__(self, db, server):
+        self.db = db
+        self.server = server
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, params=()):
+        if self.server["down"] or self.server["stale"] is self:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+        self._cursor = self.db.execute(sql.replace("%s", "?"), params)
+        self.rowcount = self._cursor.rowcount
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def close(self):
+        pass
+
+
+def test_postgres_cache_reconnects_once_then_falls_back_to_the_model(monkeypatch):
+    db = sqlite3.connect(":memory:", isolation_level=None, check_same_thread=False)
+    server = {"down": False, "stale": None, "connects": 0}
+
+    def connect(dsn):
+        if server["down"]:
+            raise psycopg2.OperationalError("could not connect to server")
+        server["connects"] += 1
+        return _FakePgConnection(db, server)
+
+    monkeypatch.setattr(psycopg2, "connect", connect)
+    cache = PostgresLLMCache("postgresql://cache")
+    monkeypatch.setattr(llm_cache, "get_cache", lambda: cache)
+    assert cached_completion("m", "prompt", lambda: "answer") == "answer"
+
+    # The server restarted: the old connection is dead, a new one works
+    server["stale"] = cache._conn
+    assert cached_completion("m", "prompt", lambda: "not cached") == "answer"
+    assert server["connects"] == 2
+
+    # Still down after the retry: the call goes to the model uncached
+    server["down"] = True
+    assert cached_completion("m", "prompt", lambda: "uncached") == "uncached"
@@ -0,0 +1,95 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import rule_api_server
+from db import LlmJob
+
+
+@pytest.fixture
+def job_db(sqlite_db):
+    return sqlite_db()
+
+
+def test_jobs_are_claimed_in_order_and_finished(job_db, monkeypatch):
+    async def fake_summarize(diff, concise=False):
+        return {"combined": f"summary of {diff}"}
+
+    async def broken(payload):
+        raise RuntimeError("model down")
+
+    monkeypatch.setattr(rule_api_server, "call_summarize_git_diff", fake_summarize)
+    monkeypatch.setitem(rule_api_server.JOB_HANDLERS, "suggest-llm-rules", broken)
+    db = job_db()
+    first = rule_api_server.enqueue_job(db, "summarize-git-diff", {"diff": "d1"})
+    second = rule_api_server.enqueue_job(db, "suggest-llm-rules", {"target": "."})
+    db.close()
+    assert first["status"] == "queued"
+
+    assert asyncio.run(rule_api_server.process_next_job("w1"))
+    assert asyncio.run(rule_api_server.process_next_job("w1"))
+    assert not asyncio.run(rule_api_server.process_next_job("w1"))
+
+    done = rule_api_server._load_job(first["id"])
+    assert done["status"] == "succeeded"
+    assert done["result"] == {"combined": "summary of d1"}
+    assert done["attempts"] == 1
+    failed = rule_api_server._load_job(second["id"])
+    assert failed["status"] == "failed"
+    assert failed["error"] == "model down"
+
+
+def test_stale_running_jobs_are_requeued_then_failed(job_db, monkeypatch):
+    monkeypatch.setattr(rule_api_server, "JOB_MAX_ATTEMPTS", 2)
+    db = job_db()
+    old = datetime.utcnow() - timedelta(seconds=rule_api_server.JOB_STALE_SECONDS + 5)
+    db.add_all([
+        LlmJob(id="retry", kind="summarize-git-diff", status="running", attempts=1, started_at=old, created_at=old),
+        LlmJob(id="give-up", kind="summarize-git-diff", status="running", attempts=2, started_at=old, created_at=old),
+        LlmJob(id="fresh", kind="summarize-git-diff", status="running", attempts=1, started_at=datetime.utcnow()),
+    ])
+    db.commit()
+    db.close()
+    assert rule_api_server.requeue_stale_jobs() == 2
+    assert rule_api_server._load_job("retry")["status"] == "queued"
+    assert rule_api_server._load_job("give-up")["status"] == "failed"
+    assert rule_api_server._load_job("fresh")["status"] == "running"
+
+
+def test_long_running_job_keeps_its_lease_and_late_results_are_discarded(job_db, monkeypatch):
+    monkeypatch.setattr(rule_api_server, "JOB_HEARTBEAT_SECONDS", 0.02)
+    monkeypatch.setattr(rule_api_server, "JOB_STALE_SECONDS", 0.3)
+    requeued = []
+
+    async def slow_summarize(diff, concise=False):
+        # Runs well past JOB_STALE_SECONDS, but the heartbeat keeps the lease fresh
+        await asyncio.sleep(0.6)
+        requeued.append(rule_api_server.requeue_stale_jobs())
+        return {"combined": "done"}
+
+    monkeypatch.setattr(rule_api_server, "call_summarize_git_diff", slow_summarize)
+    db = job_db()
+    job = rule_api_server.enqueue_job(db, "summarize-git-diff", {"diff": "d"})
+    db.close()
+    assert asyncio.run(rule_api_server.process_next_job("w1"))
+    db = job_db()
+    stored = db.get(LlmJob, job["id"])
+    assert stored.heartbeat_at > stored.started_at
+    db.close()
+    assert requeued == [0]
+    assert rule_api_server._load_job(job["id"])["status"] == "succeeded"
+
+    # A worker whose job was requeued and re-claimed by another can't overwrite the outcome
+    db = job_db()
+    other = rule_api_server.enqueue_job(db, "summarize-git-diff", {"diff": "d2"})
+    db.close()
+    assert rule_api_server.claim_next_job("w1")[0] == other["id"]
+    db = job_db()
+    db.get(LlmJob, other["id"]).locked_by = "w2"
+    db.commit()
+    db.close()
+    assert not rule_api_server.finish_job(other["id"], "w1", {"combined": "stale"})
+    assert rule_api_server.renew_job_lease(other["id"], "w2")
+    assert rule_api_server.finish_job(other["id"], "w2", {"combined": "fresh"})
+    assert rule_api_server._load_job(other["id"])["result"] == {"combined": "fresh"}
@@ -0,0 +1,48 @@
+import pytest
+from fastapi import HTTPException
+
+import rule_api_server
+from rule_api_server import EmbeddingLRUCache, embed_many, parse_memory_node_batch
+
+
+def test_parse_memory_node_batch_formats():
+    assert parse_memory_node_batch(b'[{"namespace": "a", "content": "x"}]', "application/json") == [
+        {"namespace": "a", "content": "x"}
+    ]
+    assert parse_memory_node_batch(b'{"nodes": [{"content": "y"}]}', "application/json") == [{"content": "y"}]
+    items = parse_memory_node_batch(
+        b'{"namespace": "a", "content": "x"}\n\nnot json\n', "application/x-ndjson"
+    )
+    assert items[0] == {"namespace": "a", "content": "x"}
+    assert isinstance(items[1], ValueError)
+    with pytest.raises(HTTPException):
+        parse_memory_node_batch(b'{"namespace": "a"}', "application/json")
+
+
+def test_embed_many_batches_dedupes_and_isolates_failures(monkeypatch):
+    batches = []
+
+    def fake_batch(contents):
+        batches.append(list(contents))
+        if "boom" in contents:
+            raise RuntimeError("model down")
+        return [[float(len(c))] for c in contents]
+
+    monkeypatch.setattr(rule_api_server, "get_embeddings_ollama_batch", fake_batch)
+    monkeypatch.setattr(rule_api_server, "EMBEDDING_CACHE_PERSIST", False)
+    monkeypatch.setattr(rule_api_server, "MEMORY_EMBED_BATCH_SIZE", 2)
+    monkeypatch.setattr(rule_api_server, "embedding_cache", EmbeddingLRUCache(maxsize=16))
+
+    result = embed_many(["a", "bb", "a", "ccc", "boom"])
+    assert result["a"] == [1.0]
+    assert result["bb"] == [2.0]
+    assert result["ccc"] == [3.0]
+    assert isinstance(result["boom"], RuntimeError)
+    # [a, bb] succeeds; [ccc, boom] fails and is retried item by item
+    assert sorted(len(b) for b in batches) == [1, 1, 2, 2]
+    assert sum(b.count("a") for b in batches) == 1
+
+    # Second call is served from the in-process cache
+    batches.clear()
+    assert embed_many(["a", "bb"]) == {"a": [1.0], "bb": [2.0]}
+    assert batches == []
@@ -1,9 +1,14 @@
+import json
+
 import pytest
 from scripts.memory_edge_inference import (
     extract_explicit_edges,
     extract_tag_based_edges,
     extract_content_based_edges,
     extract_custom_edges,
+    iter_tag_based_edges,
+    PatternAutomaton,
+    iter_content_based_edges,
 )
 
 
@@ -44,4 +49,56 @@ def test_extract_content_based_edges(memory_node):
 
 def test_extract_custom_edges():
     # Placeholder for future custom rule-based edge extraction
-    assert extract_custom_edges([]) == [] 
\ No newline at end of file
+    assert extract_custom_edges([]) == [] 
+
+def test_tag_edges_skip_hot_buckets_and_stream(memory_node):
+    nodes = [
+        memory_node(f"Node {i}", meta='{"tags": ["hot"]}', node_id=f"h{i}") for i in range(4)
+    ] + [
+        memory_node("Pair A", meta='{"tags": ["hot", "rare"]}', node_id="a"),
+        memory_node("Pair B", meta='{"tags": ["rare"]}', node_id="b"),
+    ]
+    edges = list(iter_tag_based_edges(nodes, max_bucket_size=3))
+    assert {(e["from_id"], e["to_id"]) for e in edges} == {("a", "b"), ("b", "a")}
+    # Without a cap every node in the hot bucket pairs up (5*4) plus b<->a
+    assert len(extract_tag_based_edges(nodes, max_bucket_size=None)) == 22
+
+
+def test_pattern_automaton_matches_substring_search():
+    patterns = ["he", "she", "his", "hers", "n1", "n10", "retry-policy", "retry-policy-v2",
+                "123e4567-e89b-12d3-a456-426614174000"]
+    automaton = PatternAutomaton(patterns)
+    for text in ["ushers", "n10 and his", "", "nothing", "n1n10hershe", "see retry-policy-v2 and retry-polic",
+                 "ref:123e4567-e89b-12d3-a456-426614174000."]:
+        assert automaton.find_all(text) == {p for p in patterns if p in text}
+
+
+def test_pattern_automaton_is_linear_in_shared_prefixes():
+    aliases = [f"component_{i:05d}" for i in range(5000)]
+    automaton = PatternAutomaton(aliases)
+    text = " ".join(aliases[::7])
+    assert automaton.find_all(text) == set(aliases[::7])
+    # Every position shares the "component_" prefix; only the fail links are followed
+    assert automaton.find_all("component_" * 2000) == set()
+
+
+def test_content_edges_batch_large_pattern_sets(monkeypatch):
+    import scripts.memory_edge_inference as inference
+
+    nodes = [{"id": f"node-{i:03d}", "content": f"see node-{(i + 1) % 50:03d}", "meta": "{}"} for i in range(50)]
+    expected = list(iter_content_based_edges(nodes))
+    monkeypatch.setattr(inference, "CONTENT_PATTERN_MAX_CHARS", 40)
+    assert list(iter_content_based_edges(nodes)) == expected
+    assert len(expected) == 50
+
+
+def test_content_edges_match_meta_names_and_aliases(memory_node):
+    nodes = [
+        memory_node("Retry policy", meta='{"name": "retry-policy", "aliases": ["backoff"]}', node_id="n1"),
+        memory_node("See retry-policy, and also n1", node_id="n2"),
+        memory_node("Exponential backoff everywhere", node_id="n3"),
+    ]
+    edges = {(e["from_id"], e["to_id"]): json.loads(e["meta"]) for e in extract_content_based_edges(nodes)}
+    assert edges[("n2", "n1")] == {"matched_id": "n1"}
+    assert edges[("n3", "n1")] == {"matched_id": "n1", "matched_text": "backoff"}
+    assert len(edges) == 2
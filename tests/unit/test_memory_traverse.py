@@ -0,0 +1,27 @@
+import pytest
+
+from rule_api_server import build_traverse_sql, collect_traversal
+
+
+def test_build_traverse_sql_directions_and_filter():
+    out_sql = build_traverse_sql("out", False)
+    assert "from_id AS src, to_id AS dst" in out_sql
+    assert "to_id AS src" not in out_sql
+    assert "relation_types" not in out_sql
+    both_sql = build_traverse_sql("both", True)
+    assert "from_id AS src" in both_sql and "to_id AS src" in both_sql
+    assert "ANY(CAST(:relation_types AS varchar[]))" in both_sql
+    assert "NOT s.dst = ANY(w.path)" in both_sql
+    with pytest.raises(ValueError):
+        build_traverse_sql("sideways", False)
+
+
+def test_collect_traversal_keeps_min_depth_and_caps():
+    rows = [("a", None, 0), ("b", "e1", 1), ("c", "e2", 2), ("c", "e3", 1), ("d", "e4", 3)]
+    depths, edge_ids, truncated = collect_traversal(rows, limit=10)
+    assert depths == {"a": 0, "b": 1, "c": 1, "d": 3}
+    assert edge_ids == {"e1", "e2", "e3", "e4"}
+    assert not truncated
+    depths, _, truncated = collect_traversal(rows, limit=2)
+    assert set(depths) == {"a", "b"} or set(depths) == {"a", "c"}
+    assert truncated
@@ -0,0 +1,22 @@
+import pytest
+
+from scripts.memory_vector_index import INDEX_NAME, _int_list, index_ddl
+
+
+def test_index_ddl_hnsw():
+    ddl = index_ddl("hnsw", m=24, ef_construction=100)
+    assert ddl.startswith(f"CREATE INDEX {INDEX_NAME} ON memory_vectors USING hnsw")
+    assert "vector_cosine_ops" in ddl
+    assert "m = 24, ef_construction = 100" in ddl
+
+
+def test_index_ddl_ivfflat_and_unknown():
+    assert "USING ivfflat" in index_ddl("ivfflat", lists=500)
+    assert "lists = 500" in index_ddl("ivfflat", lists=500)
+    with pytest.raises(ValueError):
+        index_ddl("btree")
+
+
+def test_int_list():
+    assert _int_list("20, 40,80") == [20, 40, 80]
+    assert _int_list("") == []
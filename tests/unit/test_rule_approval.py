@@ -0,0 +1,117 @@
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+
+import rule_api_server
+from db import Proposal, Rule, RuleVersion, StatusEnum
+
+
+@pytest.fixture
+def approval_db(sqlite_db):
+    Session = sqlite_db(Proposal, Rule, RuleVersion)
+    return Session.kw["bind"], Session
+
+
+def _propose(Session, pid, description, rule_id="r1"):
+    db = Session()
+    db.add(Proposal(id=pid, rule_id=rule_id, rule_type="style", description=description, diff="d",
+                    status=StatusEnum.pending, submitted_by="bot", timestamp=datetime(2025, 1, 1),
+                    categories=[], tags=[]))
+    db.commit()
+    db.close()
+
+
+def _rowid(engine, rule_id):
+    with engine.connect() as conn:
+        return conn.exec_driver_sql("SELECT rowid FROM rules WHERE id = ?", (rule_id,)).scalar()
+
+
+def test_approvals_update_the_rule_in_place(approval_db):
+    engine, Session = approval_db
+    client = TestClient(rule_api_server.app)
+    _propose(Session, "p1", "first")
+    _propose(Session, "p2", "second")
+
+    assert client.post("/approve-rule-change/p1").json()["version"] == 1
+    rowid = _rowid(engine, "r1")
+    assert client.post("/approve-rule-change/p2").json()["version"] == 2
+    assert client.post("/approve-rule-change/p2").status_code == 400
+    assert client.post("/approve-rule-change/nope").status_code == 404
+
+    # Same physical row: no delete + re-insert
+    assert _rowid(engine, "r1") == rowid
+    db = Session()
+    assert (db.get(Rule, "r1").version, db.get(Rule, "r1").description) == (2, "second")
+    assert [(v.version, v.description) for v in db.query(RuleVersion)] == [(1, "first")]
+    db.close()
+
+
+def test_concurrent_version_bump_is_retried_not_lost(approval_db, monkeypatch):
+    engine, Session = approval_db
+    client = TestClient(rule_api_server.app)
+    _propose(Session, "p1", "first")
+    client.post("/approve-rule-change/p1")
+    _propose(Session, "p2", "mine")
+    raced = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def concurrent_approval(conn, cursor, statement, parameters, context, executemany):
+        # Another approval commits between our read and our guarded UPDATE
+        if statement.startswith("UPDATE rules") and not raced:
+            raced.append(statement)
+            cursor.execute("UPDATE rules SET version = version + 1, description = 'theirs' WHERE id = 'r1'")
+
+    resp = client.post("/approve-rule-change/p2")
+    event.remove(engine, "before_cursor_execute", concurrent_approval)
+    assert resp.json()["version"] == 3
+    db = Session()
+    assert db.get(Rule, "r1").description == "mine"
+    # The snapshot is of the version we actually replaced
+    assert [(v.version, v.description) for v in db.query(RuleVersion)] == [(2, "theirs")]
+    db.close()
+
+
+def test_approval_gives_up_with_409_after_max_attempts(approval_db, monkeypatch):
+    engine, Session = approval_db
+    client = TestClient(rule_api_server.app)
+    _propose(Session, "p1", "first")
+    client.post("/approve-rule-change/p1")
+    _propose(Session, "p2", "mine")
+    monkeypatch.setattr(rule_api_server, "APPROVE_MAX_ATTEMPTS", 2)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def always_race(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("UPDATE rules"):
+            cursor.execute("UPDATE rules SET version = version + 1 WHERE id = 'r1'")
+
+    resp = client.post("/approve-rule-change/p2")
+    event.remove(engine, "before_cursor_execute", always_race)
+    assert resp.status_code == 409
+    db = Session()
+    # Rolled back: the proposal can be approved again later
+    assert db.get(Proposal, "p2").status == StatusEnum.pending
+    db.close()
+
+
+def test_rules_without_a_timestamp_still_page(approval_db):
+    engine, Session = approval_db
+    client = TestClient(rule_api_server.app)
+    db = Session()
+    db.add(Proposal(id="p0", rule_type="style", description="undated", diff="d", status=StatusEnum.pending,
+                    submitted_by="bot", timestamp=None, categories=[], tags=[]))
+    db.commit()
+    db.close()
+    _propose(Session, "p1", "dated", rule_id="r2")
+    assert client.post("/approve-rule-change/p0").status_code == 200
+    assert client.post("/approve-rule-change/p1").status_code == 200
+
+    first = client.get("/rules", params={"limit": 1})
+    second = client.get("/rules", params={"limit": 1, "after": first.headers["X-Next-Cursor"]})
+    assert [r["id"] for r in first.json() + second.json()] == ["r2", "p0"]
+    # The keyset sort column can't be NULL
+    with pytest.raises(IntegrityError):
+        with engine.begin() as conn:
+            conn.execute(Rule.__table__.insert().values(id="r3", timestamp=None))
@@ -0,0 +1,47 @@
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+import rule_api_server
+from db import Rule, RuleChange
+
+
+@pytest.fixture
+def feed_db(sqlite_db):
+    return sqlite_db(Rule, RuleChange)
+
+
+def _rule(rule_id, project="p1", version=1):
+    return Rule(id=rule_id, rule_type="style", description=f"{rule_id} v{version}", diff="d", submitted_by="bot",
+                project=project, version=version, timestamp=datetime(2025, 1, 1), categories=[], tags=[])
+
+
+def test_feed_pages_through_changes_with_tombstones(feed_db):
+    db = feed_db()
+    # What the rules trigger records on Postgres
+    db.add_all([_rule("a"), _rule("b", version=2), _rule("c", project="p2")])
+    db.add_all([
+        RuleChange(rule_id="a", seq=1),
+        RuleChange(rule_id="gone", seq=2, deleted=True),
+        RuleChange(rule_id="c", seq=4),
+        RuleChange(rule_id="b", seq=5),
+    ])
+    db.commit()
+    db.close()
+    client = TestClient(rule_api_server.app)
+
+    first = client.get("/rules/changes", params={"limit": 2}).json()
+    assert [(c["id"], c["deleted"]) for c in first["changes"]] == [("a", False), ("gone", True)]
+    assert first["changes"][0]["rule"]["description"] == "a v1"
+    assert (first["next_since"], first["has_more"]) == (2, True)
+
+    rest = client.get("/rules/changes", params={"since": first["next_since"], "project": "p1"}).json()
+    # c moved out of p1 as far as this client is concerned
+    assert [(c["seq"], c["id"], c["deleted"]) for c in rest["changes"]] == [(4, "c", True), (5, "b", False)]
+    assert rest["changes"][1]["rule"]["version"] == 2
+    assert (rest["next_since"], rest["has_more"]) == (5, False)
+
+    idle = client.get("/rules/changes", params={"since": 5}).json()
+    assert idle == {"changes": [], "next_since": 5, "has_more": False}
+    assert client.get("/rules/changes", params={"limit": 0}).status_code == 400
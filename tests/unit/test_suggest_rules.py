@@ -0,0 +1,206 @@
+import json
+
+import scripts.suggest_rules as suggest_rules
+
+
+def _make_tree(root):
+    (root / "pkg").mkdir()
+    (root / "pkg" / "a.py").write_text("def foo():\n    print('x')\n")
+    (root / "pkg" / "b.py").write_text("try:\n    pass\nexcept:\n    pass\n")
+    (root / "notes.md").write_text("# TODO: write docs\n")
+    (root / "image.png").write_bytes(b"\x89PNG")
+
+
+def test_scan_directory_parallel_matches_serial(tmp_path):
+    _make_tree(tmp_path)
+    serial = suggest_rules.scan_directory(str(tmp_path))
+    parallel = suggest_rules.scan_directory(str(tmp_path), workers=2)
+    assert serial == parallel
+    assert {s["rule_type"] for s in serial} >= {"no_print", "no_bare_except", "todo_fixme_comment"}
+
+
+def test_scan_directory_cache_skips_unchanged_files(tmp_path, monkeypatch):
+    src = tmp_path / "src"
+    src.mkdir()
+    _make_tree(src)
+    cache_path = str(tmp_path / "cache.json")
+    first = suggest_rules.scan_directory(str(src), cache_path=cache_path)
+
+    scanned = []
+    real_job = suggest_rules._scan_job
+    monkeypatch.setattr(
+        suggest_rules, "_scan_job", lambda job: scanned.append(job[0]) or real_job(job)
+    )
+    assert suggest_rules.scan_directory(str(src), cache_path=cache_path) == first
+    assert scanned == []
+
+    (src / "pkg" / "a.py").write_text("def foo():\n    eval('1')\n")
+    changed = suggest_rules.scan_directory(str(src), cache_path=cache_path)
+    assert scanned == [str(src / "pkg" / "a.py")]
+    assert any(s["rule_type"] == "no_eval" for s in changed)
+    assert not any(s["rule_type"] == "no_print" for s in changed)
+
+
+def test_scan_cache_invalidated_by_checker_version(tmp_path, monkeypatch):
+    _make_tree(tmp_path)
+    cache_path = str(tmp_path / "cache.json")
+    suggest_rules.scan_directory(str(tmp_path), cache_path=cache_path)
+    assert suggest_rules.load_scan_cache(cache_path)
+    monkeypatch.setattr(suggest_rules, "CHECKER_SET_VERSION", "test-bump")
+    assert suggest_rules.load_scan_cache(cache_path) == {}
+    with open(cache_path) as f:
+        assert json.load(f)["version"] != "test-bump"
+
+
+def test_scan_cache_merges_scans_sharing_one_file(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    roots = []
+    for name in ("one", "two", "three", "four"):
+        (tmp_path / name).mkdir()
+        _make_tree(tmp_path / name)
+        roots.append(str(tmp_path / name))
+    cache_path = str(tmp_path / "cache.json")
+    suggest_rules.scan_directory(roots[0], cache_path=cache_path)
+    suggest_rules.scan_directory(roots[1], cache_path=cache_path)
+    cached = suggest_rules.load_scan_cache(cache_path)
+    assert all(any(path.startswith(root) for path in cached) for root in roots[:2])
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(lambda root: suggest_rules.scan_directory(root, cache_path=cache_path), roots * 2))
+    assert suggest_rules.load_scan_cache(cache_path)
+    assert [p.name for p in tmp_path.iterdir() if p.name.endswith(".tmp")] == []
+
+
+def test_iter_suggestions_matches_scan_and_is_thread_safe(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    _make_tree(tmp_path)
+    expected = suggest_rules.scan_directory(str(tmp_path))
+    stream = suggest_rules.iter_suggestions(str(tmp_path))
+    assert next(stream) == expected[0]
+    assert [expected[0]] + list(stream) == expected
+    single = str(tmp_path / "pkg" / "a.py")
+    assert suggest_rules.suggest(single) == suggest_rules.scan_file(single)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda _: suggest_rules.suggest(str(tmp_path)), range(8)))
+    assert all(r == expected for r in results)
+
+
+def test_suggest_uses_directory_scan_with_env_defaults(tmp_path, monkeypatch):
+    src = tmp_path / "src"
+    src.mkdir()
+    _make_tree(src)
+    cache_path = str(tmp_path / "cache.json")
+    monkeypatch.setenv("SUGGEST_RULES_WORKERS", "2")
+    monkeypatch.setenv("SUGGEST_RULES_CACHE", cache_path)
+    calls = []
+    real_iter = suggest_rules.iter_directory_results
+    monkeypatch.setattr(
+        suggest_rules,
+        "iter_directory_results",
+        lambda *args, **kwargs: calls.append(kwargs) or real_iter(*args, **kwargs),
+    )
+    expected = suggest_rules.scan_directory(str(src))
+    assert suggest_rules.suggest(str(src)) == expected
+    assert calls[-1]["workers"] == 2 and calls[-1]["cache_path"] == cache_path
+    assert suggest_rules.load_scan_cache(cache_path)
+    suggest_rules.suggest(str(src), workers=1, cache_path="")
+    assert calls[-1]["workers"] == 1 and calls[-1]["cache_path"] == ""
+
+
+def test_iter_suggestions_streams_file_by_file(tmp_path, monkeypatch):
+    _make_tree(tmp_path)
+    scanned = []
+    real_job = suggest_rules._scan_job
+    monkeypatch.setattr(suggest_rules, "_scan_job", lambda job: scanned.append(job[0]) or real_job(job))
+    stream = suggest_rules.iter_suggestions(str(tmp_path), workers=1, cache_path="")
+    # notes.md sits at the top of the walk; its suggestion arrives before pkg/ is scanned
+    assert next(stream)["rule_type"] == "todo_fixme_comment"
+    assert len(scanned) == 1
+    list(stream)
+    assert len(scanned) == 3
+
+
+def test_scan_content_matches_scan_file_without_touching_disk(tmp_path, monkeypatch):
+    source = "import os\ndef foo():\n    print(eval('1'))  # TODO\n"
+    path = tmp_path / "mod.py"
+    path.write_text(source)
+    from_disk = suggest_rules.scan_file(str(path))
+
+    def no_open(*args, **kwargs):
+        raise AssertionError("scan_content must not touch the filesystem")
+
+    monkeypatch.setattr("builtins.open", no_open)
+    assert suggest_rules.scan_content(str(path), source) == from_disk
+    assert from_disk
+
+
+_DIFF = """diff --git a/pkg/a.py b/pkg/a.py
+--- a/pkg/a.py
++++ b/pkg/a.py
+@@ -3,0 +4,2 @@ def foo():
++def bar():
++    print('y')
+@@ -9 +11 @@
+-    x = 1
++    x = eval('1')
+diff --git a/gone.py b/gone.py
+--- a/gone.py
++++ /dev/null
+@@ -1 +0,0 @@
+-print('bye')
+"""
+
+
+def test_parse_unified_diff_maps_added_lines():
+    assert suggest_rules.parse_unified_diff(_DIFF) == {
+        "pkg/a.py": {4: "def bar():", 5: "    print('y')", 11: "    x = eval('1')"}
+    }
+
+
+def test_parse_unified_diff_keeps_header_like_hunk_lines():
+    diff = """diff --git a/notes.md b/notes.md
+--- a/notes.md
++++ b/notes.md
+@@ -1,3 +1,3 @@
+ intro
+---- old rule
++++++ new rule
+
+\\ No newline at end of file
+diff --git a/b.py b/b.py
+--- a/b.py
++++ b/b.py
+@@ -5 +5 @@
+--- x
++++ y
+"""
+    assert suggest_rules.parse_unified_diff(diff) == {
+        "notes.md": {2: "++++ new rule"},
+        "b.py": {5: "++ y"},
+    }
+
+
+def test_run_checkers_on_changes_only_reports_touched_lines():
+    content = "def foo():\n    print('x')\n    eval('1')\n\ndef bar():\n    print('y')\n"
+    full = suggest_rules.run_checkers("a.py", content)
+    scoped = suggest_rules.run_checkers_on_changes("a.py", content, [6])
+    assert len(scoped) < len(full)
+    # bar()'s print is on the changed line; bar itself encloses the change (missing docstring)
+    assert [s["description"] for s in scoped] == [
+        "print() statement found in a.py at line 6.",
+        "Missing docstring for FunctionDef 'bar' in a.py at line 5.",
+    ]
+    assert suggest_rules.run_checkers_on_changes("a.py", content, []) == []
+
+
+def test_scan_diff_uses_post_image_when_available():
+    content = "\n".join(["import os"] + ["x = 0"] * 9 + ["y = eval('1')"]) + "\n"
+    diff = "+++ b/m.py\n@@ -10,0 +11 @@\n+y = eval('1')\n+++ b/notes.bin\n@@ -1 +1 @@\n+eval('1')\n"
+    with_file = suggest_rules.scan_diff(diff, read_file={"m.py": content}.get)
+    without_file = suggest_rules.scan_diff(diff)
+    assert [s["rule_type"] for s in with_file] == ["no_eval"]
+    assert "line 11" in with_file[0]["description"]
+    # The unchanged unused import is not reported; without the file only the added line is checked
+    assert [s["description"] for s in without_file] == [s["description"] for s in with_file]
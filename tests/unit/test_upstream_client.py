@@ -0,0 +1,91 @@
+import asyncio
+import json
+
+import httpx
+from fastapi.testclient import TestClient
+
+import rule_api_server
+from rule_api_server import UpstreamClient
+
+
+def test_upstream_client_reuses_one_pool_per_event_loop():
+    client = UpstreamClient("test", max_concurrency=3, timeout=5)
+
+    async def grab():
+        first = client._async_client()
+        second = client._async_client()
+        return first, second
+
+    first, second = asyncio.run(grab())
+    assert first is second
+    # A new event loop gets its own pool instead of reusing loop-bound connections
+    third, _ = asyncio.run(grab())
+    assert third is not first
+    limits = client._limits()
+    assert limits.max_connections == 3
+    assert limits.max_keepalive_connections == 3
+    asyncio.run(client.aclose())
+
+
+def test_passthrough_awaits_shared_client(monkeypatch):
+    calls = []
+
+    async def fake_post(url, **kwargs):
+        calls.append((url, kwargs["json"]))
+        return httpx.Response(200, json={"summary": "ok"}, request=httpx.Request("POST", url))
+
+    monkeypatch.setattr(rule_api_server.ollama_functions_client, "post", fake_post)
+    resp = TestClient(rule_api_server.app).post("/summarize-git-diff", json={"diff": "d", "concise": True})
+    assert resp.json() == {"summary": "ok"}
+    assert calls == [(f"{rule_api_server.OLLAMA_FUNCTIONS_URL}/summarize-git-diff", {"diff": "d", "concise": True})]
+
+
+def test_per_call_timeouts_keep_client_settings(monkeypatch):
+    client = UpstreamClient("test", max_concurrency=1, timeout=30, connect_timeout=2)
+    timeout = client.timeout_with_read(7)
+    assert timeout.read == 7
+    assert (timeout.connect, timeout.write, timeout.pool) == (2, 30, 30)
+
+    seen = []
+
+    async def fake_post(url, **kwargs):
+        seen.append(kwargs.get("timeout"))
+        return httpx.Response(200, json={}, request=httpx.Request("POST", url))
+
+    monkeypatch.setattr(rule_api_server.ollama_functions_client, "post", fake_post)
+    asyncio.run(rule_api_server.call_summarize_git_diff("d"))
+    asyncio.run(rule_api_server.call_suggest_llm_rules({}))
+    assert seen == [None, None]
+
+
+def test_review_files_llm_fans_out_and_streams(monkeypatch):
+    active = []
+    peak = []
+
+    async def fake_post(url, **kwargs):
+        filename, content, _ = kwargs["files"]["file"]
+        active.append(filename)
+        peak.append(len(active))
+        # The first file is the slowest, so streamed order differs from upload order
+        await asyncio.sleep(0.05 if filename == "a.py" else 0.01)
+        active.remove(filename)
+        if filename == "bad.py":
+            return httpx.Response(500, request=httpx.Request("POST", url))
+        return httpx.Response(200, json=[f"reviewed {content.decode()}"], request=httpx.Request("POST", url))
+
+    monkeypatch.setattr(rule_api_server.ollama_functions_client, "post", fake_post)
+    monkeypatch.setattr(rule_api_server, "REVIEW_FILES_CONCURRENCY", 2)
+    api = TestClient(rule_api_server.app)
+    files = [("files", (name, name.encode(), "text/plain")) for name in ("a.py", "b.py", "bad.py")]
+
+    resp = api.post("/review-code-files-llm", files=files)
+    body = resp.json()
+    assert list(body) == ["a.py", "b.py", "bad.py"]
+    assert body["a.py"] == ["reviewed a.py"]
+    assert body["bad.py"][0].startswith("[ERROR]")
+    assert max(peak) == 2
+
+    streamed = api.post("/review-code-files-llm?stream=true", files=files)
+    lines = [json.loads(line) for line in streamed.text.splitlines()]
+    assert [line["filename"] for line in lines][-1] == "a.py"
+    assert {line["filename"] for line in lines} == {"a.py", "b.py", "bad.py"}
@@ -2,10 +2,10 @@ import pytest
 import os
 import tempfile
 import json
-from rule_api_server import str_to_list, ensure_file, save_json
+from rule_api_server import str_to_list, normalize_list, ensure_file, save_json
 from scripts.lint_rule import validate_rule
 from misc_scripts.fix_rule_files import fix_diff
-from scripts.suggest_rules import check_long_functions, check_missing_docstrings
+from scripts.suggest_rules import check_long_functions, check_missing_docstrings, pattern_checkers_with_project, run_checkers
 from scripts.llm_rule_suggester_service import get_default_url
 from misc_scripts.auto_feedback import get_default_api_base
 
@@ -15,6 +15,12 @@ def test_str_to_list_basic():
     assert str_to_list(None) == []
     assert str_to_list("a,,b") == ["a", "b"]
 
+def test_str_to_list_and_normalize_list_accept_arrays():
+    assert str_to_list(["a", " b ", ""]) == ["a", "b"]
+    assert normalize_list(["a", "l", "l"]) == ["all"]
+    assert normalize_list(["x", " ", "y "]) == ["x", "y"]
+    assert normalize_list(None) == []
+
 def test_validate_rule_minimal():
     rule = {
         "rule_type": "pytest_execution",
@@ -87,6 +93,22 @@ def foo():\n    pass\nclass Bar:\n    def method(self):\n        pass\n"""
     out2 = check_missing_docstrings("f.py", code2)
     assert out2 == []
 
+def test_run_checkers_matches_individual_checkers():
+    code = (
+        "import os\nimport imp\nfrom cgi import escape\n"
+        "password = 'hunter2'\n"
+        "class Foo:\n    async def bar(self):\n        pass\n"
+        "def baz():\n    # TODO: remove\n    try:\n        print(eval('1'))\n    except:\n        pass\n"
+        + "def long():\n" + "    x = 1\n" * 60
+        + "# SELECT * FROM t; run pytest here\n"
+    )
+    expected = [s for checker in pattern_checkers_with_project("p") for s in checker("f.py", code)]
+    assert run_checkers("f.py", code, project="p") == expected
+    assert {s["rule_type"] for s in expected} >= {
+        "no_print", "no_eval", "no_bare_except", "long_function", "missing_docstring",
+        "todo_fixme_comment", "deprecated_library", "no_hardcoded_secrets", "unused_import",
+    }
+
 def test_get_default_url_env(monkeypatch):
     monkeypatch.setenv("RUNNING_IN_DOCKER", "1")
     url = get_default_url(1234, "/foo")